@@ -1,56 +1,275 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
+import time
+import threading
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
 import os
-import uuid
+import sys
 from werkzeug.utils import secure_filename
-import matplotlib
-matplotlib.use('Agg')  
-import matplotlib.pyplot as plt
-import io
-import base64
 
-app = Flask(__name__)
-CORS(app)
+# 接口在蓝图上注册，应用由 create_app() 创建
+api = Blueprint('api', __name__)
 
 # 配置文件上传
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 MAX_FILE_SIZE = 50 * 1024 * 1024
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+# 预测天数
+DEFAULT_FORECAST_DAYS = 7
+MAX_FORECAST_DAYS = 90
+# 批量预测单次最多请求数
+MAX_BATCH_REQUESTS = 1000
 
-# 确保上传目录存在
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# 推理请求合并：每批最多请求数、最多样本行数、最长等待时间（毫秒）
+COALESCE_MAX_BATCH_SIZE = int(os.environ.get('COALESCE_MAX_BATCH_SIZE', 32))
+COALESCE_MAX_BATCH_ROWS = int(os.environ.get('COALESCE_MAX_BATCH_ROWS', 256))
+COALESCE_MAX_WAIT_MS = float(os.environ.get('COALESCE_MAX_WAIT_MS', 3.0))
+# 推理引擎：tensorflow（编译的 tf.function）或 numpy（导出权重后用纯 NumPy 前向传播，训练仍使用 TensorFlow）
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'tensorflow')
+
+# 多站点：站点数据目录、已加载站点的内存预算（MB）和数量上限
+SITES_FOLDER = os.environ.get('SITES_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sites'))
+SITE_MEMORY_BUDGET_MB = int(os.environ.get('SITE_MEMORY_BUDGET_MB', 1024))
+MAX_LOADED_SITES = int(os.environ['MAX_LOADED_SITES']) if os.environ.get('MAX_LOADED_SITES') else None
+
+# 上传记录目录（SQLite）：文件大小、内容哈希、导入统计和训练结果
+UPLOAD_CATALOG_PATH = os.environ.get('UPLOAD_CATALOG_PATH', 'upload_catalog.db')
+# 上传历史分页：默认每页条数、每页最多条数
+UPLOAD_HISTORY_PAGE_SIZE = 20
+UPLOAD_HISTORY_MAX_PAGE_SIZE = 200
+
+# 多 worker 部署时各进程同步其他进程写入的数据和模型的间隔（秒），0 表示不同步
+STORE_SYNC_SECONDS = float(os.environ.get('STORE_SYNC_SECONDS', 30))
 
 # 图表目录
 CHARTS_FOLDER = 'charts'
-os.makedirs(CHARTS_FOLDER, exist_ok=True)
+# 图表后台渲染线程数；图表接口等待渲染完成的最长时间（秒）；图表按内容命名，浏览器可长期缓存
+CHART_RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', 2))
+# 图表仓库预算：最多文件数、磁盘总量（MB）、未访问多久后删除（秒）、内存缓存（MB）
+CHART_STORE_MAX_FILES = int(os.environ.get('CHART_STORE_MAX_FILES', 500))
+CHART_STORE_MAX_MB = int(os.environ.get('CHART_STORE_MAX_MB', 200))
+CHART_TTL_SECONDS = int(os.environ.get('CHART_TTL_SECONDS', 7 * 24 * 3600))
+CHART_MEMORY_CACHE_MB = int(os.environ.get('CHART_MEMORY_CACHE_MB', 32))
+CHART_WAIT_SECONDS = 10
+CHART_MAX_AGE = 7 * 24 * 3600
+
+# LSTM模块目录
+LSTM_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lstm')
+if LSTM_FOLDER not in sys.path:
+    sys.path.insert(0, LSTM_FOLDER)
+
+from chart_renderer import ChartRenderer
+from chart_store import ChartStore
+from upload_catalog import UploadCatalog, hash_file
+from site_registry import SiteRegistry, DEFAULT_SITE
+from batching import RequestCoalescer
+from forecasting import predict_windows, predict_windows_numpy
+from stats_index import parse_day
+
+# 进程级服务：图表仓库和后台渲染池、上传记录目录、站点注册表和推理请求合并器。
+# 它们持有线程、数据库连接和 TensorFlow 运行时，不能跨 fork 共享，由 init_services() 在每个进程中创建
+chart_store = None
+chart_renderer = None
+upload_catalog = None
+site_registry = None
+coalescer = None
+inference_client = None
+_services_pid = None
+_services_lock = threading.Lock()
+
+# 启动状态：starting（后台导入 TensorFlow、scikit-learn、matplotlib）-> warming（加载默认站点模型、预热推理和图表）
+# -> ready；预热失败为 failed。Web 层不等待预热，/api/health 等静态接口启动后立即可用
+startup = {'state': 'starting', 'started_at': time.time(), 'phases': {}, 'error': None}
+_warm_up_done = threading.Event()
+
+def record_upload_results(site, job, operations, applied):
+    """训练任务结束后把各上传文件的导入统计和训练结果写入上传记录目录"""
+    for i, (op_type, payload) in enumerate(operations):
+        if op_type == 'file' and payload.get('upload_id') is not None:
+            upload_catalog.record_result(payload['upload_id'], applied[i] if i < len(applied) else None, job)
+
+def init_services():
+    """初始化本进程的服务（不导入 TensorFlow），并启动后台预热线程加载默认站点；每个进程只执行一次"""
+    global chart_store, chart_renderer, upload_catalog, site_registry, coalescer, inference_client
+    global _services_pid, _warm_up_done
+    if _services_pid == os.getpid():
+        return
+    with _services_lock:
+        if _services_pid == os.getpid():
+            return
+        _services_pid = os.getpid()
+        startup.update(state='starting', started_at=time.time(), phases={}, error=None)
+        _warm_up_done = threading.Event()
+
+        # 图表在后台渲染池中生成，预测接口只返回图表地址
+        chart_store = ChartStore(CHARTS_FOLDER, max_files=CHART_STORE_MAX_FILES,
+                                 max_bytes=CHART_STORE_MAX_MB * 1024 * 1024,
+                                 ttl_seconds=CHART_TTL_SECONDS,
+                                 memory_max_bytes=CHART_MEMORY_CACHE_MB * 1024 * 1024)
+        chart_renderer = ChartRenderer(chart_store, max_workers=CHART_RENDER_WORKERS)
+
+        # 上传记录目录；首次启动时登记上传目录中已有的文件
+        upload_catalog = UploadCatalog(UPLOAD_CATALOG_PATH)
+
+        # 初始化站点注册表；默认站点的LSTM预测器在后台预热线程中加载（优先从模型仓库热启动）
+        try:
+            upload_catalog.backfill(UPLOAD_FOLDER, DEFAULT_SITE)
+            # 设置 INFERENCE_SERVER=host:port 时默认站点的预测转发到独立推理进程（见 lstm/inference_server.py）
+            inference_client = None
+            if os.environ.get('INFERENCE_SERVER'):
+                from inference_server import InferenceClient
+                inference_client = InferenceClient(os.environ['INFERENCE_SERVER'])
+            # 所有站点共享一个推理请求合并器
+            coalescer = RequestCoalescer(predict_windows_numpy if INFERENCE_ENGINE == 'numpy' else predict_windows,
+                                         COALESCE_MAX_BATCH_SIZE, COALESCE_MAX_WAIT_MS, COALESCE_MAX_BATCH_ROWS)
+            site_registry = SiteRegistry(SITES_FOLDER, SITE_MEMORY_BUDGET_MB * 1024 * 1024,
+                                         max_sites=MAX_LOADED_SITES, coalescer=coalescer,
+                                         inference_client=inference_client,
+                                         job_listener=record_upload_results)
+        except Exception as e:
+            print(f"LSTM预测器初始化失败: {e}")
+            site_registry = None
+            coalescer = None
+            startup.update(state='failed', error=str(e))
+            _warm_up_done.set()
+            return
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def import_dependencies():
+    """导入预测和绘图依赖（TensorFlow、scikit-learn、pandas、matplotlib），只导入模块、不初始化 TensorFlow 运行时"""
+    import lstm_process
+    from chart_renderer import load_matplotlib
+    load_matplotlib()
+
+def warm_up():
+    """后台预热：导入重型依赖，加载默认站点（其他站点在首次访问时加载），预先执行一次推理和图表渲染
+
+    预热完成前到达的预测请求会等待默认站点加载完成，不会重复加载。
+    """
+    try:
+        start = time.perf_counter()
+        import_dependencies()
+        startup['phases']['import_seconds'] = round(time.perf_counter() - start, 3)
+        startup['state'] = 'warming'
+
+        # 每个站点有自己的后台训练队列（单写者）
+        start = time.perf_counter()
+        tenant = site_registry.get(DEFAULT_SITE)
+        tenant.predictor.predict_next_n_days(n_days=DEFAULT_FORECAST_DAYS)
+        startup['phases']['model_seconds'] = round(time.perf_counter() - start, 3)
+
+        # 首次渲染会加载字体缓存
+        from chart_renderer import render_chart_bytes
+        start = time.perf_counter()
+        today = datetime.now()
+        render_chart_bytes([0.0] * DEFAULT_FORECAST_DAYS,
+                           [today + timedelta(days=i) for i in range(DEFAULT_FORECAST_DAYS)])
+        startup['phases']['chart_seconds'] = round(time.perf_counter() - start, 3)
+
+        if STORE_SYNC_SECONDS > 0:
+            site_registry.start_sync(STORE_SYNC_SECONDS)
+        startup['state'] = 'ready'
+        print(f"LSTM预测器初始化成功（进程 {os.getpid()}，启动后 {time.time() - startup['started_at']:.1f} 秒就绪）")
+    except Exception as e:
+        print(f"LSTM预测器初始化失败: {e}")
+        startup.update(state='failed', error=str(e))
+    finally:
+        _warm_up_done.set()
+
+def prepare_models():
+    """准备默认站点的历史数据和模型（需要时训练后写入模型仓库）
+
+    gunicorn 主进程在 fork 之前以独立（spawn）进程调用，worker 启动后只需从模型仓库热启动，不会各自训练。
+    """
+    init_services()
+    _warm_up_done.wait()
+    if site_registry is not None:
+        site_registry.close()
+
+def shutdown_services(timeout=None):
+    """停止接受训练任务并等待已入队的任务完成（worker 平滑退出时调用）"""
+    if site_registry is not None and _services_pid == os.getpid():
+        if not site_registry.close(timeout):
+            print("训练任务未在退出前完成，数据更新和模型版本均为原子写入，未完成的任务不会留下半成品")
+
+@api.before_app_request
+def ensure_services():
+    """没有通过启动钩子初始化服务时（如直接运行 gunicorn wsgi:app），在本进程的首个请求前初始化"""
+    init_services()
+
+def get_tenant(site):
+    """获取站点的预测器和训练队列，返回 (站点, 错误响应)"""
+    if site_registry is None:
+        return None, (jsonify({"error": "预测器未初始化"}), 500)
+    try:
+        return site_registry.get(site), None
+    except KeyError:
+        return None, (jsonify({"error": f"站点不存在: {site}"}), 404)
+    except Exception as e:
+        return None, (jsonify({"error": f"站点 {site} 预测器初始化失败: {str(e)}"}), 500)
 
-# 初始化LSTM预测器
-try:
-    from lstm_process import LSTMPredictor
-    lstm_predictor = LSTMPredictor(data_path='more_train.csv')
-    print("LSTM预测器初始化成功")
-except Exception as e:
-    print(f"LSTM预测器初始化失败: {e}")
-    lstm_predictor = None
+def last_data_date(predictor):
+    """站点最后一条数据的日期（pandas 随预测器加载，这里不在模块顶层导入）"""
+    import pandas as pd
+    return pd.to_datetime(predictor.get_last_date())
+
+def site_url(site, path):
+    """生成站点接口地址，默认站点使用不带站点前缀的地址"""
+    return f"/api{path}" if site == DEFAULT_SITE else f"/api/{site}{path}"
+
+def attach_chart(payload):
+    """缓存的预测结果只保存图表输入，每次响应时提交渲染（已存在时直接复用，被图表仓库淘汰后重新渲染）并填入图表地址"""
+    chart_inputs = payload.get('_chart')
+    if chart_inputs is None:
+        return payload
+    body = {k: v for k, v in payload.items() if k != '_chart'}
+    chart_filename = chart_renderer.submit(*chart_inputs)
+    # 前端可以通过这个URL访问图表，渲染完成前请求会等待
+    body['chart_url'] = f"/api/charts/{chart_filename}"
+    body['chart_filename'] = chart_filename
+    return body
+
+def cached_forecast_response(lstm_predictor, kind, n_days, compute):
+    """带缓存和 ETag 的预测响应：客户端 ETag 未变化时直接返回 304，不做推理
+
+    缓存键和 ETag 由持久化的数据版本和模型版本决定，多个 worker 看到相同数据和模型时 ETag 相同
+    """
+    key = lstm_predictor.cache_key(kind, n_days)
+    etag = lstm_predictor.forecast_cache.etag(key)
+    if request.if_none_match.contains(etag):
+        # 客户端仍持有旧响应中的图表地址，确认图表还在
+        payload = lstm_predictor.forecast_cache.get(key)
+        if payload is not None:
+            attach_chart(payload)
+        response = current_app.response_class(status=304)
+    else:
+        payload = lstm_predictor.forecast_cache.get(key)
+        if payload is None:
+            payload = compute()
+            # 计算期间模型或数据发生变化时不写入缓存，避免旧键对应新结果
+            if lstm_predictor.cache_key(kind, n_days) == key:
+                lstm_predictor.forecast_cache.put(key, payload)
+        response = jsonify(attach_chart(payload))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 def allowed_file(filename):
     """检查文件类型是否允许"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@app.route('/api/upload/data', methods=['POST'])
-def upload_data_file():
+@api.route('/api/upload/data', methods=['POST'])
+@api.route('/api/<site>/upload/data', methods=['POST'])
+def upload_data_file(site=DEFAULT_SITE):
     """数据文件上传接口"""
     try:
-        if lstm_predictor is None:
-            return jsonify({"error": "预测器未初始化"}), 500
+        tenant, error = get_tenant(site)
+        if error:
+            return error
             
         # 检查是否有文件
         if 'file' not in request.files:
@@ -69,26 +288,54 @@ def upload_data_file():
         # 生成安全的文件名
         filename = secure_filename(file.filename)
         unique_filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
         
         # 保存文件
         file.save(file_path)
+        file_size = os.path.getsize(file_path)
+        file_type = filename.rsplit('.', 1)[1].lower()
+        content_hash = hash_file(file_path)
         
-        # 使用新上传的数据重新训练模型
-        try:
-            training_result = lstm_predictor.retrain_with_new_data(file_path)
-            training_status = training_result
-        except Exception as training_error:
-            training_status = f"模型重新训练失败: {str(training_error)}"
+        # 与该站点已导入的文件内容相同：不再解析和训练，只记录这次上传
+        original = upload_catalog.find_duplicate(site, content_hash)
+        if original is not None:
+            os.remove(file_path)
+            upload_id = upload_catalog.add(site, filename, None, None, file_type, file_size, content_hash,
+                                           status='duplicate', duplicate_of=original['id'],
+                                           message=f"与上传记录 {original['id']} 内容相同")
+            response = {
+                "message": "文件内容与已上传的文件相同，跳过解析和训练",
+                "upload_id": upload_id,
+                "duplicate_of": original,
+                "job_id": original['job_id'],
+            }
+            if original['job_id']:
+                response["job_status_url"] = site_url(site, f"/train/jobs/{original['job_id']}")
+            return jsonify(response), 200
+
+        # 空文件、只有表头或缺少特征列的文件直接拒绝，不记录、不提交训练任务
+        from ingestion import check_file
+        check_error = check_file(file_path, tenant.predictor.feature_cols or ())
+        if check_error is not None:
+            os.remove(file_path)
+            return jsonify({"error": check_error}), 400
+        
+        # 记录上传并提交后台训练任务，立即返回
+        upload_id = upload_catalog.add(site, filename, unique_filename, file_path, file_type, file_size, content_hash)
+        job = tenant.training_queue.submit('file', {'path': file_path, 'upload_id': upload_id})
+        upload_catalog.set_job(upload_id, job.id)
+        training_status = f"模型将在后台重新训练，任务ID: {job.id}"
         
         # 记录上传信息
         upload_info = {
+            "upload_id": upload_id,
             "original_filename": filename,
             "saved_filename": unique_filename,
             "file_path": file_path,
-            "file_size": os.path.getsize(file_path),
+            "file_size": file_size,
+            "content_hash": content_hash,
             "upload_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "file_type": filename.rsplit('.', 1)[1].lower(),
+            "file_type": file_type,
             "training_status": training_status
         }
         
@@ -96,94 +343,216 @@ def upload_data_file():
             "message": "文件上传成功",
             "file_info": upload_info,
             "training_result": training_status,
-            "next_step": "文件已接收并用于模型训练"
+            "job_id": job.id,
+            "job_status_url": site_url(site, f"/train/jobs/{job.id}"),
+            "next_step": "文件已接收，模型正在后台训练"
         }
         
-        return jsonify(response)
+        return jsonify(response), 202
     
     except Exception as e:
         return jsonify({"error": f"文件上传失败: {str(e)}"}), 500
 
-@app.route('/api/upload/history', methods=['GET'])
+@api.route('/api/upload/history', methods=['GET'])
 def get_upload_history():
-    """获取上传历史"""
+    """获取上传历史（从上传记录目录分页查询，?page=&page_size=&site=）"""
     try:
-        uploads = []
-        if os.path.exists(UPLOAD_FOLDER):
-            for filename in os.listdir(UPLOAD_FOLDER):
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                if os.path.isfile(file_path):
-                    stat = os.stat(file_path)
-                    uploads.append({
-                        "filename": filename,
-                        "upload_time": datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                        "file_size": stat.st_size,
-                        "file_type": filename.rsplit('.', 1)[1].lower() if '.' in filename else 'unknown'
-                    })
+        page = request.args.get('page', 1, type=int)
+        page_size = request.args.get('page_size', UPLOAD_HISTORY_PAGE_SIZE, type=int)
+        if page < 1 or not 1 <= page_size <= UPLOAD_HISTORY_MAX_PAGE_SIZE:
+            return jsonify({"error": f"page 需不小于 1，page_size 需在 1 到 {UPLOAD_HISTORY_MAX_PAGE_SIZE} 之间"}), 400
         
-        # 按上传时间倒序排列
-        uploads.sort(key=lambda x: x['upload_time'], reverse=True)
+        records, total = upload_catalog.history(page, page_size, request.args.get('site'))
+        uploads = []
+        for record in records:
+            uploads.append({
+                "filename": record['saved_filename'] or record['original_filename'],
+                "upload_time": record['uploaded_at'],
+                "file_size": record['file_size'],
+                "file_type": record['file_type'],
+                **record
+            })
         
-        return jsonify({"uploads": uploads})
+        return jsonify({
+            "uploads": uploads,
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "pages": (total + page_size - 1) // page_size
+        })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/predict/lstm', methods=['GET'])
-def predict_lstm():
+@api.route('/api/predict/lstm', methods=['GET'])
+@api.route('/api/<site>/predict/lstm', methods=['GET'])
+def predict_lstm(site=DEFAULT_SITE):
     """LSTM预测接口"""
     try:
-        if lstm_predictor is None:
-            return jsonify({"error": "预测器未初始化"}), 500
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        lstm_predictor = tenant.predictor
             
-        # 获取未来7天预测
-        predictions = lstm_predictor.predict_next_n_days(n_days=7)
-        
-        # 生成预测日期
-        last_date = pd.to_datetime(lstm_predictor.get_last_date())
-        prediction_dates = [(last_date + timedelta(days=i+1)).strftime('%Y-%m-%d') for i in range(7)]
-        prediction_dates_dt = [last_date + timedelta(days=i+1) for i in range(7)]
-        
-        # 计算置信区间
-        confidence_interval = lstm_predictor.calculate_confidence_interval(predictions)
+        # 预测天数，默认7天
+        n_days = request.args.get('days', DEFAULT_FORECAST_DAYS, type=int)
+        if not 1 <= n_days <= MAX_FORECAST_DAYS:
+            return jsonify({"error": f"预测天数需在 1 到 {MAX_FORECAST_DAYS} 之间"}), 400
         
-        # 获取模型评估指标
-        model_metrics = lstm_predictor.get_model_metrics()
+        def compute():
+            # 获取未来n天预测（单次前向传播）
+            predictions = lstm_predictor.predict_next_n_days(n_days=n_days)
+            
+            # 生成预测日期
+            last_date = last_data_date(lstm_predictor)
+            prediction_dates_dt = [last_date + timedelta(days=i+1) for i in range(n_days)]
+            prediction_dates = [d.strftime('%Y-%m-%d') for d in prediction_dates_dt]
+            
+            # 计算置信区间
+            confidence_interval = lstm_predictor.calculate_confidence_interval(predictions)
+            
+            # 获取模型评估指标
+            model_metrics = lstm_predictor.get_model_metrics()
+            
+            # 图表在响应时提交后台渲染（见 attach_chart），文件名由预测内容决定，相同预测复用同一张图
+            return {
+                "prediction_dates": prediction_dates,
+                "prediction": [int(pred) for pred in predictions],
+                "confidence_interval": confidence_interval,
+                "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "model_metrics": model_metrics,
+                "_chart": ([float(p) for p in predictions], prediction_dates_dt)
+            }
         
-        # 生成图表并保存
-        chart_filename = lstm_predictor.generate_prediction_chart(predictions, prediction_dates_dt)
+        return cached_forecast_response(lstm_predictor, 'lstm', n_days, compute)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """批量预测接口：多个站点、多个预测天数，每个站点一次前向传播，结果按站点完成顺序以 NDJSON 流式返回
+
+    请求体: {"requests": [{"id": 可选标识, "site": 站点ID（默认站点可省略）, "days": 预测天数, "features": 可选未来特征 [[...], ...]}]}
+    """
+    try:
+        if site_registry is None:
+            return jsonify({"error": "预测器未初始化"}), 500
         
-        # 构建图表URL（前端可以通过这个URL访问图表）
-        chart_url = f"/api/charts/{chart_filename}"
+        data = request.get_json(silent=True) or {}
+        items = data.get('requests')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "requests 必须是非空列表"}), 400
+        if len(items) > MAX_BATCH_REQUESTS:
+            return jsonify({"error": f"单次最多 {MAX_BATCH_REQUESTS} 个预测请求"}), 400
         
-        response = {
-            "prediction_dates": prediction_dates,
-            "prediction": [int(pred) for pred in predictions],
-            "confidence_interval": confidence_interval,
-            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "model_metrics": model_metrics,
-            "chart_url": chart_url,
-            "chart_filename": chart_filename
-        }
-        
-        return jsonify(response)
+        # 按站点分组，同一站点的全部请求合并为一次前向传播
+        groups = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return jsonify({"error": f"第 {index} 个请求格式错误"}), 400
+            n_days = item.get('days', DEFAULT_FORECAST_DAYS)
+            if not isinstance(n_days, int) or not 1 <= n_days <= MAX_FORECAST_DAYS:
+                return jsonify({"error": f"第 {index} 个请求的预测天数需在 1 到 {MAX_FORECAST_DAYS} 之间"}), 400
+            groups.setdefault(str(item.get('site', DEFAULT_SITE)), []).append((index, item, n_days))
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/charts/<filename>', methods=['GET'])
+    def generate():
+        start = time.perf_counter()
+        forward_passes = 0
+        for site, group in groups.items():
+            try:
+                predictor = site_registry.get(site).predictor
+            except KeyError:
+                for index, item, _ in group:
+                    yield json.dumps({"index": index, "id": item.get('id'), "site": site,
+                                      "error": f"站点不存在: {site}"}, ensure_ascii=False) + '\n'
+                continue
+            except Exception as e:
+                for index, item, _ in group:
+                    yield json.dumps({"index": index, "id": item.get('id'), "site": site,
+                                      "error": f"站点预测器初始化失败: {str(e)}"}, ensure_ascii=False) + '\n'
+                continue
+
+            # 校验未来特征，格式错误的请求单独返回错误
+            valid, n_features = [], len(predictor.feature_cols)
+            for index, item, n_days in group:
+                features = item.get('features')
+                if features is not None:
+                    try:
+                        features = np.asarray(features, dtype=np.float64)
+                        if features.ndim != 2 or features.shape[1] != n_features:
+                            raise ValueError
+                    except (TypeError, ValueError):
+                        yield json.dumps({"index": index, "id": item.get('id'), "site": site,
+                                          "error": f"features 必须是每行 {n_features} 个特征的二维数组"},
+                                         ensure_ascii=False) + '\n'
+                        continue
+                valid.append((index, item, n_days, features))
+            if not valid:
+                continue
+
+            try:
+                predictions = predictor.predict_batch([(n_days, features) for _, _, n_days, features in valid])
+                forward_passes += 1
+            except Exception as e:
+                for index, item, _, _ in valid:
+                    yield json.dumps({"index": index, "id": item.get('id'), "site": site,
+                                      "error": str(e)}, ensure_ascii=False) + '\n'
+                continue
+            last_date = last_data_date(predictor)
+            model_version = predictor.model_version
+            for (index, item, n_days, _), prediction in zip(valid, predictions):
+                yield json.dumps({
+                    "index": index,
+                    "id": item.get('id'),
+                    "site": site,
+                    "days": n_days,
+                    "prediction_dates": [(last_date + timedelta(days=i + 1)).strftime('%Y-%m-%d') for i in range(n_days)],
+                    "prediction": [int(pred) for pred in prediction],
+                    "model_version": model_version
+                }, ensure_ascii=False) + '\n'
+        yield json.dumps({
+            "done": True,
+            "count": len(items),
+            "sites": len(groups),
+            "forward_passes": forward_passes,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@api.route('/api/charts/<filename>', methods=['GET'])
 def get_chart(filename):
-    """获取图表文件"""
+    """获取图表文件；图表仍在渲染时最多等待 CHART_WAIT_SECONDS 秒，超时返回 202"""
     try:
-        chart_path = os.path.join(CHARTS_FOLDER, filename)
-        if os.path.exists(chart_path):
-            return send_file(chart_path, mimetype='image/png')
+        status = chart_renderer.status(filename)
+        if status == 'rendering' and not chart_renderer.wait(filename, CHART_WAIT_SECONDS):
+            status = chart_renderer.status(filename)
+            if status == 'rendering':
+                response = jsonify({"status": "rendering", "message": "图表生成中，请稍后重试"})
+                response.status_code = 202
+                response.headers['Retry-After'] = '1'
+                return response
+        
+        # 最近访问的图表直接从内存返回，不读磁盘
+        data = chart_store.get(filename)
+        if data is not None:
+            response = current_app.response_class(data, mimetype='image/png')
+            # 文件名由内容决定，可直接作为 ETag
+            response.set_etag(filename)
+            response.headers['Cache-Control'] = f'public, max-age={CHART_MAX_AGE}, immutable'
+            return response.make_conditional(request)
+        elif chart_renderer.status(filename) == 'failed':
+            return jsonify({"error": "图表生成失败"}), 500
         else:
             return jsonify({"error": "图表文件不存在"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/model/info', methods=['GET'])
+@api.route('/api/model/info', methods=['GET'])
 def get_model_info():
     """获取模型信息"""
     try:
@@ -207,12 +576,75 @@ def get_model_info():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/system/statistics', methods=['GET'])
-def get_system_statistics():
+@api.route('/api/cache/stats', methods=['GET'])
+@api.route('/api/<site>/cache/stats', methods=['GET'])
+def get_cache_stats(site=DEFAULT_SITE):
+    """获取预测缓存统计"""
+    tenant, error = get_tenant(site)
+    if error:
+        return error
+    return jsonify(tenant.predictor.forecast_cache.stats())
+
+@api.route('/api/charts/stats', methods=['GET'])
+def get_chart_stats():
+    """获取图表渲染和图表仓库统计"""
+    return jsonify({"renderer": chart_renderer.stats(), "store": chart_store.stats()})
+
+@api.route('/api/metrics/inference', methods=['GET'])
+def get_inference_metrics():
+    """获取推理请求合并指标（批次填充率、p50/p99延迟）"""
+    if coalescer is None:
+        return jsonify({"error": "预测器未初始化"}), 500
+    metrics = {"local": coalescer.stats()}
+    if inference_client is not None:
+        try:
+            metrics["inference_server"] = inference_client.call('stats')
+        except Exception as e:
+            metrics["inference_server"] = {"error": str(e)}
+    return jsonify(metrics)
+
+@api.route('/api/model/rollback', methods=['POST'])
+@api.route('/api/<site>/model/rollback', methods=['POST'])
+def rollback_model(site=DEFAULT_SITE):
+    """回滚到上一个模型版本"""
+    tenant, error = get_tenant(site)
+    if error:
+        return error
+    lstm_predictor = tenant.predictor
+    version = lstm_predictor.rollback()
+    if version is None:
+        return jsonify({"error": "没有可回滚的模型版本"}), 409
+    return jsonify({"message": "模型已回滚", "model": lstm_predictor.bundle.info()})
+
+@api.route('/api/model/versions', methods=['GET'])
+@api.route('/api/<site>/model/versions', methods=['GET'])
+def list_model_versions(site=DEFAULT_SITE):
+    """列出模型仓库中的版本（每次训练的 epoch 数、耗时、早停情况和逐 epoch 损失）和未完成训练的检查点"""
+    try:
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        store = tenant.predictor.model_store
+        versions = [{key: meta.get(key) for key in ('version', 'created_at', 'model_metrics', 'incremental_updates',
+                                                    'training')}
+                    for meta in store.list_versions()]
+        return jsonify({
+            "current_version": tenant.predictor.model_version,
+            "versions": versions,
+            "checkpoints": store.list_checkpoints(),
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/system/statistics', methods=['GET'])
+@api.route('/api/<site>/system/statistics', methods=['GET'])
+def get_system_statistics(site=DEFAULT_SITE):
     """获取系统统计数据"""
     try:
-        if lstm_predictor is None:
-            return jsonify({"error": "预测器未初始化"}), 500
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        lstm_predictor = tenant.predictor
             
         stats = lstm_predictor.get_data_statistics()
         model_metrics = lstm_predictor.get_model_metrics()
@@ -235,22 +667,104 @@ def get_system_statistics():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/health', methods=['GET'])
+def parse_date_range():
+    """解析查询参数 start、end（YYYY-MM-DD，均可省略），返回 (start, end) 天数"""
+    start = request.args.get('start')
+    end = request.args.get('end')
+    return (parse_day(start) if start else None, parse_day(end) if end else None)
+
+@api.route('/api/stats/summary', methods=['GET'])
+@api.route('/api/<site>/stats/summary', methods=['GET'])
+def get_stats_summary(site=DEFAULT_SITE):
+    """客流量汇总统计：行数、均值、标准差、最值、百分位和星期分布（读取统计索引）"""
+    try:
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        stats_index = tenant.predictor.stats_index
+        return jsonify({"summary": stats_index.summary(), "day_of_week": stats_index.day_of_week()})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/stats/range', methods=['GET'])
+@api.route('/api/<site>/stats/range', methods=['GET'])
+def get_stats_range(site=DEFAULT_SITE):
+    """任意日期区间的客流量统计（?start=YYYY-MM-DD&end=YYYY-MM-DD，两端包含）"""
+    try:
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        try:
+            start, end = parse_date_range()
+        except ValueError:
+            return jsonify({"error": "日期格式错误，应为 YYYY-MM-DD"}), 400
+        return jsonify(tenant.predictor.stats_index.range(start, end))
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/stats/rollup', methods=['GET'])
+@api.route('/api/<site>/stats/rollup', methods=['GET'])
+def get_stats_rollup(site=DEFAULT_SITE):
+    """按周、按月或按星期汇总（?period=week|month|dow&start=&end=）"""
+    try:
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        period = request.args.get('period', 'week')
+        if period not in ('week', 'month', 'dow'):
+            return jsonify({"error": "period 只能是 week、month 或 dow"}), 400
+        stats_index = tenant.predictor.stats_index
+        if period == 'dow':
+            return jsonify({"period": period, "buckets": stats_index.day_of_week()})
+        try:
+            start, end = parse_date_range()
+        except ValueError:
+            return jsonify({"error": "日期格式错误，应为 YYYY-MM-DD"}), 400
+        return jsonify({"period": period, "buckets": stats_index.rollup(period, start, end)})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/api/health', methods=['GET'])
 def health_check():
-    """健康检查接口"""
-    status = "healthy" if lstm_predictor is not None else "unhealthy"
+    """健康检查接口（不依赖模型，启动后立即可用）：state 为 starting、warming、ready 或 failed"""
+    default_tenant = site_registry.loaded(DEFAULT_SITE) if site_registry is not None else None
+    status = "healthy" if startup['state'] == 'ready' and default_tenant is not None else "unhealthy"
     return jsonify({
         "status": status, 
+        "state": startup['state'],
         "timestamp": datetime.now().isoformat(),
-        "model_loaded": lstm_predictor is not None
+        "uptime_seconds": round(time.time() - startup['started_at'], 3),
+        "startup_phases": startup['phases'],
+        "startup_error": startup['error'],
+        "model_loaded": default_tenant is not None,
+        "loaded_sites": site_registry.stats()["loaded_count"] if site_registry is not None else 0
     })
 
-@app.route('/api/upload/single', methods=['POST'])
-def upload_single_data():
+@api.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查（供负载均衡使用）：预热完成返回200，否则返回503"""
+    code = 200 if startup['state'] == 'ready' else 503
+    return jsonify({"state": startup['state']}), code
+
+@api.route('/api/sites', methods=['GET'])
+def list_sites():
+    """站点列表和已加载站点的内存占用"""
+    if site_registry is None:
+        return jsonify({"error": "预测器未初始化"}), 500
+    return jsonify({"sites": site_registry.list_sites(), **site_registry.stats()})
+
+@api.route('/api/upload/single', methods=['POST'])
+@api.route('/api/<site>/upload/single', methods=['POST'])
+def upload_single_data(site=DEFAULT_SITE):
     """单日数据上传接口"""
     try:
-        if lstm_predictor is None:
-            return jsonify({"error": "预测器未初始化"}), 500
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        lstm_predictor = tenant.predictor
             
         data = request.get_json()
         
@@ -263,53 +777,122 @@ def upload_single_data():
         # 获取特征数据
         features = data.get('features', [])
         
-        # 调用单日数据添加方法
-        result = lstm_predictor.add_single_day_data(
-            date=data['date'],
-            y_value=data['y_value'],
-            features=features
-        )
+        # 先同步校验，数据更新和训练交给后台任务
+        error = lstm_predictor.validate_single_day(data['date'], data['y_value'], features)
+        if error:
+            return jsonify({"status": "error", "message": error}), 400
+        
+        # 单日数据走增量更新，由策略决定是否需要全量重训
+        job = tenant.training_queue.submit('single', {
+            "date": data['date'],
+            "y_value": data['y_value'],
+            "features": features
+        }, mode='incremental')
         
-        return jsonify(result)
+        return jsonify({
+            "status": "success",
+            "message": "数据已接收，模型将在后台增量更新",
+            "job_id": job.id,
+            "job_status_url": site_url(site, f"/train/jobs/{job.id}")
+        }), 202
         
     except Exception as e:
         return jsonify({"error": f"单日数据上传失败: {str(e)}"}), 500
 
-@app.route('/api/predict/next_day', methods=['GET'])
-def predict_next_day():
+@api.route('/api/train/jobs', methods=['GET'])
+@api.route('/api/<site>/train/jobs', methods=['GET'])
+def list_training_jobs(site=DEFAULT_SITE):
+    """获取训练任务列表"""
+    tenant, error = get_tenant(site)
+    if error:
+        return error
+    return jsonify({"jobs": [job.to_dict() for job in tenant.training_queue.list_jobs()]})
+
+@api.route('/api/train/jobs/<job_id>', methods=['GET'])
+@api.route('/api/<site>/train/jobs/<job_id>', methods=['GET'])
+def get_training_job(job_id, site=DEFAULT_SITE):
+    """获取训练任务状态"""
+    tenant, error = get_tenant(site)
+    if error:
+        return error
+    job = tenant.training_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "训练任务不存在"}), 404
+    return jsonify(job.to_dict())
+
+@api.route('/api/train/jobs/<job_id>/progress', methods=['GET'])
+@api.route('/api/<site>/train/jobs/<job_id>/progress', methods=['GET'])
+def get_training_job_progress(job_id, site=DEFAULT_SITE):
+    """获取训练任务进度"""
+    tenant, error = get_tenant(site)
+    if error:
+        return error
+    job = tenant.training_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "训练任务不存在"}), 404
+    return jsonify(job.progress_dict())
+
+@api.route('/api/predict/next_day', methods=['GET'])
+@api.route('/api/<site>/predict/next_day', methods=['GET'])
+def predict_next_day(site=DEFAULT_SITE):
     """预测次日客流量"""
     try:
-        if lstm_predictor is None:
-            return jsonify({"error": "预测器未初始化"}), 500
+        tenant, error = get_tenant(site)
+        if error:
+            return error
+        lstm_predictor = tenant.predictor
             
-        # 获取未来1天预测
-        predictions = lstm_predictor.predict_next_n_days(n_days=1)
-        next_day_prediction = int(predictions[0]) if predictions else 0
-        
-        # 获取模型评估指标
-        model_metrics = lstm_predictor.get_model_metrics()
-        
-        response = {
-            "next_day_prediction": next_day_prediction,
-            "prediction_date": (pd.to_datetime(lstm_predictor.get_last_date()) + timedelta(days=1)).strftime('%Y-%m-%d'),
-            "model_accuracy": model_metrics.get('accuracy', 92.0),
-            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+        def compute():
+            # 获取未来1天预测
+            predictions = lstm_predictor.predict_next_n_days(n_days=1)
+            next_day_prediction = int(predictions[0]) if predictions else 0
+            
+            # 获取模型评估指标
+            model_metrics = lstm_predictor.get_model_metrics()
+            
+            return {
+                "next_day_prediction": next_day_prediction,
+                "prediction_date": (last_data_date(lstm_predictor) + timedelta(days=1)).strftime('%Y-%m-%d'),
+                "model_accuracy": model_metrics.get('accuracy', 92.0),
+                "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
         
-        return jsonify(response)
+        return cached_forecast_response(lstm_predictor, 'next_day', 1, compute)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
         
+def create_app(preload=False):
+    """创建 Flask 应用
+
+    preload 为 True 时（gunicorn 预加载）导入全部依赖供 worker 以写时复制方式共享，但不初始化进程级服务：
+    TensorFlow 运行时在 fork 之后由各 worker 初始化（见 gunicorn.conf.py）；
+    否则立即初始化服务，依赖导入和模型加载都在后台预热线程中进行，Web 层无需等待。
+    """
+    app = Flask(__name__)
+    CORS(app)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE
+    # 确保上传目录存在
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    app.register_blueprint(api)
+    if preload:
+        import_dependencies()
+    else:
+        init_services()
+    return app
+
 if __name__ == '__main__':
     import socket
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
     
-    print(f"餐厅客流量预测系统后端服务启动中...")
-    print(f"本地访问: http://localhost:5000")
+    print("餐厅客流量预测系统后端服务启动中...")
+    print("本地访问: http://localhost:5000")
     print(f"网络访问: http://{local_ip}:5000")
     print(f"健康检查: http://{local_ip}:5000/api/health")
     
-    # 启用调试模式并允许外部访问
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # 开发服务器：启用调试模式并允许外部访问；关闭自动重载，避免重新导入模块后重复加载模型
+    # 生产环境使用 gunicorn -c gunicorn.conf.py wsgi:app
+    app = create_app()
+    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
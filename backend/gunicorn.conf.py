@@ -0,0 +1,40 @@
+"""gunicorn 配置：gunicorn -c gunicorn.conf.py wsgi:app
+
+worker 数、线程数等可通过环境变量配置。主进程预加载应用（preload_app），Flask、pandas、TensorFlow 等模块
+只导入一次，fork 后以写时复制方式共享；TensorFlow 运行时不能跨 fork 使用，模型在每个 worker 启动后从模型仓库加载。
+"""
+import os
+import multiprocessing
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', 2))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 60))
+preload_app = True
+wsgi_app = 'wsgi:app'
+
+
+def on_starting(server):
+    """fork 之前在独立（spawn）进程中准备默认站点的历史数据和模型：需要训练时只训练一次，
+    主进程本身不初始化 TensorFlow 运行时"""
+    import app as backend
+
+    process = multiprocessing.get_context('spawn').Process(target=backend.prepare_models, name='prepare-models')
+    process.start()
+    process.join()
+
+
+def post_worker_init(worker):
+    """worker 启动后初始化本进程的服务，模型在后台预热线程中从模型仓库热启动（/api/ready 在预热完成后返回200）"""
+    import app as backend
+
+    backend.init_services()
+
+
+def worker_exit(server, worker):
+    """worker 平滑退出（如 HUP 重启）前等待已入队的训练任务完成"""
+    import app as backend
+
+    backend.shutdown_services(timeout=server.cfg.graceful_timeout)
@@ -0,0 +1,139 @@
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+# 延迟统计保留的最近请求数
+LATENCY_WINDOW = 1000
+
+
+class _PendingRequest:
+    """等待合并的一次推理请求"""
+
+    __slots__ = ('bundle', 'x', 'enqueued_at', 'done', 'result', 'error')
+
+    def __init__(self, bundle, x):
+        self.bundle = bundle
+        self.x = x
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """请求合并器：在 max_wait_ms 窗口内收集并发的推理请求，合并为一次前向传播后分发结果
+
+    predict_fn(bundle, x) 接收 (样本数, time_step, 特征数) 的窗口，返回 (样本数,) 的归一化预测值。
+    每批最多 max_batch_size 个请求、max_batch_rows 行样本；单个请求超过行数上限时单独成批。
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=3.0, max_batch_rows=256):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = deque()
+        # 队列中等待的样本行数
+        self._queued_rows = 0
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._batches = 0
+        self._requests = 0
+        self._rows = 0
+        # 各批次计入填充率的行数（超过上限的按上限计）
+        self._filled_rows = 0
+        self._forward_passes = 0
+        self._worker = threading.Thread(target=self._run, name='inference-coalescer', daemon=True)
+        self._worker.start()
+
+    def submit(self, bundle, x):
+        """提交一组窗口并阻塞等待预测结果"""
+        request = _PendingRequest(bundle, x)
+        with self._cond:
+            self._queue.append(request)
+            self._queued_rows += len(x)
+            self._cond.notify()
+        request.done.wait()
+        with self._stats_lock:
+            self._latencies.append(time.perf_counter() - request.enqueued_at)
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        """等到凑满一批（请求数或行数达到上限）或最早的请求等待超过 max_wait"""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0].enqueued_at + self.max_wait
+            while len(self._queue) < self.max_batch_size and self._queued_rows < self.max_batch_rows:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, rows = [], 0
+            while self._queue and len(batch) < self.max_batch_size:
+                n_rows = len(self._queue[0].x)
+                if batch and rows + n_rows > self.max_batch_rows:
+                    break
+                batch.append(self._queue.popleft())
+                rows += n_rows
+            self._queued_rows -= rows
+            return batch
+
+    def _run(self):
+        """后台线程：合并请求，按模型分组执行前向传播"""
+        while True:
+            batch = self._collect()
+            groups = {}
+            for request in batch:
+                groups.setdefault(id(request.bundle.model), []).append(request)
+            for requests in groups.values():
+                self._execute(requests)
+            rows = sum(len(request.x) for request in batch)
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._rows += rows
+                self._filled_rows += min(rows, self.max_batch_rows)
+                self._forward_passes += len(groups)
+
+    def _execute(self, requests):
+        """同一模型的请求拼接成一个批次推理，再按原始大小切分"""
+        try:
+            sizes = [len(r.x) for r in requests]
+            x = requests[0].x if len(requests) == 1 else np.concatenate([r.x for r in requests])
+            y = np.asarray(self.predict_fn(requests[0].bundle, x)).reshape(-1)
+            offsets = np.cumsum([0] + sizes)
+            for request, start, end in zip(requests, offsets[:-1], offsets[1:]):
+                request.result = y[start:end]
+        except Exception as e:
+            for request in requests:
+                request.error = e
+        finally:
+            for request in requests:
+                request.done.set()
+
+    def stats(self):
+        """合并指标：平均每批请求数和行数、批次填充率（按行数计）、p50/p99 延迟"""
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1000
+            batches, requests, passes = self._batches, self._requests, self._forward_passes
+            rows, filled_rows = self._rows, self._filled_rows
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_batch_rows': self.max_batch_rows,
+            'max_wait_ms': self.max_wait * 1000,
+            'requests': requests,
+            'rows': rows,
+            'batches': batches,
+            'forward_passes': passes,
+            'avg_batch_size': requests / batches if batches else 0.0,
+            'avg_batch_rows': rows / batches if batches else 0.0,
+            'batch_fill_rate': filled_rows / (batches * self.max_batch_rows) if batches else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
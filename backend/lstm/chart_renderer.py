@@ -0,0 +1,251 @@
+import io
+import json
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+# matplotlib 导入较慢，首次渲染（或启动预热）时才加载
+_matplotlib_lock = threading.Lock()
+_matplotlib = None
+
+
+def load_matplotlib():
+    """导入 matplotlib 并配置中文字体（只执行一次，渲染时不再修改全局 rcParams），返回 (Figure, FigureCanvasAgg)"""
+    global _matplotlib
+    with _matplotlib_lock:
+        if _matplotlib is None:
+            import matplotlib
+            matplotlib.use('Agg')
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
+            matplotlib.rcParams['axes.unicode_minus'] = False
+            _matplotlib = (Figure, FigureCanvasAgg)
+        return _matplotlib
+
+
+def chart_filename(predictions, prediction_dates):
+    """按图表内容（日期标签和预测值）生成文件名，相同预测复用同一张图"""
+    content = json.dumps({
+        'dates': [d.strftime('%m-%d') for d in prediction_dates],
+        'predictions': [round(float(p), 4) for p in predictions],
+    })
+    return f"prediction_chart_{hashlib.sha256(content.encode('utf-8')).hexdigest()[:24]}.png"
+
+
+class PredictionChartTemplate:
+    """双子图预测图表模板（柱状图 + 趋势线）
+
+    使用面向对象的 Figure/FigureCanvasAgg，不依赖 pyplot 全局状态；图形、画布和坐标轴样式只创建一次，
+    每次渲染只替换数据。模板不是线程安全的，每个线程使用自己的模板。
+    """
+
+    def __init__(self):
+        Figure, FigureCanvasAgg = load_matplotlib()
+        self.figure = Figure(figsize=(15, 12))
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax1, self.ax2 = self.figure.subplots(2, 1)
+
+        self.ax1.set_xlabel('日期', fontsize=12)
+        self.ax1.set_ylabel('预测客流量 (人)', fontsize=12)
+        self.ax1.grid(axis='y', alpha=0.3)
+
+        self.ax2.set_title('客流量预测趋势', fontsize=16, fontweight='bold', pad=20)
+        self.ax2.set_xlabel('日期', fontsize=12)
+        self.ax2.set_ylabel('客流量 (人)', fontsize=12)
+        self.ax2.grid(True, alpha=0.3)
+
+    def clear(self):
+        """移除上一次渲染的数据图元，保留坐标轴样式"""
+        for ax in (self.ax1, self.ax2):
+            # bar() 每次还会登记一个 BarContainer，不移除时模板会一直引用历次渲染的柱子（移除容器时一并移除其中的柱子）
+            for container in list(ax.containers):
+                container.remove()
+            for artist in [*ax.patches, *ax.lines, *ax.collections, *ax.texts]:
+                artist.remove()
+            legend = ax.get_legend()
+            if legend is not None:
+                legend.remove()
+
+    def render(self, target, predictions, prediction_dates):
+        """渲染到 target（文件路径或文件对象）"""
+        self.clear()
+        n = len(predictions)
+        x = np.arange(n)
+        dates_str = [d.strftime('%m-%d') for d in prediction_dates]
+        top = max(max(predictions, default=0), 1)
+
+        # 第一个子图：预测趋势（横轴用数值位置，复用坐标轴时不会累积日期类别）
+        bars = self.ax1.bar(x, predictions, color='skyblue', edgecolor='navy', alpha=0.8)
+
+        # 添加数值标签
+        for bar, val in zip(bars, predictions):
+            height = bar.get_height()
+            self.ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
+                          f'{int(val)}', ha='center', va='bottom', fontweight='bold')
+
+        self.ax1.set_title(f'未来{n}天客流量预测', fontsize=16, fontweight='bold', pad=20)
+        self.ax1.set_xticks(x, dates_str, rotation=45)
+        # 与自动缩放一致：两侧各留 5% 边距
+        margin = 0.05 * (n - 0.2)
+        self.ax1.set_xlim(-0.4 - margin, n - 0.6 + margin)
+        self.ax1.set_ylim(0, top * 1.05)
+
+        # 第二个子图：趋势线
+        self.ax2.plot(x, predictions, marker='o', linewidth=3, markersize=8,
+                      color='#ff6b6b', label='预测趋势')
+        self.ax2.fill_between(x, predictions, alpha=0.3, color='#ff6b6b')
+        self.ax2.legend()
+        self.ax2.set_xticks(x, dates_str, rotation=45)
+        pad = 0.05 * (n - 1) if n > 1 else 0.5
+        self.ax2.set_xlim(-pad, n - 1 + pad)
+        self.ax2.set_ylim(-0.05 * top, top * 1.05)
+
+        self.figure.tight_layout()
+        self.figure.savefig(target, format='png', dpi=150, bbox_inches='tight')
+
+
+def draw_simple_chart(target, predictions, prediction_dates):
+    """绘制简单柱状图（备用）"""
+    Figure, FigureCanvasAgg = load_matplotlib()
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.subplots()
+    dates_str = [d.strftime('%m-%d') for d in prediction_dates]
+    ax.bar(dates_str, predictions, color='lightblue')
+    ax.set_title(f'未来{len(predictions)}天客流量预测')
+    ax.set_xlabel('日期')
+    ax.set_ylabel('客流量 (人)')
+    ax.grid(True, alpha=0.3)
+    figure.tight_layout()
+    figure.savefig(target, format='png', dpi=150, bbox_inches='tight')
+
+
+# 每个线程（或进程）一个图表模板
+_local = threading.local()
+
+
+def draw_prediction_chart(target, predictions, prediction_dates):
+    """用当前线程的模板绘制双子图预测图表；渲染出错时丢弃模板，下次重新创建"""
+    template = getattr(_local, 'prediction_template', None)
+    if template is None:
+        template = _local.prediction_template = PredictionChartTemplate()
+    try:
+        template.render(target, predictions, prediction_dates)
+    except Exception:
+        _local.prediction_template = None
+        raise
+
+
+def render_chart_bytes(predictions, prediction_dates):
+    """渲染预测图表，返回 PNG 字节；双子图失败时退回简单图表"""
+    buffer = io.BytesIO()
+    try:
+        draw_prediction_chart(buffer, predictions, prediction_dates)
+    except Exception as e:
+        print(f"图表生成失败: {e}")
+        buffer = io.BytesIO()
+        draw_simple_chart(buffer, predictions, prediction_dates)
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    """后台图表渲染池：请求只拿到按内容哈希命名的图表地址，渲染完成后写入图表仓库
+
+    use_processes 为 True 时在独立进程中渲染（spawn 启动，不继承 TensorFlow 状态），可利用多核；
+    否则在线程池中渲染，各线程使用各自的图表模板并行执行。
+    多个 worker 共享图表目录时，其他 worker 正在渲染的图表通过仓库中的渲染标记报告为 rendering。
+    """
+
+    def __init__(self, store, max_workers=2, use_processes=False, max_failed=256):
+        self.store = store
+        # 最多记住的渲染失败图表数，超出时按最早失败的顺序淘汰
+        self.max_failed = max_failed
+        self.use_processes = use_processes
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chart-render')
+        self._pending = {}
+        # 文件名 -> 错误信息，按失败时间排序
+        self._failed = OrderedDict()
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._deduplicated = 0
+
+    def submit(self, predictions, prediction_dates):
+        """提交渲染任务并立即返回文件名；相同内容已渲染或正在渲染时不重复渲染"""
+        predictions = [float(p) for p in predictions]
+        prediction_dates = list(prediction_dates)
+        filename = chart_filename(predictions, prediction_dates)
+        with self._lock:
+            if filename in self._pending or self.store.exists(filename):
+                self._deduplicated += 1
+                return filename
+            self._failed.pop(filename, None)
+            self._submitted += 1
+            # 渲染完成且写入仓库后置位，供图表接口等待
+            self._pending[filename] = threading.Event()
+            self.store.mark_rendering(filename)
+            future = self._executor.submit(render_chart_bytes, predictions, prediction_dates)
+        future.add_done_callback(lambda f: self._finish(filename, f))
+        return filename
+
+    def _finish(self, filename, future):
+        """渲染完成回调：写入图表仓库，失败时记录错误"""
+        try:
+            self.store.put(filename, future.result())
+        except Exception as e:
+            print(f"图表渲染失败 {filename}: {e}")
+            self.store.clear_rendering(filename)
+            with self._lock:
+                self._failed[filename] = str(e)
+                self._failed.move_to_end(filename)
+                while len(self._failed) > self.max_failed:
+                    self._failed.popitem(last=False)
+        finally:
+            with self._lock:
+                done = self._pending.pop(filename, None)
+            if done is not None:
+                done.set()
+
+    def status(self, filename):
+        """图表状态：ready / rendering / failed；未知图表返回 None"""
+        with self._lock:
+            if filename in self._pending:
+                return 'rendering'
+            if filename in self._failed:
+                return 'failed'
+        if self.store.exists(filename):
+            return 'ready'
+        # 其他 worker 正在渲染
+        return 'rendering' if self.store.is_rendering(filename) else None
+
+    def wait(self, filename, timeout, poll_interval=0.05):
+        """等待渲染完成，返回图表是否已就绪；其他 worker 渲染的图表轮询共享目录"""
+        with self._lock:
+            done = self._pending.get(filename)
+        if done is not None:
+            done.wait(timeout)
+            return self.status(filename) == 'ready'
+        deadline = time.monotonic() + timeout
+        while self.status(filename) == 'rendering' and time.monotonic() < deadline:
+            time.sleep(poll_interval)
+        return self.status(filename) == 'ready'
+
+    def stats(self):
+        """渲染统计"""
+        with self._lock:
+            return {
+                'executor': 'processes' if self.use_processes else 'threads',
+                'submitted': self._submitted,
+                'deduplicated': self._deduplicated,
+                'rendering': len(self._pending),
+                'failed': len(self._failed),
+            }
@@ -0,0 +1,276 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# 图表文件名只能是目录下的普通 PNG 文件名，不接受路径分隔符或隐藏文件
+_VALID_NAME = re.compile(r'^[A-Za-z0-9_\-]+\.png$')
+
+
+class ChartStore:
+    """有容量上限的图表仓库
+
+    磁盘上的 PNG 按最近访问顺序索引，文件数、总字节数超出预算或超过 ttl_seconds 未被访问的图表会被删除；
+    最近访问的图表字节同时保存在内存 LRU 缓存中，命中时不读磁盘。
+
+    多个 worker 进程可以共享同一目录：索引中没有的图表会到目录中查找并加入索引；写入新图表时
+    重新扫描目录，纳入其他进程写入的图表、丢弃已被其他进程删除的图表后再按预算淘汰。
+    读取图表时更新文件修改时间，各进程据此共享最近访问时间。
+    正在渲染的图表在目录中留下 .rendering 标记，其他进程据此等待而不是返回 404。
+    """
+
+    def __init__(self, folder, max_files=500, max_bytes=200 * 1024 * 1024, ttl_seconds=7 * 24 * 3600,
+                 memory_max_bytes=32 * 1024 * 1024, rendering_timeout=60):
+        self.folder = folder
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_bytes = memory_max_bytes
+        # 渲染标记超过该时间（秒）视为渲染进程已退出
+        self.rendering_timeout = rendering_timeout
+        # 文件名 -> (字节数, 最后访问时间)，按最近访问排序
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        # 文件名 -> PNG 字节
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._adopted = 0
+        os.makedirs(folder, exist_ok=True)
+        self._scan()
+
+    def _list_charts(self):
+        """列出目录中的图表，返回 [(修改时间, 文件名, 字节数)]；清理残留的临时文件和过期渲染标记"""
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                if name.endswith('.tmp'):
+                    # 其他进程可能正在写入，只清理明显残留的临时文件
+                    if now - os.stat(path).st_mtime > self.rendering_timeout:
+                        os.remove(path)
+                elif name.endswith('.rendering'):
+                    if now - os.stat(path).st_mtime > self.rendering_timeout:
+                        os.remove(path)
+                elif _VALID_NAME.match(name):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, name, stat.st_size))
+            except FileNotFoundError:
+                # 扫描期间被其他进程删除
+                continue
+        return entries
+
+    def _scan(self):
+        """启动时按修改时间索引已有图表，并立即执行一次淘汰"""
+        entries = self._list_charts()
+        with self._lock:
+            for mtime, name, size in sorted(entries):
+                self._index[name] = (size, mtime)
+                self._total_bytes += size
+            self._evict()
+
+    def _refresh(self):
+        """与目录同步：纳入其他进程写入的图表，丢弃已被删除的图表，并采用其他进程更新的访问时间"""
+        entries = {name: (size, mtime) for mtime, name, size in self._list_charts()}
+        with self._lock:
+            for name in list(self._index):
+                if name not in entries:
+                    self._forget(name)
+            for name, (size, mtime) in sorted(entries.items(), key=lambda item: item[1][1]):
+                entry = self._index.get(name)
+                if entry is None:
+                    self._add(name, size, mtime)
+                elif mtime > entry[1]:
+                    self._index[name] = (entry[0], mtime)
+            # 按最后访问时间重新排序
+            self._index = OrderedDict(sorted(self._index.items(), key=lambda item: item[1][1]))
+
+    def path(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def exists(self, filename):
+        with self._lock:
+            if filename in self._index:
+                return True
+        return self._adopt(filename) is not None
+
+    def mark_rendering(self, filename):
+        """在目录中留下渲染标记，其他进程据此知道该图表正在渲染"""
+        if not _VALID_NAME.match(filename):
+            return
+        with open(f"{self.path(filename)}.rendering", 'wb'):
+            pass
+
+    def clear_rendering(self, filename):
+        try:
+            os.remove(f"{self.path(filename)}.rendering")
+        except FileNotFoundError:
+            pass
+
+    def is_rendering(self, filename):
+        """图表是否正在某个进程中渲染（标记存在且未超时）"""
+        if not _VALID_NAME.match(filename):
+            return False
+        try:
+            mtime = os.stat(f"{self.path(filename)}.rendering").st_mtime
+        except FileNotFoundError:
+            return False
+        return time.time() - mtime <= self.rendering_timeout
+
+    def put(self, filename, data):
+        """写入图表（先写临时文件再原子替换），放入内存缓存，与目录同步后按预算淘汰"""
+        path = self.path(filename)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.clear_rendering(filename)
+        self._refresh()
+        with self._lock:
+            previous = self._index.pop(filename, None)
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._index[filename] = (len(data), time.time())
+            self._total_bytes += len(data)
+            self._remember(filename, data)
+            self._evict()
+
+    def _adopt(self, filename):
+        """索引中没有的图表到共享目录中查找（可能由其他进程写入），找到则加入索引并返回 (字节数, 修改时间)"""
+        if not _VALID_NAME.match(filename):
+            return None
+        try:
+            stat = os.stat(self.path(filename))
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > self.ttl_seconds:
+            return None
+        with self._lock:
+            if filename not in self._index:
+                self._add(filename, stat.st_size, stat.st_mtime)
+                self._index.move_to_end(filename)
+                self._adopted += 1
+                self._evict()
+            return self._index.get(filename)
+
+    def get(self, filename):
+        """读取图表字节：先查内存缓存，再读磁盘（包括其他进程写入的图表）；不存在或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(filename)
+        if entry is None and self._adopt(filename) is None:
+            with self._lock:
+                self._misses += 1
+            return None
+        with self._lock:
+            entry = self._index.get(filename)
+            if entry is None:
+                self._misses += 1
+                return None
+            if now - entry[1] > self.ttl_seconds:
+                self._remove(filename)
+                self._misses += 1
+                return None
+            self._index[filename] = (entry[0], now)
+            self._index.move_to_end(filename)
+            data = self._memory.get(filename)
+            if data is not None:
+                self._memory.move_to_end(filename)
+                self._memory_hits += 1
+        if data is not None:
+            self._touch(filename, now)
+            return data
+
+        try:
+            with open(self.path(filename), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            # 已被其他进程淘汰
+            with self._lock:
+                if filename in self._index:
+                    self._forget(filename)
+                self._misses += 1
+            return None
+        self._touch(filename, now)
+        with self._lock:
+            self._disk_hits += 1
+            if filename in self._index:
+                self._remember(filename, data)
+        return data
+
+    def _touch(self, filename, now):
+        """更新文件修改时间，让其他进程看到最近访问"""
+        try:
+            os.utime(self.path(filename), (now, now))
+        except FileNotFoundError:
+            pass
+
+    def _add(self, filename, size, last_access):
+        """加入索引（调用方持有 self._lock）"""
+        self._index[filename] = (size, last_access)
+        self._total_bytes += size
+
+    def _remember(self, filename, data):
+        """放入内存 LRU 缓存（调用方持有 self._lock）"""
+        if len(data) > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(filename, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[filename] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _forget(self, filename):
+        """从索引和内存缓存移除图表，不删除磁盘文件（调用方持有 self._lock）"""
+        size, _ = self._index.pop(filename)
+        self._total_bytes -= size
+        data = self._memory.pop(filename, None)
+        if data is not None:
+            self._memory_bytes -= len(data)
+
+    def _remove(self, filename):
+        """从索引、内存缓存和磁盘删除图表（调用方持有 self._lock）"""
+        self._forget(filename)
+        try:
+            os.remove(self.path(filename))
+        except FileNotFoundError:
+            # 其他进程已删除
+            return
+        self._evictions += 1
+
+    def _evict(self):
+        """删除过期图表，再按最近最少访问顺序删除到预算以内（调用方持有 self._lock）"""
+        expire_before = time.time() - self.ttl_seconds
+        for filename, (_, last_access) in list(self._index.items()):
+            if last_access >= expire_before:
+                break
+            self._remove(filename)
+        while self._index and (len(self._index) > self.max_files or self._total_bytes > self.max_bytes):
+            self._remove(next(iter(self._index)))
+
+    def stats(self):
+        """仓库统计"""
+        with self._lock:
+            return {
+                'files': len(self._index),
+                'bytes': self._total_bytes,
+                'max_files': self.max_files,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'memory_hits': self._memory_hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'adopted': self._adopted,
+            }
@@ -0,0 +1,54 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ForecastCache:
+    """进程内预测结果缓存，键为 (接口, 模型版本, 数据版本, 预测天数)，按 LRU 淘汰"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def etag(key):
+        """由缓存键生成 ETag：键相同则预测结果相同"""
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """读取缓存，未命中返回 None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """写入缓存"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """清空缓存（模型发布或数据变更时调用）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """缓存统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,102 @@
+import threading
+import weakref
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from numpy_lstm import NumpyLSTMModel
+
+# 每个 Keras 模型对应一个编译好的 tf.function，模型释放后自动清除
+_compiled = weakref.WeakKeyDictionary()
+_compiled_lock = threading.Lock()
+# 每个 Keras 模型对应一个 NumPy 推理模型
+_numpy_models = weakref.WeakKeyDictionary()
+
+
+def compiled_predict_fn(model, time_step, n_features):
+    """获取模型的编译推理函数，固定输入签名 (None, time_step, n_features)，避免重复追踪"""
+    with _compiled_lock:
+        fn = _compiled.get(model)
+        if fn is None:
+            import tensorflow as tf
+
+            @tf.function(input_signature=[tf.TensorSpec((None, time_step, n_features), tf.float32)])
+            def fn(x):
+                return model(x, training=False)
+
+            _compiled[model] = fn
+        return fn
+
+
+def numpy_model_for(model):
+    """获取模型对应的 NumPy 推理模型：Keras 模型首次调用时导出权重，之后复用"""
+    if isinstance(model, NumpyLSTMModel):
+        return model
+    with _compiled_lock:
+        numpy_model = _numpy_models.get(model)
+        if numpy_model is None:
+            numpy_model = NumpyLSTMModel.from_keras(model)
+            _numpy_models[model] = numpy_model
+        return numpy_model
+
+
+def scale_features(bundle, X):
+    """按模型包的 MinMaxScaler 归一化特征（直接使用 scale_/min_，跳过 sklearn 的校验开销）"""
+    return X * bundle.scaler_X.scale_ + bundle.scaler_X.min_
+
+
+def inverse_scale_target(bundle, y_scaled):
+    """目标值反归一化"""
+    return (y_scaled - bundle.scaler_y.min_[0]) / bundle.scaler_y.scale_[0]
+
+
+def build_forecast_windows(bundle, last_windows, n_days, future_features=None):
+    """为多个场景一次性构造未来 n_days 步的全部输入窗口
+
+    last_windows: (场景数, time_step, 特征数) 原始特征
+    future_features: 可选 (场景数, n_days, 特征数)，第 j 行为预测第 j+1 天的特征；
+        不提供时沿用最后一天的特征
+    返回 (场景数 * n_days, time_step, 特征数) 的 float32 数组
+    """
+    last_windows = np.asarray(last_windows, dtype=np.float64)
+    n_scenarios, time_step, n_features = last_windows.shape
+
+    # 预分配滚动缓冲区：历史窗口 + 未来 n_days-1 天的特征行
+    buffer = np.empty((n_scenarios, time_step + n_days - 1, n_features), dtype=np.float64)
+    buffer[:, :time_step] = last_windows
+    if n_days > 1:
+        if future_features is None:
+            buffer[:, time_step:] = last_windows[:, -1:, :]
+        else:
+            buffer[:, time_step:] = np.asarray(future_features, dtype=np.float64)[:, :n_days - 1]
+    buffer = scale_features(bundle, buffer)
+
+    # 第 k 步的窗口是缓冲区 [k, k + time_step) 的切片，滑动视图不复制数据
+    windows = sliding_window_view(buffer, time_step, axis=1)      # (场景, n_days, 特征, time_step)
+    windows = windows.transpose(0, 1, 3, 2)                       # (场景, n_days, time_step, 特征)
+    return windows.reshape(n_scenarios * n_days, time_step, n_features).astype(np.float32)
+
+
+def predict_windows(bundle, x):
+    """对 (样本数, time_step, 特征数) 的归一化窗口执行一次前向传播，返回 (样本数,) 的归一化预测值"""
+    if isinstance(bundle.model, NumpyLSTMModel):
+        return bundle.model(x).reshape(-1)
+    fn = compiled_predict_fn(bundle.model, x.shape[1], x.shape[2])
+    return np.asarray(fn(x)).reshape(-1)
+
+
+def predict_windows_numpy(bundle, x):
+    """与 predict_windows 相同，但 Keras 模型也转换为 NumPy 推理模型执行，不经过 TensorFlow"""
+    return numpy_model_for(bundle.model)(x).reshape(-1)
+
+
+def forecast_batch(bundle, last_windows, n_days, future_features=None, predict=predict_windows):
+    """单次前向传播完成多个场景的多步预测，返回 (场景数, n_days) 的非负预测值
+
+    predict 可替换为请求合并器的 submit，把多个并发请求合并到同一次前向传播
+    """
+    last_windows = np.asarray(last_windows)
+    n_scenarios = last_windows.shape[0]
+    x = build_forecast_windows(bundle, last_windows, n_days, future_features)
+    y_scaled = np.asarray(predict(bundle, x)).reshape(n_scenarios, n_days)
+    return np.maximum(inverse_scale_target(bundle, y_scaled), 0)
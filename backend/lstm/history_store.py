@@ -0,0 +1,221 @@
+import os
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class HistoryStore:
+    """按日期索引的列式历史数据仓库
+
+    数据以内存映射的原始 NumPy 文件保存：ds.bin 为按日期升序的天数（int64），
+    values.bin 为 (容量, 列数) 的 float64 行优先矩阵。追加只写新行，扩容通过扩展文件完成，
+    按 ds 更新只改对应行，不会重新扫描或重写整段历史。
+
+    只有追加到末尾是崩溃安全的：新行落盘后才原子更新元数据中的行数，崩溃时读者看不到半写的行。
+    更新已有日期和早于末尾的新日期（尾部合并）会原地改写已提交的行，没有日志，
+    写入中途崩溃可能留下部分更新的行。frame() 返回的视图也会随这些写入变化，需要稳定数据时使用 snapshot()。
+    """
+
+    META_FILE = 'meta.json'
+    DS_FILE = 'ds.bin'
+    VALUES_FILE = 'values.bin'
+
+    def __init__(self, root, initial_capacity=1024):
+        self.root = root
+        self.initial_capacity = initial_capacity
+        self._meta = None
+        self._ds = None
+        self._values = None
+        self._lock = threading.Lock()
+
+    def exists(self):
+        """仓库是否已创建"""
+        return os.path.isfile(os.path.join(self.root, self.META_FILE))
+
+    def create(self, columns, feature_cols):
+        """创建空仓库；columns 为除 ds 外的全部数值列"""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            self._meta = {
+                'columns': list(columns),
+                'feature_cols': list(feature_cols),
+                'n_rows': 0,
+                'capacity': 0,
+                'version': 0,
+            }
+            for name in (self.DS_FILE, self.VALUES_FILE):
+                open(os.path.join(self.root, name), 'wb').close()
+            self._ensure_capacity(self.initial_capacity)
+            self._write_meta()
+
+    def _open(self):
+        """首次访问时打开内存映射"""
+        if self._meta is not None:
+            return
+        with open(os.path.join(self.root, self.META_FILE), 'r', encoding='utf-8') as f:
+            self._meta = json.load(f)
+        self._map()
+
+    def reload(self):
+        """其他进程写入后重新读取元数据并重新映射，返回数据是否发生了变化"""
+        if not self.exists():
+            return False
+        with open(os.path.join(self.root, self.META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with self._lock:
+            if self._meta is not None and meta['version'] == self._meta['version']:
+                return False
+            self._meta = meta
+            self._map()
+            return True
+
+    def _map(self):
+        """按当前容量映射数据文件"""
+        capacity = self._meta['capacity']
+        n_cols = len(self._meta['columns'])
+        self._ds = np.memmap(os.path.join(self.root, self.DS_FILE), dtype=np.int64,
+                             mode='r+', shape=(capacity,))
+        self._values = np.memmap(os.path.join(self.root, self.VALUES_FILE), dtype=np.float64,
+                                 mode='r+', shape=(capacity, n_cols))
+
+    def _ensure_capacity(self, needed):
+        """容量不足时按倍数扩展文件（行优先布局下扩容只需在文件末尾追加）"""
+        capacity = self._meta['capacity']
+        if needed <= capacity and self._values is not None:
+            return
+        new_capacity = max(needed, capacity * 2, self.initial_capacity)
+        n_cols = len(self._meta['columns'])
+        os.truncate(os.path.join(self.root, self.DS_FILE), new_capacity * 8)
+        os.truncate(os.path.join(self.root, self.VALUES_FILE), new_capacity * n_cols * 8)
+        self._meta['capacity'] = new_capacity
+        self._map()
+
+    def _write_meta(self):
+        """原子写入元数据（行数在数据落盘后才更新，崩溃时不会读到半写的行）"""
+        path = os.path.join(self.root, self.META_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @property
+    def columns(self):
+        self._open()
+        return list(self._meta['columns'])
+
+    @property
+    def feature_cols(self):
+        self._open()
+        return list(self._meta['feature_cols'])
+
+    @property
+    def n_rows(self):
+        self._open()
+        return self._meta['n_rows']
+
+    @property
+    def version(self):
+        self._open()
+        return self._meta['version']
+
+    @staticmethod
+    def _readonly(array):
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def dates(self):
+        """日期列（距 1970-01-01 的天数）的只读视图"""
+        self._open()
+        return self._readonly(self._ds[:self._meta['n_rows']])
+
+    def values(self):
+        """全部数值列的只读视图 (行数, 列数)"""
+        self._open()
+        return self._readonly(self._values[:self._meta['n_rows']])
+
+    def column(self, name):
+        """单列的只读视图"""
+        return self.values()[:, self.columns.index(name)]
+
+    def features(self, feature_cols=None):
+        """特征矩阵：特征列在存储中连续时返回零拷贝视图"""
+        columns = self.columns
+        idx = [columns.index(c) for c in (feature_cols or self.feature_cols)]
+        values = self.values()
+        if idx == list(range(idx[0], idx[0] + len(idx))):
+            return values[:, idx[0]:idx[0] + len(idx)]
+        return values[:, idx]
+
+    def frame(self):
+        """以 DataFrame 形式返回当前数据，数值列直接引用内存映射，不复制"""
+        values = self.values()
+        df = pd.DataFrame(values, columns=self.columns, copy=False)
+        df.insert(0, 'ds', pd.to_datetime(self.dates().astype('datetime64[D]')))
+        return df
+
+    def snapshot(self):
+        """在写锁内复制当前数据，返回与内存映射无关的 DataFrame，之后的写入不会改变它"""
+        self._open()
+        with self._lock:
+            return self.frame().copy()
+
+    def upsert(self, df):
+        """按 ds 追加或更新行，返回 {'inserted': 新增行数, 'updated': 更新行数, 'first_row': 第一个发生变化的行号}
+
+        只写入 df 中提供的列；新增行中缺失的列为 NaN。日期晚于现有数据的行直接追加到末尾，
+        早于末尾的新日期只重排插入点之后的尾部。
+        """
+        self._open()
+        columns = self._meta['columns']
+        provided = [c for c in df.columns if c in columns]
+        col_idx = [columns.index(c) for c in provided]
+
+        # 新数据按日期排序去重，同一日期以最后一行为准
+        ds = pd.to_datetime(df['ds']).values.astype('datetime64[D]').astype(np.int64)
+        order = np.argsort(ds, kind='stable')
+        ds = ds[order]
+        keep = np.append(ds[1:] != ds[:-1], True)
+        ds = ds[keep]
+        new_values = df[provided].to_numpy(dtype=np.float64, na_value=np.nan)[order][keep]
+
+        with self._lock:
+            n = self._meta['n_rows']
+            first_row = n
+            existing = self._ds[:n]
+            pos = np.searchsorted(existing, ds)
+            found = pos < n
+            found[found] = existing[pos[found]] == ds[found]
+
+            # 已存在的日期：原地更新提供的列
+            if found.any():
+                self._values[np.ix_(pos[found], col_idx)] = new_values[found]
+                first_row = int(pos[found].min())
+
+            # 新日期：追加或尾部合并
+            ins_ds = ds[~found]
+            m = len(ins_ds)
+            if m:
+                ins_values = np.full((m, len(columns)), np.nan)
+                ins_values[:, col_idx] = new_values[~found]
+                self._ensure_capacity(n + m)
+                first = int(np.searchsorted(self._ds[:n], ins_ds[0]))
+                first_row = min(first_row, first)
+                if first == n:
+                    self._ds[n:n + m] = ins_ds
+                    self._values[n:n + m] = ins_values
+                else:
+                    merged_ds = np.concatenate([self._ds[first:n], ins_ds])
+                    merged_values = np.concatenate([self._values[first:n], ins_values])
+                    merge_order = np.argsort(merged_ds, kind='stable')
+                    self._ds[first:n + m] = merged_ds[merge_order]
+                    self._values[first:n + m] = merged_values[merge_order]
+
+            self._ds.flush()
+            self._values.flush()
+            self._meta['n_rows'] = n + m
+            self._meta['version'] += 1
+            self._write_meta()
+        return {'inserted': int(m), 'updated': int(found.sum()), 'first_row': first_row}
@@ -0,0 +1,247 @@
+"""独立推理进程：加载训练进程导出的 SavedModel，预热后通过本地套接字为 Flask 提供预测
+
+启动: python inference_server.py --address 127.0.0.1:6001 [--engine numpy]
+Flask 端设置环境变量 INFERENCE_SERVER=127.0.0.1:6001 后，预测请求转发到该进程，训练仍在 Flask 进程中进行。
+两端必须设置相同的 INFERENCE_AUTHKEY（例如 python -c "import secrets; print(secrets.token_hex(32))" 生成），
+未设置时拒绝启动；服务只监听本机回环地址。
+--engine numpy 时使用纯 NumPy 推理引擎（见 numpy_lstm.py），推理进程不导入 TensorFlow。
+"""
+import os
+import sys
+import ipaddress
+import time
+import argparse
+import threading
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+from model_store import ModelStore
+from model_bundle import ModelBundle
+from forecasting import forecast_batch, predict_windows
+from batching import RequestCoalescer
+
+# 本地套接字的认证密钥环境变量（消息使用 pickle 传输，知道密钥即可在推理进程中执行任意代码，没有默认值）
+AUTHKEY_ENV = 'INFERENCE_AUTHKEY'
+# 密钥最短长度（字节）
+MIN_AUTHKEY_BYTES = 16
+# 预热使用的批大小
+WARMUP_BATCH_SIZES = (1, 7, 30)
+
+
+def parse_address(address):
+    """解析 host:port"""
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def load_authkey():
+    """读取认证密钥；未设置或过短时报错，不退回公开的默认密钥"""
+    authkey = os.environ.get(AUTHKEY_ENV, '').encode('utf-8')
+    if len(authkey) < MIN_AUTHKEY_BYTES:
+        raise RuntimeError(f"未设置 {AUTHKEY_ENV} 或长度不足 {MIN_AUTHKEY_BYTES} 字节，拒绝启动推理服务连接")
+    return authkey
+
+
+def check_loopback(host):
+    """推理服务只允许监听本机回环地址"""
+    if host == 'localhost':
+        return
+    try:
+        if ipaddress.ip_address(host).is_loopback:
+            return
+    except ValueError:
+        pass
+    raise RuntimeError(f"推理服务只能监听本机回环地址，拒绝监听 {host}")
+
+
+class InferencePredictor:
+    """推理角色：只加载模型包并执行预测，不持有历史数据、不训练"""
+
+    def __init__(self, model_store_dir, max_batch_size=32, max_wait_ms=3.0, engine='tensorflow', max_batch_rows=256):
+        self.model_store = ModelStore(model_store_dir)
+        self.engine = engine
+        self._bundle = None
+        self._lock = threading.Lock()
+        # 各连接线程的并发请求合并为批量前向传播
+        self.coalescer = RequestCoalescer(predict_windows, max_batch_size, max_wait_ms, max_batch_rows)
+
+    @property
+    def bundle(self):
+        return self._bundle
+
+    def load(self, version=None):
+        """加载指定版本（默认最新版本），预热后原子替换"""
+        artifact = self.model_store.load_serving(version, engine=self.engine)
+        if artifact is None:
+            raise RuntimeError("模型仓库中没有可用版本")
+        bundle = ModelBundle(
+            model=artifact['model'],
+            scaler_X=artifact['scaler_X'],
+            scaler_y=artifact['scaler_y'],
+            feature_cols=tuple(artifact['feature_cols']),
+            time_step=artifact['time_step'],
+            model_metrics=artifact['model_metrics'],
+            last_training_time=artifact.get('last_training_time'),
+            version=artifact['version'],
+            data_hash=artifact['data_hash'],
+            incremental_updates=artifact.get('incremental_updates', 0),
+        )
+        self.warm_up(bundle)
+        with self._lock:
+            self._bundle = bundle
+        print(f"推理进程已加载模型版本 {bundle.version}（{artifact['engine']}）")
+        return bundle.version
+
+    @staticmethod
+    def warm_up(bundle):
+        """用不同批大小预先执行推理，完成图追踪和内核初始化"""
+        start = time.perf_counter()
+        window = np.zeros((1, bundle.time_step, len(bundle.feature_cols)))
+        for n_days in WARMUP_BATCH_SIZES:
+            forecast_batch(bundle, window, n_days)
+        print(f"模型预热完成，用时 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def forecast(self, last_windows, n_days, future_features=None):
+        """批量多步预测"""
+        bundle = self._bundle
+        predictions = forecast_batch(bundle, last_windows, n_days, future_features, predict=self.coalescer.submit)
+        return {'predictions': predictions, 'model_version': bundle.version}
+
+
+class InferenceServer:
+    """本地套接字服务：每个连接一个线程，请求为 dict 消息"""
+
+    def __init__(self, predictor, address):
+        check_loopback(address[0])
+        self.predictor = predictor
+        self.address = address
+        self.authkey = load_authkey()
+
+    def handle(self, message):
+        """处理一条请求"""
+        op = message.get('op')
+        if op == 'forecast':
+            return self.predictor.forecast(message['last_windows'], message['n_days'],
+                                           message.get('future_features'))
+        if op == 'reload':
+            return {'model_version': self.predictor.load(message.get('version'))}
+        if op == 'info':
+            bundle = self.predictor.bundle
+            return bundle.info() if bundle else {}
+        if op == 'stats':
+            return self.predictor.coalescer.stats()
+        if op == 'ping':
+            return {'status': 'ok'}
+        raise ValueError(f"未知请求: {op}")
+
+    def serve_connection(self, conn):
+        """处理一个连接上的全部请求"""
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send({'ok': True, 'result': self.handle(message)})
+                except Exception as e:
+                    conn.send({'ok': False, 'error': str(e)})
+
+    def serve_forever(self):
+        """接受连接"""
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"推理服务已启动: {self.address[0]}:{self.address[1]}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self.serve_connection, args=(conn,), daemon=True).start()
+
+
+class ModelVersionMismatch(RuntimeError):
+    """推理进程加载的模型版本与调用方期望的版本不一致"""
+
+    def __init__(self, expected, actual):
+        super().__init__(f"推理服务模型版本 {actual} 与期望版本 {expected} 不一致")
+        self.expected = expected
+        self.actual = actual
+
+
+class InferenceClient:
+    """Flask 端的推理客户端，每个线程一个连接
+
+    timeout 为预测等普通请求的超时（秒）；reload 需要加载模型并预热，使用更长的 reload_timeout。
+    """
+
+    def __init__(self, address, timeout=5.0, reload_timeout=120.0):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.timeout = timeout
+        self.reload_timeout = reload_timeout
+        self.authkey = load_authkey()
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def call(self, op, timeout=None, **kwargs):
+        """发送请求并等待结果（默认超时 self.timeout）；连接异常时关闭连接，下次调用重连"""
+        conn = self._connection()
+        try:
+            conn.send(dict(op=op, **kwargs))
+            if not conn.poll(self.timeout if timeout is None else timeout):
+                raise TimeoutError(f"推理服务响应超时: {op}")
+            reply = conn.recv()
+        except Exception:
+            self._local.conn = None
+            conn.close()
+            raise
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def forecast_batch(self, last_windows, n_days, future_features=None, expected_version=None):
+        """远程批量预测，返回 (场景数, n_days) 数组；
+        指定 expected_version 时推理进程的模型版本不一致则抛出 ModelVersionMismatch"""
+        result = self.call('forecast', last_windows=np.asarray(last_windows, dtype=np.float64),
+                           n_days=n_days, future_features=future_features)
+        if expected_version is not None and result.get('model_version') != expected_version:
+            raise ModelVersionMismatch(expected_version, result.get('model_version'))
+        return result['predictions']
+
+    def reload(self, version=None):
+        """通知推理进程加载新版本（超时 reload_timeout）"""
+        return self.call('reload', timeout=self.reload_timeout, version=version)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LSTM 独立推理服务')
+    parser.add_argument('--address', default=os.environ.get('INFERENCE_SERVER', '127.0.0.1:6001'))
+    parser.add_argument('--model-store', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_store'))
+    parser.add_argument('--version', default=None, help='启动时加载的模型版本，默认最新')
+    parser.add_argument('--max-batch-size', type=int, default=32, help='每批最多合并的请求数')
+    parser.add_argument('--max-batch-rows', type=int, default=256, help='每批最多合并的样本行数')
+    parser.add_argument('--max-wait-ms', type=float, default=3.0, help='合并请求的最长等待时间（毫秒）')
+    parser.add_argument('--engine', choices=('tensorflow', 'numpy'),
+                        default=os.environ.get('INFERENCE_ENGINE', 'tensorflow'), help='推理引擎')
+    args = parser.parse_args()
+
+    predictor = InferencePredictor(args.model_store, args.max_batch_size, args.max_wait_ms, args.engine,
+                                   args.max_batch_rows)
+    try:
+        server = InferenceServer(predictor, parse_address(args.address))
+    except RuntimeError as e:
+        print(f"推理服务启动失败: {e}")
+        sys.exit(1)
+    try:
+        predictor.load(args.version)
+    except Exception as e:
+        print(f"推理进程加载模型失败: {e}")
+        sys.exit(1)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
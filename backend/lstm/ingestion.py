@@ -0,0 +1,153 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# 每个数据块的行数，决定导入时的内存上限
+CHUNK_ROWS = 10000
+
+
+def iter_csv_chunks(path, chunksize=CHUNK_ROWS):
+    """按块读取CSV"""
+    with pd.read_csv(path, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def iter_xlsx_chunks(path, chunksize=CHUNK_ROWS):
+    """通过 openpyxl 只读模式逐行读取 .xlsx，按块产出"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else '' for h in header]
+        buffer = []
+        for row in rows:
+            if row is None or all(v is None for v in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_xls_chunks(path, chunksize=CHUNK_ROWS):
+    """旧版 .xls 没有流式读取器，整表读取后按块产出（需要 xlrd）"""
+    df = pd.read_excel(path)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def iter_chunks(path, chunksize=CHUNK_ROWS):
+    """根据扩展名选择分块读取器"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xlsx':
+        return iter_xlsx_chunks(path, chunksize)
+    if ext == '.xls':
+        return iter_xls_chunks(path, chunksize)
+    return iter_csv_chunks(path, chunksize)
+
+
+def missing_columns(chunk, feature_cols=()):
+    """数据块缺少的必需列（ds、y 和全部特征列）"""
+    return [col for col in ['ds', 'y', *feature_cols] if col not in chunk.columns]
+
+
+def validate_chunk(chunk, columns, feature_cols=()):
+    """校验并清洗一个数据块，返回 (清洗后的数据块, 丢弃行数)
+
+    数值列转为数值（TRUE/FALSE 转为 1/0）；ds 无法解析、y 或任一特征列不是有限数值的行被丢弃，
+    不会把 NaN 写入历史数据
+    """
+    chunk = chunk.copy()
+    chunk['ds'] = pd.to_datetime(chunk['ds'], errors='coerce')
+    for col in [c for c in chunk.columns if c in columns]:
+        values = chunk[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            # 文本列（object 或 pandas 的字符串类型）先转为 object，布尔文本才能替换为数值
+            values = values.astype(object).replace({'TRUE': 1, 'FALSE': 0, 'True': 1, 'False': 0, True: 1, False: 0})
+        chunk[col] = pd.to_numeric(values, errors='coerce')
+    valid = chunk['ds'].notna() & chunk['y'].notna() & np.isfinite(chunk['y'])
+    if len(feature_cols):
+        valid &= np.isfinite(chunk[list(feature_cols)].to_numpy(dtype=np.float64, na_value=np.nan)).all(axis=1)
+    return chunk[valid], int((~valid).sum())
+
+
+def missing_columns_message(missing):
+    return f"数据文件缺少列: {', '.join(missing)}"
+
+
+def check_file(path, feature_cols=(), chunksize=1000):
+    """上传时的快速检查（不写入历史数据）：文件包含 ds、y 和全部特征列且至少有一行数据时返回 None，否则返回错误信息"""
+    chunks = iter_chunks(path, chunksize)
+    try:
+        for chunk in chunks:
+            missing = missing_columns(chunk, feature_cols)
+            if missing:
+                return missing_columns_message(missing)
+            if len(chunk):
+                return None
+    except pd.errors.EmptyDataError:
+        pass
+    finally:
+        chunks.close()
+    return "数据文件没有数据行"
+
+
+def ingest_file(path, history, chunksize=CHUNK_ROWS):
+    """分块读取数据文件并逐块写入历史数据仓库，内存占用只与块大小有关"""
+    start = time.perf_counter()
+    columns = history.columns
+    feature_cols = history.feature_cols
+    rows_ingested = rows_rejected = inserted = updated = chunks = 0
+    first_row = history.n_rows
+    date_start = date_end = None
+
+    for chunk in iter_chunks(path, chunksize):
+        # 缺少特征列时 upsert 会写入 NaN，整个文件拒绝
+        missing = missing_columns(chunk, feature_cols)
+        if missing:
+            return {"status": "error", "message": missing_columns_message(missing)}
+        chunks += 1
+        chunk, rejected = validate_chunk(chunk, columns, feature_cols)
+        rows_rejected += rejected
+        if len(chunk):
+            counts = history.upsert(chunk)
+            inserted += counts['inserted']
+            updated += counts['updated']
+            first_row = min(first_row, counts['first_row'])
+            rows_ingested += len(chunk)
+            chunk_start, chunk_end = chunk['ds'].min(), chunk['ds'].max()
+            date_start = chunk_start if date_start is None else min(date_start, chunk_start)
+            date_end = chunk_end if date_end is None else max(date_end, chunk_end)
+
+    elapsed = time.perf_counter() - start
+    if chunks == 0:
+        return {"status": "error", "message": "数据文件为空"}
+    if rows_ingested == 0:
+        return {"status": "error", "message": f"数据文件没有有效的数据行（丢弃 {rows_rejected} 行）",
+                "rows_ingested": 0, "rows_rejected": rows_rejected}
+    rows_per_second = rows_ingested / elapsed if elapsed > 0 else float(rows_ingested)
+    print(f"导入完成: {rows_ingested} 行（丢弃 {rows_rejected} 行），{chunks} 个数据块，{rows_per_second:.0f} 行/秒")
+    return {
+        "status": "success",
+        "rows_ingested": rows_ingested,
+        "rows_rejected": rows_rejected,
+        "inserted": inserted,
+        "updated": updated,
+        "chunks": chunks,
+        "first_row": first_row,
+        "date_start": date_start.strftime('%Y-%m-%d') if date_start is not None else None,
+        "date_end": date_end.strftime('%Y-%m-%d') if date_end is not None else None,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(rows_per_second, 1),
+    }
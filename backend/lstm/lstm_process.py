@@ -1,54 +1,132 @@
 import numpy as np
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout, Bidirectional
-import math
-from datetime import datetime, timedelta
+from tensorflow.keras.callbacks import LambdaCallback
+from datetime import datetime
 import os
-import json
+import time
+import threading
+from dataclasses import replace
+from model_store import ModelStore
+from model_bundle import ModelBundle
+from forecasting import forecast_batch, scale_features
+from forecast_cache import ForecastCache
+from windowing import make_windows
+from history_store import HistoryStore
+from ingestion import ingest_file
+from stats_index import StatsIndex
+from process_lock import ProcessLock
+from inference_server import ModelVersionMismatch
+from training import (Checkpointer, TrainingConfig, TrainingProgress, build_model, evaluate_model, feature_columns,
+                      fit_model, load_csv, prepare_data, windowed_dataset)
+
+# 模型仓库和历史数据仓库默认位于本模块目录下
+MODEL_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_store')
+HISTORY_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history_store')
+# 推理引擎（与 app.py、inference_server.py 读取同一环境变量），决定独立推理进程加载的导出格式
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'tensorflow')
+# 训练配置文件（JSON，字段见 training.TrainingConfig），未设置时使用默认的双向 LSTM、50 轮
+TRAINING_CONFIG_PATH = os.environ.get('TRAINING_CONFIG')
 
 class LSTMPredictor:
-    def __init__(self, data_path='more_train.csv'):
-        """初始化"""
+    def __init__(self, data_path='more_train.csv', model_store_dir=MODEL_STORE_DIR,
+                 history_store_dir=HISTORY_STORE_DIR, inference_client=None, coalescer=None,
+                 training_config=None):
+        """初始化；传入 inference_client 时预测由独立推理进程完成，本进程只负责数据和训练；
+        传入 coalescer 时并发的本地推理请求合并为批量前向传播；training_config 为 TrainingConfig（网络结构、轮数等）"""
         self.data_path = data_path
-        self.model = None
-        self.scaler_X = MinMaxScaler(feature_range=(0, 1))
-        self.scaler_y = MinMaxScaler(feature_range=(0, 1))
-        self.time_step = 10
+        self.inference_client = inference_client
+        # 正在后台通知推理进程加载的版本，同一版本只通知一次
+        self._inference_reloading = None
+        self._inference_reload_lock = threading.Lock()
+        self.coalescer = coalescer
+        # 持久化的列式历史数据，重启后保留所有上传
+        self.history = HistoryStore(history_store_dir)
+        # 客流量统计索引，随历史数据写入增量更新
+        self.stats_index = StatsIndex()
+        if training_config is None:
+            training_config = TrainingConfig.load(TRAINING_CONFIG_PATH) if TRAINING_CONFIG_PATH else TrainingConfig()
+        self.training_config = training_config
+        # 增量更新参数：回放最近 replay_window 天，训练 fine_tune_epochs 轮
+        self.replay_window = 60
+        self.fine_tune_epochs = 5
+        self.fine_tune_learning_rate = 1e-4
+        # 全量重训策略：累计增量次数上限、漂移容忍度、误差恶化倍数
+        self.max_incremental_updates = 20
+        self.drift_tolerance = 0.2
+        self.max_mse_degradation = 1.5
         self.feature_cols = None
+        # 预测结果缓存，模型发布或数据变更时失效
+        self.forecast_cache = ForecastCache()
+        # 数据不来自历史数据仓库时的进程内数据版本；来自仓库时使用仓库持久化的版本（见 data_version）
+        self._data_revision = 0
+        self._history_version = None
+        # df 是历史数据仓库的 DataFrame 视图，每次写入后整体替换
         self.df = None
-        self.model_metrics = {}
-        self.last_training_time = None
-        self.charts_folder = 'charts'
-        
-        # 确保图表目录存在
-        os.makedirs(self.charts_folder, exist_ok=True)
-       
-        self.load_and_prepare_data()
-        self.build_and_train_model()
+        # 只有配置了独立推理进程时才随每个版本导出它加载的格式，其余格式首次加载时再生成，增量更新的保存不额外写盘
+        export_formats = ()
+        if inference_client is not None:
+            export_formats = (ModelStore.EXPORT_NUMPY if INFERENCE_ENGINE == 'numpy' else ModelStore.EXPORT_SAVED_MODEL,)
+        self.model_store = ModelStore(model_store_dir, export_formats)
+        # 多个 worker 进程共享仓库：写锁只在修改历史数据、复制训练快照和保存发布模型时持有，
+        # 其他 worker 启动和同步不会被训练阻塞；训练锁让各进程的训练串行执行（共用检查点），先取训练锁再取写锁
+        self.write_lock = ProcessLock(os.path.join(model_store_dir, '.write.lock'))
+        self.train_lock = ProcessLock(os.path.join(model_store_dir, '.train.lock'))
+        # 本进程最近一次加载或保存的仓库版本，用于发现其他进程发布的新版本
+        self._store_version = None
+        # 当前服务的模型包和上一个模型包（用于回滚），发布时整体替换引用
+        self._bundle = None
+        self._previous_bundle = None
+        self._publish_lock = threading.Lock()
+        # 训练线程私有的已编译模型 (模型版本, 模型)，增量更新复用它以避免重复追踪训练图
+        self._trainer = None
+
+        with self.write_lock:
+            self.load_and_prepare_data()
+            # 优先从模型仓库热启动，仅在没有匹配版本时训练
+            loaded = self.load_from_store()
+        if not loaded:
+            with self.train_lock:
+                # 等待训练锁期间其他进程可能已训练并保存了匹配当前数据的版本
+                with self.write_lock:
+                    if self.history.reload():
+                        self.refresh_from_history()
+                    loaded = self.load_from_store()
+                if not loaded:
+                    self.build_and_train_model()
     
+    @property
+    def time_step(self):
+        return self.training_config.time_step
+
+    @property
+    def epochs(self):
+        return self.training_config.epochs
+
     def load_and_prepare_data(self):
-        """加载和准备数据"""
+        """加载和准备数据：优先打开历史数据仓库，仓库不存在时从CSV导入"""
+        if self.history.exists():
+            self.feature_cols = self.history.feature_cols
+            self.refresh_from_history()
+            print(f"从历史数据仓库加载数据，共 {len(self.df)} 行，{len(self.feature_cols)} 个特征")
+            return
+        
         try:
             if os.path.exists(self.data_path):
-                self.df = pd.read_csv(self.data_path)
+                self.df = load_csv(self.data_path)
             else:
-                alt_path = os.path.join('backend', self.data_path)
-                if os.path.exists(alt_path):
-                    self.df = pd.read_csv(alt_path)
+                candidates = [
+                    os.path.join('backend', self.data_path),
+                    os.path.join(os.path.dirname(os.path.abspath(__file__)), self.data_path),
+                ]
+                alt_path = next((p for p in candidates if os.path.exists(p)), None)
+                if alt_path:
+                    self.df = load_csv(alt_path)
                     self.data_path = alt_path
                 else:
                     raise FileNotFoundError(f"数据文件不存在: {self.data_path}")
             
-            self.df['ds'] = pd.to_datetime(self.df['ds'])
-            
             # 确定特征列（从第3列到第28列，共25个特征）
-            self.feature_cols = self.df.columns[3:28].tolist()
+            self.feature_cols = feature_columns(self.df)
             
             print(f"成功加载数据，共 {len(self.df)} 行，{len(self.feature_cols)} 个特征")
             print(f"数据时间范围: {self.df['ds'].min()} 至 {self.df['ds'].max()}")
@@ -57,6 +135,11 @@ class LSTMPredictor:
             print(f"数据加载失败: {e}")
             # 创建示例数据用于演示
             self.create_sample_data()
+        
+        # 导入历史数据仓库，之后以仓库为准
+        self.history.create([c for c in self.df.columns if c != 'ds'], self.feature_cols)
+        self.history.upsert(self.df)
+        self.refresh_from_history()
     
     def create_sample_data(self):
         """创建示例数据（用于演示）"""
@@ -74,161 +157,549 @@ class LSTMPredictor:
         self.feature_cols = [f'feature_{i}' for i in range(25)]
         print("使用示例数据进行演示")
     
-    def build_and_train_model(self):
-        """构建和训练LSTM模型 - 修复准确率计算"""
+    @property
+    def df(self):
+        """历史数据快照"""
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        # 每次替换数据都生成新的数据版本，并使预测缓存失效
+        self._df = value
+        self._data_revision += 1
+        self._history_version = None
+        self.forecast_cache.invalidate()
+
+    @property
+    def data_version(self):
+        """数据版本：数据来自历史数据仓库时为仓库持久化的版本号，各 worker 加载了相同数据时版本相同；
+        否则为只在本进程内有效的版本"""
+        if self._history_version is not None:
+            return f"h{self._history_version}"
+        return f"local-{os.getpid()}-{self._data_revision}"
+
+    def refresh_from_history(self, first_row=0):
+        """历史数据写入后刷新 DataFrame 视图和统计索引（索引只重算 first_row 行之后的部分）"""
+        self.stats_index.update(self.history, first_row)
+        self.df = self.history.frame()
+        self._history_version = self.history.version
+
+    def training_snapshot(self):
+        """训练用的数据副本：数据来自历史数据仓库时在仓库写锁内复制，否则复制当前 DataFrame"""
+        if self.history.exists():
+            return self.history.snapshot()
+        return self.df.copy()
+
+    def locked_training_snapshot(self):
+        """在跨进程写锁内先同步其他进程写入的历史数据，再复制训练快照；训练本身在锁外进行"""
+        with self.write_lock:
+            if self.history.reload():
+                self.refresh_from_history()
+            return self.training_snapshot()
+
+    def cache_key(self, kind, n_days):
+        """预测缓存键：(接口, 模型版本, 数据版本, 预测天数)，模型版本和数据版本都是持久化的，多个 worker 之间一致"""
+        return (kind, self.model_version, self.data_version, n_days)
+
+    @property
+    def bundle(self):
+        """当前服务的模型包（读取无需加锁）"""
+        return self._bundle
+
+    @property
+    def model(self):
+        bundle = self._bundle
+        return bundle.model if bundle else None
+
+    @property
+    def scaler_X(self):
+        bundle = self._bundle
+        return bundle.scaler_X if bundle else None
+
+    @property
+    def scaler_y(self):
+        bundle = self._bundle
+        return bundle.scaler_y if bundle else None
+
+    @property
+    def model_metrics(self):
+        bundle = self._bundle
+        return bundle.model_metrics if bundle else {}
+
+    @property
+    def last_training_time(self):
+        bundle = self._bundle
+        return bundle.last_training_time if bundle else None
+
+    @property
+    def model_version(self):
+        bundle = self._bundle
+        return bundle.version if bundle else None
+
+    def publish(self, bundle):
+        """原子发布新模型包，旧模型包保留用于回滚"""
+        with self._publish_lock:
+            self._previous_bundle = self._bundle
+            self._bundle = bundle
+        self.forecast_cache.invalidate()
+        print(f"已发布模型版本 {bundle.version}")
+        self.notify_inference_server(bundle)
+
+    def serves_remotely(self, bundle):
+        """该模型包能否由独立推理进程提供预测（只有保存到仓库的版本能被推理进程加载）"""
+        return self.inference_client is not None and not bundle.is_fallback and bundle.version.startswith('v')
+
+    def notify_inference_server(self, bundle):
+        """通知独立推理进程加载与本进程一致的模型版本"""
+        if not self.serves_remotely(bundle):
+            return
         try:
-            # 划分训练/测试集
-            train_size = int(len(self.df) * 0.7)
-            train_df = self.df.iloc[:train_size].copy()
-            test_df = self.df.iloc[train_size:].copy()
-            
-            # 准备数据
-            X_train = train_df[self.feature_cols].values
-            y_train = train_df['y'].values.reshape(-1, 1)
-            X_test = test_df[self.feature_cols].values
-            y_test = test_df['y'].values.reshape(-1, 1)
-            
-            # 数据归一化
-            X_train_scaled = self.scaler_X.fit_transform(X_train)
-            y_train_scaled = self.scaler_y.fit_transform(y_train)
-            X_test_scaled = self.scaler_X.transform(X_test)
-            y_test_scaled = self.scaler_y.transform(y_test)
-            
-            # 构建LSTM样本
-            x_train_lstm, y_train_lstm = self.make_dataset(X_train_scaled, y_train_scaled, self.time_step)
-            x_test_lstm, y_test_lstm = self.make_dataset(X_test_scaled, y_test_scaled, self.time_step)
-            
-            # 构建模型
-            self.model = Sequential([
-                Bidirectional(LSTM(128, return_sequences=True), input_shape=(self.time_step, len(self.feature_cols))),
-                Dropout(0.25),
-                Bidirectional(LSTM(64, return_sequences=False)),
-                Dropout(0.2),
-                Dense(1)
-            ])
-            
-            self.model.compile(optimizer='adam', loss='mse')
-            
-            # 训练模型
-            history = self.model.fit(
-                x_train_lstm, y_train_lstm,
-                epochs=50,
-                batch_size=32,
-                verbose=0,
-                validation_data=(x_test_lstm, y_test_lstm)
-            )
-            
+            self.inference_client.reload(bundle.version)
+        except Exception as e:
+            print(f"通知推理服务加载版本 {bundle.version} 失败: {e}")
+
+    def reload_inference_server(self, bundle):
+        """在后台线程中通知推理进程加载 bundle 的版本，加载和预热期间不阻塞预测请求"""
+        with self._inference_reload_lock:
+            if self._inference_reloading == bundle.version:
+                return
+            self._inference_reloading = bundle.version
+
+        def run():
+            try:
+                self.notify_inference_server(bundle)
+            finally:
+                with self._inference_reload_lock:
+                    if self._inference_reloading == bundle.version:
+                        self._inference_reloading = None
+
+        threading.Thread(target=run, name='inference-reload', daemon=True).start()
+
+    def rollback(self):
+        """回滚到上一个模型包，返回回滚后的版本；没有可回滚版本时返回 None"""
+        with self._publish_lock:
+            if self._previous_bundle is None:
+                return None
+            self._bundle, self._previous_bundle = self._previous_bundle, self._bundle
+            version = self._bundle.version
+            bundle = self._bundle
+        self.forecast_cache.invalidate()
+        self.notify_inference_server(bundle)
+        print(f"已回滚到模型版本 {version}")
+        return version
+
+    def memory_footprint(self):
+        """估算常驻内存（字节）：持有的各份模型权重（训练模型含优化器状态）加历史数据"""
+        def weight_bytes(model):
+            count_params = getattr(model, 'count_params', None)
+            return count_params() * 4 if count_params else 0
+
+        models = {}
+        for bundle in (self._bundle, self._previous_bundle):
+            if bundle is not None and bundle.model is not None:
+                models[id(bundle.model)] = weight_bytes(bundle.model)
+        total = sum(models.values())
+        if self._trainer is not None:
+            # Adam 为每个权重额外保存两份矩估计
+            total += weight_bytes(self._trainer[1]) * 3
+        if self.history.exists():
+            total += self.history.n_rows * (len(self.history.columns) + 1) * 8
+        return total
+
+    def build_and_train_model(self, progress_callback=None):
+        """在旁路构建和训练LSTM模型并原子发布，成功返回 True；progress_callback(epoch, epochs, logs) 用于上报进度
+
+        调用方持有 train_lock、不持有 write_lock：只在复制数据快照和保存发布模型时短暂持有写锁，训练期间不持有。
+        训练状态定期写入模型仓库的检查点，进程崩溃或重新部署后对同一数据的重训从最后一个检查点继续
+        """
+        df = self.locked_training_snapshot()
+        feature_cols = list(self.feature_cols)
+        config = self.training_config
+        data_hash = self.data_hash(df)
+        checkpointer = Checkpointer(self.model_store, Checkpointer.make_key(data_hash, config), config.checkpoint_every)
+        try:
+            # 其他数据或配置的检查点已无法继续，清理掉
+            self.model_store.clear_checkpoints(keep=checkpointer.key)
+
+            # 划分训练/测试集、拟合新的归一化器（不触碰正在服务的模型包）并构造LSTM样本
+            data = prepare_data(df, feature_cols, config.time_step, config.train_ratio)
+
+            # 构建模型（结构由训练配置决定）
+            model = build_model(config, len(feature_cols))
+
+            # 训练模型（早停、检查点）
+            progress = fit_model(model, data, config, progress_callback=progress_callback, checkpointer=checkpointer)
+            self.report_epoch_times('全量训练', progress, len(data.y_train))
+
             # 评估模型
-            y_test_pred = self.scaler_y.inverse_transform(self.model.predict(x_test_lstm, verbose=0))
-            y_test_true = self.scaler_y.inverse_transform(y_test_lstm.reshape(-1, 1))
-            
-            # 计算指标
-            mse = mean_squared_error(y_test_true, y_test_pred)
-            mae = mean_absolute_error(y_test_true, y_test_pred)
-            rmse = math.sqrt(mse)
-            mape = np.mean(np.abs((y_test_true - y_test_pred) / (y_test_true + 1e-8))) * 100
-
-            # 未来 7 天准确率参考（用测试集最后 3 天误差代替）
-            if len(y_test_true) >= 3:
-                last3_true = y_test_true[-3:]
-                last3_pred = y_test_pred[-3:]
-                future_mape = np.mean(np.abs((last3_true - last3_pred) / (last3_true + 1e-8))) * 100
-                # 准确率 = 100 - MAPE
-                accuracy = 100 - future_mape
-            else:
-                future_mape = "N/A (Insufficient data)"
-                # 使用整体准确率
-                accuracy = 100 - mape
-
-            self.model_metrics = {
-                'mse': float(mse),
-                'mae': float(mae),
-                'rmse': float(rmse),
-                'mape': float(mape),
-                'accuracy': float(accuracy),  # 这里存储的是准确率，不是MAPE
-            }
-            
-            self.last_training_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            model_metrics = evaluate_model(model, data.scaler_y, data.x_test, data.y_test)
+
+            print(f"模型训练完成，测试集准确率: {model_metrics['accuracy']:.2f}%")
 
-            print(f"模型训练完成，测试集准确率: {accuracy:.2f}%")
+            bundle = ModelBundle(
+                model=model,
+                scaler_X=data.scaler_X,
+                scaler_y=data.scaler_y,
+                feature_cols=tuple(feature_cols),
+                time_step=config.time_step,
+                model_metrics=model_metrics,
+                last_training_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                data_hash=data_hash,
+                training=dict(progress.summary(), mode='full'),
+            )
+            with self.write_lock:
+                bundle = self.save_to_store(bundle)
+                # 保存到仓库后检查点不再需要；保存失败时保留，重启后可直接从检查点完成训练
+                if bundle.version.startswith('v'):
+                    checkpointer.clear()
+                # 训练用模型留给后续增量更新，发布的是权重副本，保证已发布模型不可变
+                self._trainer = (bundle.version, model)
+                self.publish(replace(bundle, model=self.serving_copy(model)))
+            return True
             
         except Exception as e:
             print(f"模型训练失败: {e}")
-            # 创建简单的线性模型作为备用
-            self.create_fallback_model()
+            # 已有可用模型时继续服务旧模型，否则创建简单的线性模型作为备用
+            if self._bundle is None:
+                self.publish(self.create_fallback_model(df))
+            return False
     
-    def create_fallback_model(self):
-        """创建备用模型"""
+    @staticmethod
+    def report_epoch_times(kind, progress, n_samples):
+        """打印实际训练的 epoch 数和耗时（首个 epoch 含图追踪，单独列出）以及早停、恢复情况"""
+        epoch_seconds = progress.epoch_seconds
+        if not epoch_seconds:
+            return
+        message = f"{kind} {len(epoch_seconds)} 个 epoch 用时 {sum(epoch_seconds):.1f} 秒：首个 epoch {epoch_seconds[0]:.2f} 秒"
+        if len(epoch_seconds) > 1:
+            median = float(np.median(epoch_seconds[1:]))
+            message += f"，之后每个 epoch {median:.2f} 秒（{n_samples / median:.0f} 样本/秒）"
+        if progress.resumed_from:
+            message += f"；从第 {progress.resumed_from} 个 epoch 的检查点恢复"
+        if progress.stopped_early:
+            message += f"；{progress.monitor} 不再改善，提前停止，使用第 {progress.best_epoch} 个 epoch 的权重"
+        print(message)
+
+    @staticmethod
+    def serving_copy(model):
+        """复制模型结构和权重，作为发布用的只读模型"""
+        from tensorflow.keras.models import clone_model
+
+        copy = clone_model(model)
+        copy.set_weights(model.get_weights())
+        return copy
+
+    def should_full_retrain(self, bundle, df):
+        """增量更新策略：返回 (是否需要全量重训, 原因)"""
+        if bundle is None or bundle.is_fallback:
+            return True, "当前没有可增量更新的LSTM模型"
+        if tuple(self.feature_cols) != bundle.feature_cols:
+            return True, "特征列发生变化"
+        if bundle.incremental_updates >= self.max_incremental_updates:
+            return True, f"累计增量更新已达 {bundle.incremental_updates} 次"
+        
+        # 数据漂移：最近客流按当前归一化器缩放后，明显超出更早历史数据已覆盖的区间
+        # （年份、月份、气温等特征随时间自然超出训练区间，不作为漂移依据）
+        y_scaled = df['y'].values.astype(np.float64) * bundle.scaler_y.scale_[0] + bundle.scaler_y.min_[0]
+        recent, history = y_scaled[-self.replay_window:], y_scaled[:-self.replay_window]
+        if len(history) == 0:
+            history = y_scaled
+        low, high = min(0.0, history.min()), max(1.0, history.max())
+        overflow = max(0.0, low - recent.min(), recent.max() - high)
+        if overflow > self.drift_tolerance:
+            return True, f"客流分布漂移（超出历史区间 {overflow:.2f}）"
+        return False, ""
+
+    def fine_tune_model(self, progress_callback=None):
+        """增量更新：从当前权重出发，在最近数据的回放窗口上训练少量轮次；策略要求时改为全量重训
+
+        与 build_and_train_model 相同，调用方持有 train_lock、不持有 write_lock
+        """
+        bundle = self._bundle
+        df = self.locked_training_snapshot()
+        full_retrain, reason = self.should_full_retrain(bundle, df)
+        if full_retrain:
+            print(f"{reason}，执行全量重训")
+            return self.build_and_train_model(progress_callback)
+        try:
+            from tensorflow.keras.models import clone_model
+            from tensorflow.keras.optimizers import Adam
+
+            feature_cols = list(bundle.feature_cols)
+            
+            # 沿用当前归一化器，不重新拟合
+            replay_df = df.tail(self.replay_window + bundle.time_step)
+            X_replay = scale_features(bundle, replay_df[feature_cols].values.astype(np.float64))
+            y_replay = replay_df['y'].values.astype(np.float64).reshape(-1, 1) * bundle.scaler_y.scale_ + bundle.scaler_y.min_
+            replay = windowed_dataset(X_replay, y_replay, bundle.time_step, 32, self.training_config.shuffle_buffer)
+            
+            train_size = int(len(df) * 0.7)
+            test_df = df.iloc[train_size:]
+            X_test = scale_features(bundle, test_df[feature_cols].values.astype(np.float64))
+            y_test = test_df['y'].values.astype(np.float64).reshape(-1, 1) * bundle.scaler_y.scale_ + bundle.scaler_y.min_
+            x_test_lstm, y_test_lstm = self.make_dataset(X_test, y_test, bundle.time_step)
+            
+            # 在训练线程私有的模型上继续训练，正在服务的模型不受影响
+            if self._trainer is not None and self._trainer[0] == bundle.version:
+                model = self._trainer[1]
+                model.optimizer.learning_rate.assign(self.fine_tune_learning_rate)
+            else:
+                model = clone_model(bundle.model)
+                model.set_weights(bundle.model.get_weights())
+                model.compile(optimizer=Adam(learning_rate=self.fine_tune_learning_rate), loss='mse')
+            self._trainer = None
+            
+            # 记录每个 epoch 的损失和耗时
+            progress = TrainingProgress(monitor='loss')
+            epoch_start = []
+
+            def on_epoch_end(epoch, logs):
+                seconds = time.perf_counter() - epoch_start[-1]
+                logs = {k: float(v) for k, v in (logs or {}).items()}
+                progress.record(epoch + 1, logs, seconds)
+                if progress_callback is not None:
+                    progress_callback(epoch + 1, self.fine_tune_epochs, dict(logs, epoch_seconds=seconds))
+
+            callbacks = [LambdaCallback(on_epoch_begin=lambda epoch, logs: epoch_start.append(time.perf_counter()),
+                                        on_epoch_end=on_epoch_end)]
+            model.fit(replay, epochs=self.fine_tune_epochs, verbose=0, callbacks=callbacks)
+            self.report_epoch_times('增量训练', progress, self.replay_window)
+            
+            model_metrics = evaluate_model(model, bundle.scaler_y, x_test_lstm, y_test_lstm)
+            
+            # 增量更新后误差明显变差时改为全量重训
+            previous_mse = bundle.model_metrics.get('mse')
+            if previous_mse and model_metrics['mse'] > previous_mse * self.max_mse_degradation:
+                print(f"增量更新后误差上升（MSE {previous_mse:.2f} -> {model_metrics['mse']:.2f}），执行全量重训")
+                return self.build_and_train_model(progress_callback)
+            
+            print(f"增量更新完成，测试集准确率: {model_metrics['accuracy']:.2f}%")
+            
+            new_bundle = replace(
+                bundle,
+                model=model,
+                model_metrics=model_metrics,
+                last_training_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                data_hash=self.data_hash(df),
+                version=None,
+                incremental_updates=bundle.incremental_updates + 1,
+                training=dict(progress.summary(), mode='incremental'),
+            )
+            with self.write_lock:
+                new_bundle = self.save_to_store(new_bundle)
+                self._trainer = (new_bundle.version, model)
+                self.publish(replace(new_bundle, model=self.serving_copy(model)))
+            return True
+            
+        except Exception as e:
+            print(f"增量更新失败: {e}")
+            return False
+
+    def data_hash(self, df=None):
+        """训练数据的哈希（默认为当前数据）"""
+        df = self.df if df is None else df
+        return ModelStore.compute_data_hash(df, self.feature_cols, self.time_step)
+
+    def load_from_store(self):
+        """从模型仓库加载与当前数据匹配的最新版本"""
+        try:
+            artifact = self.model_store.load_latest(self.data_hash())
+        except Exception as e:
+            print(f"模型仓库读取失败: {e}")
+            return False
+        if artifact is None:
+            print("模型仓库中没有匹配当前数据的版本，开始训练")
+            return False
+        if artifact['feature_cols'] != list(self.feature_cols) or artifact['time_step'] != self.time_step:
+            print(f"模型版本 {artifact['version']} 的特征列或时间步不匹配，开始训练")
+            return False
+        # 早期版本没有记录训练配置，均为双向 LSTM
+        architecture = (artifact.get('training_config') or {}).get('architecture', 'bilstm')
+        if architecture != self.training_config.architecture:
+            print(f"模型版本 {artifact['version']} 的网络结构为 {architecture}，与配置不一致，开始训练")
+            return False
+
+        self.publish(ModelBundle(
+            model=artifact['model'],
+            scaler_X=artifact['scaler_X'],
+            scaler_y=artifact['scaler_y'],
+            feature_cols=tuple(artifact['feature_cols']),
+            time_step=artifact['time_step'],
+            model_metrics=artifact['model_metrics'],
+            last_training_time=artifact.get('last_training_time'),
+            version=artifact['version'],
+            data_hash=artifact['data_hash'],
+            incremental_updates=artifact.get('incremental_updates', 0),
+            training=artifact.get('training') or {},
+        ))
+        self._store_version = artifact['version']
+        print(f"从模型仓库加载版本 {artifact['version']}")
+        return True
+
+    def sync_from_store(self):
+        """与其他进程同步（调用方持有 write_lock）：历史数据被其他进程写入时刷新数据视图，
+        模型仓库出现本进程未见过且与当前数据匹配的新版本时加载它；返回是否有变化"""
+        changed = False
+        if self.history.reload():
+            self.refresh_from_history()
+            print(f"历史数据已被其他进程更新，当前 {len(self.df)} 行")
+            changed = True
+        versions = self.model_store.list_versions()
+        if versions and versions[0]['version'] != self._store_version:
+            self._store_version = versions[0]['version']
+            if versions[0].get('data_hash') == self.data_hash() and versions[0]['version'] != self.model_version:
+                changed = self.load_from_store() or changed
+        return changed
+
+    def save_to_store(self, bundle):
+        """将模型包保存为新版本，返回带版本号的模型包"""
+        try:
+            version = self.model_store.save(
+                bundle.model, bundle.scaler_X, bundle.scaler_y, bundle.feature_cols, bundle.time_step,
+                bundle.model_metrics, bundle.data_hash, bundle.last_training_time,
+                incremental_updates=bundle.incremental_updates, training_config=self.training_config.to_dict(),
+                training=bundle.training)
+            self.model_store.prune()
+            self._store_version = version
+            print(f"模型已保存到仓库，版本 {version}")
+        except Exception as e:
+            print(f"模型保存失败: {e}")
+            version = f"mem_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        return replace(bundle, version=version)
+
+    def create_fallback_model(self, df):
+        """创建备用模型包"""
         from sklearn.linear_model import LinearRegression
         from sklearn.preprocessing import StandardScaler
         
-        self.fallback_model = LinearRegression()
-        self.fallback_scaler = StandardScaler()
+        fallback_model = LinearRegression()
+        fallback_scaler = StandardScaler()
         
         # 使用最后几天的数据作为特征
-        X = np.arange(len(self.df)).reshape(-1, 1)
-        y = self.df['y'].values
+        X = np.arange(len(df)).reshape(-1, 1)
+        y = df['y'].values
         
-        X_scaled = self.fallback_scaler.fit_transform(X)
-        self.fallback_model.fit(X_scaled, y)
+        X_scaled = fallback_scaler.fit_transform(X)
+        fallback_model.fit(X_scaled, y)
         
         print("使用线性回归作为备用模型")
+        return ModelBundle(
+            model=None,
+            scaler_X=None,
+            scaler_y=None,
+            feature_cols=tuple(self.feature_cols),
+            time_step=self.time_step,
+            last_training_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            version=f"fallback_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}",
+            fallback_model=fallback_model,
+            fallback_scaler=fallback_scaler,
+        )
     
     def make_dataset(self, X, y, time_step=10):
-        """构造LSTM样本"""
-        xs, ys = [], []
-        for i in range(len(X) - time_step):
-            xs.append(X[i:i+time_step])
-            ys.append(y[i+time_step, 0])
-        return np.array(xs), np.array(ys)
+        """构造LSTM样本（跨步视图，不复制窗口）"""
+        return make_windows(X, y, time_step)
     
     def predict_next_n_days(self, n_days=7):
         """预测未来n天"""
+        # 只取一次模型包和数据快照，整个预测过程使用同一组模型与归一化器
+        bundle = self._bundle
+        df = self.df
         try:
-            if self.model:
-                # 使用LSTM模型预测
-                last_window = self.df[self.feature_cols].tail(self.time_step)
-                predictions = []
-                
-                current_window = last_window.copy()
-                
-                for _ in range(n_days):
-                    x_scaled = self.scaler_X.transform(current_window.values)
-                    x_reshaped = x_scaled.reshape(1, self.time_step, -1)
-                    
-                    y_pred_scaled = self.model.predict(x_reshaped, verbose=0)[0, 0]
-                    y_pred = self.scaler_y.inverse_transform([[y_pred_scaled]])[0, 0]
-                    
-                    predictions.append(max(0, y_pred))  # 确保非负
-                    
-                    # 更新窗口（这里简化处理，实际应该生成新的特征）
-                    new_row = current_window.iloc[-1:].copy()
-                    current_window = pd.concat([current_window.iloc[1:], new_row], ignore_index=True)
-                
-                return predictions
+            if bundle is not None and not bundle.is_fallback:
+                # 使用LSTM模型预测：全部 n_days 个窗口一次前向传播
+                # （未来特征这里简化为沿用最后一天，实际应该生成新的特征）
+                last_window = df[list(bundle.feature_cols)].values[-bundle.time_step:]
+                return self.run_forecast(bundle, last_window[None], n_days)[0].tolist()
             else:
                 # 使用备用模型
-                return self.predict_with_fallback(n_days)
+                return self.predict_with_fallback(n_days, bundle, df)
                 
         except Exception as e:
             print(f"预测失败: {e}")
             # 返回基于历史均值的预测
-            avg_visitors = self.df['y'].mean()
+            avg_visitors = df['y'].mean()
             return [avg_visitors * (1 + 0.1 * i) for i in range(n_days)]
     
-    def predict_with_fallback(self, n_days=7):
+    def predict_scenarios(self, n_days=7, future_features=None):
+        """批量预测多个场景：future_features 为 (场景数, n_days, 特征数) 的未来特征，返回每个场景的预测列表"""
+        bundle = self._bundle
+        df = self.df
+        if bundle is None or bundle.is_fallback:
+            n_scenarios = 1 if future_features is None else len(future_features)
+            return [self.predict_with_fallback(n_days, bundle, df) for _ in range(n_scenarios)]
+        last_window = df[list(bundle.feature_cols)].values[-bundle.time_step:]
+        n_scenarios = 1 if future_features is None else len(future_features)
+        last_windows = np.broadcast_to(last_window, (n_scenarios,) + last_window.shape)
+        return self.run_forecast(bundle, last_windows, n_days, future_features).tolist()
+
+    def predict_batch(self, items):
+        """一次前向传播完成多个预测请求：items 为 [(n_days, future_features 或 None)]，返回每个请求的预测列表
+
+        按最长天数统一构造窗口后截取各自的前 n_days 天（第 k 天的预测只依赖前 k 天的特征）；
+        future_features 不足的天数沿用其最后一行，未提供时沿用历史最后一天的特征
+        """
+        bundle = self._bundle
+        df = self.df
+        if bundle is None or bundle.is_fallback:
+            return [self.predict_with_fallback(n_days, bundle, df) for n_days, _ in items]
+        last_window = df[list(bundle.feature_cols)].values[-bundle.time_step:]
+        n_items, max_days = len(items), max(n_days for n_days, _ in items)
+
+        # 只预测一天时不需要未来特征
+        future = None
+        if max_days > 1 and any(features is not None for _, features in items):
+            future = np.empty((n_items, max_days - 1, last_window.shape[1]))
+            future[:] = last_window[-1]
+            for i, (_, features) in enumerate(items):
+                if features is None:
+                    continue
+                features = np.asarray(features, dtype=np.float64)[:max_days - 1]
+                if not len(features):
+                    continue
+                future[i, :len(features)] = features
+                future[i, len(features):] = features[-1]
+
+        last_windows = np.broadcast_to(last_window, (n_items,) + last_window.shape)
+        predictions = self.run_forecast(bundle, last_windows, max_days, future)
+        return [predictions[i, :n_days].tolist() for i, (n_days, _) in enumerate(items)]
+
+    def run_forecast(self, bundle, last_windows, n_days, future_features=None):
+        """执行批量预测：配置了独立推理进程时转发过去，失败或推理进程的模型版本与 bundle 不一致时退回本进程推理
+
+        推理进程的版本比 bundle 旧（例如错过了发布通知）时在后台通知它加载 bundle 的版本；
+        比 bundle 新时说明其他 worker 已发布新版本，本进程同步后自然一致，不回退推理进程的版本。
+        """
+        if self.serves_remotely(bundle):
+            try:
+                return np.asarray(self.inference_client.forecast_batch(last_windows, n_days, future_features,
+                                                                       expected_version=bundle.version))
+            except ModelVersionMismatch as e:
+                print(f"{e}，改用本地推理")
+                # 版本号以创建时间开头，按字符串比较即按时间先后
+                if e.actual is None or e.actual < e.expected:
+                    self.reload_inference_server(bundle)
+            except Exception as e:
+                print(f"推理服务调用失败，改用本地推理: {e}")
+        if self.coalescer is not None:
+            return forecast_batch(bundle, last_windows, n_days, future_features, predict=self.coalescer.submit)
+        return forecast_batch(bundle, last_windows, n_days, future_features)
+
+    def predict_with_fallback(self, n_days=7, bundle=None, df=None):
         """使用备用模型预测"""
-        last_index = len(self.df)
+        bundle = self._bundle if bundle is None else bundle
+        df = self.df if df is None else df
+        last_index = len(df)
         future_indices = np.arange(last_index, last_index + n_days).reshape(-1, 1)
-        future_indices_scaled = self.fallback_scaler.transform(future_indices)
-        predictions = self.fallback_model.predict(future_indices_scaled)
+        future_indices_scaled = bundle.fallback_scaler.transform(future_indices)
+        predictions = bundle.fallback_model.predict(future_indices_scaled)
         return [max(0, pred) for pred in predictions]
     
     def calculate_confidence_interval(self, predictions, confidence_level=0.85):
         """计算置信区间"""
         # 基于历史误差计算置信区间
-        if 'mape' in self.model_metrics:
-            error_margin = self.model_metrics['mape'] / 100
+        model_metrics = self.model_metrics
+        if 'mape' in model_metrics:
+            error_margin = model_metrics['mape'] / 100
         else:
             error_margin = 0.15  # 默认15%误差
             
@@ -236,82 +707,6 @@ class LSTMPredictor:
         upper = [pred * (1 + error_margin) for pred in predictions]
         return {'lower': [int(x) for x in lower], 'upper': [int(x) for x in upper]}
     
-    def generate_prediction_chart(self, predictions, prediction_dates):
-        """生成预测图表"""
-        try:
-            # 设置中文字体
-            plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-            plt.rcParams['axes.unicode_minus'] = False
-            
-            # 创建图表
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 12))
-            
-            # 第一个子图：预测趋势
-            dates_str = [d.strftime('%m-%d') for d in prediction_dates]
-            bars = ax1.bar(dates_str, predictions, color='skyblue', edgecolor='navy', alpha=0.8)
-            
-            # 添加数值标签
-            for bar, val in zip(bars, predictions):
-                height = bar.get_height()
-                ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
-                        f'{int(val)}', ha='center', va='bottom', fontweight='bold')
-            
-            ax1.set_title('未来7天客流量预测', fontsize=16, fontweight='bold', pad=20)
-            ax1.set_xlabel('日期', fontsize=12)
-            ax1.set_ylabel('预测客流量 (人)', fontsize=12)
-            ax1.grid(axis='y', alpha=0.3)
-            ax1.tick_params(axis='x', rotation=45)
-            
-            # 第二个子图：趋势线
-            ax2.plot(dates_str, predictions, marker='o', linewidth=3, markersize=8, 
-                    color='#ff6b6b', label='预测趋势')
-            ax2.fill_between(dates_str, predictions, alpha=0.3, color='#ff6b6b')
-            
-            ax2.set_title('客流量预测趋势', fontsize=16, fontweight='bold', pad=20)
-            ax2.set_xlabel('日期', fontsize=12)
-            ax2.set_ylabel('客流量 (人)', fontsize=12)
-            ax2.grid(True, alpha=0.3)
-            ax2.legend()
-            ax2.tick_params(axis='x', rotation=45)
-            
-            plt.tight_layout()
-            
-            # 保存图表
-            chart_filename = f"prediction_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            chart_path = os.path.join(self.charts_folder, chart_filename)
-            plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-            plt.close()
-            
-            print(f"图表已保存: {chart_path}")
-            return chart_filename
-            
-        except Exception as e:
-            print(f"图表生成失败: {e}")
-            # 返回默认图表文件名或生成简单图表
-            return self.generate_simple_chart(predictions, prediction_dates)
-    
-    def generate_simple_chart(self, predictions, prediction_dates):
-        """生成简单图表（备用）"""
-        try:
-            plt.figure(figsize=(12, 6))
-            dates_str = [d.strftime('%m-%d') for d in prediction_dates]
-            plt.bar(dates_str, predictions, color='lightblue')
-            plt.title('未来7天客流量预测')
-            plt.xlabel('日期')
-            plt.ylabel('客流量 (人)')
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            chart_filename = f"simple_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-            chart_path = os.path.join(self.charts_folder, chart_filename)
-            plt.savefig(chart_path, dpi=150, bbox_inches='tight')
-            plt.close()
-            
-            return chart_filename
-        except Exception as e:
-            print(f"简单图表生成也失败: {e}")
-            return "default_chart.png"
-    
     def get_last_date(self):
         """获取最后日期"""
         return self.df['ds'].iloc[-1]
@@ -321,47 +716,71 @@ class LSTMPredictor:
         return self.model_metrics
     
     def get_data_statistics(self):
-        """获取数据统计信息"""
+        """获取数据统计信息（读取统计索引，不扫描历史数据）"""
+        summary = self.stats_index.summary()
+        # 没有历史数据时各项统计为 None
         return {
-            'average_visitors': float(self.df['y'].mean()),
-            'max_visitors': int(self.df['y'].max()),
-            'min_visitors': int(self.df['y'].min()),
-            'total_records': len(self.df),
-            'data_period': f"{self.df['ds'].iloc[0].strftime('%Y-%m-%d')} 至 {self.df['ds'].iloc[-1].strftime('%Y-%m-%d')}"
+            'average_visitors': summary['mean'],
+            'max_visitors': int(summary['max']) if summary['max'] is not None else None,
+            'min_visitors': int(summary['min']) if summary['min'] is not None else None,
+            'total_records': summary['count'],
+            'data_period': f"{summary['start_date']} 至 {summary['end_date']}"
         }
     
     def get_last_training_time(self):
         """获取最后训练时间"""
         return self.last_training_time or "尚未训练"
     
-    def retrain_with_new_data(self, new_data_path):
-        """使用新数据重新训练模型"""
+    def merge_data_file(self, new_data_path):
+        """将数据文件（CSV/Excel）分块合并到历史数据（不训练）"""
         try:
-            # 加载新数据
-            new_df = pd.read_csv(new_data_path)
-            new_df['ds'] = pd.to_datetime(new_df['ds'])
+            # 分块读取、校验并按日期追加或更新到历史数据仓库
+            stats = ingest_file(new_data_path, self.history)
+            if stats["status"] != "success":
+                return stats
+            self.refresh_from_history(stats['first_row'])
+            self.data_path = new_data_path
             
-            # 检查数据格式是否符合要求
-            required_columns = ['ds', 'y'] + [f'feature_{i}' for i in range(25)]
-            if not all(col in new_df.columns for col in ['ds', 'y']):
-                return {"status": "error", "message": "数据文件必须包含 'ds' 和 'y' 列"}
+            print(f"合并新数据完成，新增 {stats['inserted']} 行，更新 {stats['updated']} 行，数据量: {len(self.df)} 行")
+            return {"status": "success", "message": "新数据已合并", "total_records": len(self.df), **stats}
             
-            # 合并数据
-            self.df = pd.concat([self.df, new_df], ignore_index=True).drop_duplicates(subset=['ds']).sort_values('ds')
-            self.data_path = new_data_path
+        except Exception as e:
+            return {"status": "error", "message": f"数据合并失败: {str(e)}"}
+
+    def retrain_with_new_data(self, new_data_path):
+        """使用新数据重新训练模型（同步）"""
+        try:
+            result = self.merge_data_file(new_data_path)
+            if result["status"] != "success":
+                return result
             
             print(f"使用新数据重新训练模型，数据量: {len(self.df)} 行")
             
             # 重新训练模型
-            self.build_and_train_model()
+            with self.train_lock:
+                self.build_and_train_model()
             
             return {"status": "success", "message": "模型使用新数据重新训练完成"}
             
         except Exception as e:
             return {"status": "error", "message": f"重新训练失败: {str(e)}"}
-            
-    def add_single_day_data(self, date, y_value, features):
-        """添加单日数据"""
+
+    def validate_single_day(self, date, y_value, features):
+        """校验单日数据，返回错误信息或 None"""
+        try:
+            pd.to_datetime(date)
+        except (ValueError, TypeError):
+            return f"日期格式无效: {date}"
+        try:
+            float(y_value)
+        except (ValueError, TypeError):
+            return f"客流量格式无效: {y_value}"
+        if len(features) != len(self.feature_cols):
+            return f"特征数量不匹配，需要 {len(self.feature_cols)} 个特征"
+        return None
+
+    def upsert_single_day(self, date, y_value, features):
+        """添加或更新单日数据（不训练）"""
         try:
             # 检查日期格式
             if isinstance(date, str):
@@ -377,30 +796,29 @@ class LSTMPredictor:
             for i, feature_value in enumerate(features):
                 new_row[self.feature_cols[i]] = feature_value
         
-            # 创建新DataFrame并合并
-            new_df = pd.DataFrame([new_row])
-        
-            # 检查日期是否已存在
-            if date in self.df['ds'].values:
-                # 更新现有数据
-                self.df.loc[self.df['ds'] == date, :] = new_row
-                action = "更新"
-            else:
-                # 添加新数据
-                self.df = pd.concat([self.df, new_df], ignore_index=True)
-                self.df = self.df.sort_values('ds').reset_index(drop=True)
-                action = "添加"
+            # 按日期追加或更新到历史数据仓库
+            counts = self.history.upsert(pd.DataFrame([new_row]))
+            self.refresh_from_history(counts['first_row'])
+            action = "更新" if counts['updated'] else "添加"
         
             print(f"成功{action}日期 {date.strftime('%Y-%m-%d')} 的数据")
-        
-            # 重新训练模型
-            self.build_and_train_model()
-        
-            return {
-                "status": "success", 
-                "message": f"成功{action}数据并重新训练模型",
-                "action": action
-            }
+            return {"status": "success", "message": f"成功{action}数据", "action": action}
         
         except Exception as e:
             return {"status": "error", "message": f"添加数据失败: {str(e)}"}
+            
+    def add_single_day_data(self, date, y_value, features):
+        """添加单日数据并增量更新模型（同步）"""
+        result = self.upsert_single_day(date, y_value, features)
+        if result["status"] != "success":
+            return result
+        
+        # 增量更新模型（必要时自动全量重训）
+        with self.train_lock:
+            self.fine_tune_model()
+        
+        return {
+            "status": "success", 
+            "message": f"成功{result['action']}数据并更新模型",
+            "action": result['action']
+        }
@@ -0,0 +1,130 @@
+import tensorflow as tf
+
+
+class ManualLSTM(tf.keras.layers.Layer):
+    """
+    手动实现的一个 LSTM 单元，支持 return_sequences。
+    权重一次性创建，4 个门融合为一个矩阵；所有时间步的输入投影 x @ W + b 在循环前一次矩阵乘法完成，
+    循环中每步只剩 h @ U。循环默认用 tf.while_loop，unroll=True 时按固定时间步展开为静态图。
+    jit_compile=True 时循环部分展开后用 XLA 编译；go_backwards 与 Keras 一致，可直接放进 Bidirectional。
+    支持混合精度（如 dtype='mixed_bfloat16'）：权重保持 float32，计算使用 bfloat16。
+    """
+    # W、U、b 最后一维中 4 个门的排列顺序（NumPy 推理引擎据此重排权重）
+    gate_order = 'ifog'
+
+    def __init__(self, units, return_sequences=False, go_backwards=False, unroll=False, jit_compile=False,
+                 **kwargs):
+        super().__init__(**kwargs)
+        self.units = units
+        self.return_sequences = return_sequences
+        self.go_backwards = go_backwards
+        self.unroll = unroll
+        self.jit_compile = jit_compile
+        # Bidirectional 要求的属性，本层不返回状态
+        self.return_state = False
+        self.stateful = False
+        self._recurrence = tf.function(self._run, jit_compile=True) if jit_compile else self._run
+
+    def build(self, input_shape):
+        # input_shape: (None, time_step, dim)
+        dim = int(input_shape[-1])
+        # 一次性创建所有权重
+        self.W = self.add_weight(
+            shape=(dim, 4 * self.units),
+            initializer='glorot_uniform',
+            name='W')
+        self.U = self.add_weight(
+            shape=(self.units, 4 * self.units),
+            initializer='orthogonal',
+            name='U')
+        self.b = self.add_weight(
+            shape=(4 * self.units,),
+            initializer='zeros',
+            name='b')
+        super().build(input_shape)
+
+    def call(self, inputs):
+        # inputs: (batch, time, dim)
+        shape = tf.shape(inputs)
+        batch_size, time_step = shape[0], shape[1]
+        dim = inputs.shape[-1]
+
+        # 所有时间步的输入投影一次完成，转为时间优先 (time, batch, 4*units)
+        projected = tf.matmul(tf.reshape(inputs, (-1, dim)), self.W) + self.b
+        projected = tf.transpose(tf.reshape(projected, (batch_size, time_step, 4 * self.units)), [1, 0, 2])
+        if self.go_backwards:
+            projected = tf.reverse(projected, [0])
+
+        outputs, h_final = self._recurrence(projected, tf.cast(self.U, projected.dtype))
+
+        if self.return_sequences:
+            # 返回全部时间步 (batch, time, units)，go_backwards 时按处理顺序排列
+            return tf.transpose(outputs, [1, 0, 2])
+        else:
+            # 仅返回最后一步 (batch, units)
+            return h_final
+
+    def _step(self, z_x, h, c, U):
+        """单步：z_x 为该时间步的输入投影"""
+        z = z_x + tf.matmul(h, U)                     # (batch, 4*units)
+        ifo, g = tf.split(z, [3 * self.units, self.units], axis=1)
+        i, f, o = tf.split(tf.sigmoid(ifo), 3, axis=1)  # i、f、o 三个门一次 sigmoid
+        c = f * c + i * tf.tanh(g)
+        h = o * tf.tanh(c)
+        return h, c
+
+    def _run(self, projected, U):
+        """循环部分，返回 (时间优先的全部输出, 最后一步输出)"""
+        batch_size = tf.shape(projected)[1]
+        # 初始状态（与计算精度一致）
+        h = tf.zeros((batch_size, self.units), dtype=projected.dtype)
+        c = tf.zeros((batch_size, self.units), dtype=projected.dtype)
+
+        # XLA 编译时也展开（while_loop 反向传播的 TensorList 不能跨越 XLA 边界）
+        if (self.unroll or self.jit_compile) and projected.shape[0] is not None:
+            # 固定时间步展开为静态图
+            outputs = []
+            for z_x in tf.unstack(projected):
+                h, c = self._step(z_x, h, c, U)
+                outputs.append(h)
+            return tf.stack(outputs), h
+
+        time_step = tf.shape(projected)[0]
+        # 按时间步拆开输入投影（直接切片 projected[t] 的梯度每步都要生成整个张量大小的零填充）
+        inputs_ta = tf.TensorArray(dtype=projected.dtype, size=time_step).unstack(projected)
+        # 用来收集所有时间步输出
+        outputs = tf.TensorArray(dtype=projected.dtype, size=time_step)
+
+        # 循环体
+        def loop_body(t, h, c, ta):
+            h, c = self._step(inputs_ta.read(t), h, c, U)
+            ta = ta.write(t, h)
+            return t + 1, h, c, ta
+
+        # while_loop 定义
+        _, h_final, _, outputs = tf.while_loop(
+            cond=lambda t, *_: t < time_step,
+            body=loop_body,
+            loop_vars=(0, h, c, outputs))
+        return outputs.stack(), h_final
+
+    def compute_output_shape(self, input_shape):
+        input_shape = tf.TensorShape(input_shape)
+        if self.return_sequences:
+            return input_shape[:-1].concatenate([self.units])
+        return tf.TensorShape([input_shape[0], self.units])
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'units': self.units,
+                       'return_sequences': self.return_sequences,
+                       'go_backwards': self.go_backwards,
+                       'unroll': self.unroll,
+                       'jit_compile': self.jit_compile})
+        return config
+
+
+def bidirectional_manual_lstm(units, return_sequences=False, merge_mode='concat', **kwargs):
+    """双向 ManualLSTM：Keras Bidirectional 包装，反向层为 go_backwards=True 的副本"""
+    return tf.keras.layers.Bidirectional(ManualLSTM(units, return_sequences=return_sequences, **kwargs),
+                                         merge_mode=merge_mode)
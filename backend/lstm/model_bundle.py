@@ -0,0 +1,41 @@
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """不可变模型包：模型、归一化器和元数据一起发布，读者拿到的永远是同一组"""
+
+    model: Any
+    scaler_X: Any
+    scaler_y: Any
+    feature_cols: tuple
+    time_step: int
+    model_metrics: dict = field(default_factory=dict)
+    last_training_time: Optional[str] = None
+    version: Optional[str] = None
+    data_hash: Optional[str] = None
+    # 自上次全量训练以来的增量更新次数
+    incremental_updates: int = 0
+    # 训练摘要：实际 epoch 数、耗时、早停情况和逐 epoch 损失（见 training.TrainingProgress.summary）
+    training: dict = field(default_factory=dict)
+    # 训练失败且没有可用LSTM时使用的线性回归备用模型
+    fallback_model: Any = None
+    fallback_scaler: Any = None
+
+    @property
+    def is_fallback(self):
+        """是否为备用模型"""
+        return self.model is None
+
+    def info(self):
+        """版本信息"""
+        return {
+            'version': self.version,
+            'data_hash': self.data_hash,
+            'last_training_time': self.last_training_time,
+            'is_fallback': self.is_fallback,
+            'incremental_updates': self.incremental_updates,
+            'model_metrics': dict(self.model_metrics),
+            'training': dict(self.training),
+        }
@@ -0,0 +1,326 @@
+import os
+import json
+import pickle
+import shutil
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from numpy_lstm import NumpyLSTMModel, ScalerParams
+
+
+class ModelStore:
+    """版本化模型仓库：保存权重、归一化器、特征列、时间步、评估指标和训练数据哈希
+
+    每个版本总是保存 Keras 模型；推理导出格式（SavedModel、NumPy 推理模型）只在 export_formats 中列出时随版本写出，
+    其余格式在 load_serving 首次需要时从 Keras 模型生成并补写到版本目录。
+    """
+
+    MODEL_FILE = 'model.h5'
+    SAVED_MODEL_DIR = 'saved_model'
+    SCALERS_FILE = 'scalers.pkl'
+    NUMPY_MODEL_FILE = 'numpy_model.npz'
+    META_FILE = 'meta.json'
+    # 训练检查点位于 .checkpoints/<key>/（以点开头，不会被当作版本）
+    CHECKPOINTS_DIR = '.checkpoints'
+    CHECKPOINT_PREFIX = 'ckpt'
+    CHECKPOINT_STATE_FILE = 'state.json'
+    CHECKPOINT_BEST_FILE = 'best_weights.npz'
+    # 推理导出格式：独立推理进程的 TensorFlow 引擎加载 SavedModel，numpy 引擎加载 NumPy 推理模型
+    EXPORT_SAVED_MODEL = 'saved_model'
+    EXPORT_NUMPY = 'numpy'
+
+    def __init__(self, root, export_formats=()):
+        self.root = root
+        self.export_formats = frozenset(export_formats)
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def compute_data_hash(df, feature_cols, time_step):
+        """计算训练数据哈希（日期、目标值、特征列和时间步共同决定一个模型）"""
+        h = hashlib.sha256()
+        h.update(json.dumps({'feature_cols': list(feature_cols), 'time_step': int(time_step)}).encode('utf-8'))
+        h.update(pd.to_datetime(df['ds']).values.astype('datetime64[D]').astype(np.int64).tobytes())
+        h.update(np.ascontiguousarray(df['y'].values, dtype=np.float64).tobytes())
+        h.update(np.ascontiguousarray(df[list(feature_cols)].values, dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    def list_versions(self):
+        """按创建时间倒序列出所有有效版本"""
+        versions = []
+        for name in os.listdir(self.root):
+            meta_path = os.path.join(self.root, name, self.META_FILE)
+            if name.startswith('.') or not os.path.isfile(meta_path):
+                continue
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta['version'] = name
+            versions.append(meta)
+        versions.sort(key=lambda m: m.get('created_at', ''), reverse=True)
+        return versions
+
+    def save(self, model, scaler_X, scaler_y, feature_cols, time_step, model_metrics, data_hash,
+             last_training_time=None, incremental_updates=0, training_config=None, training=None):
+        """保存一个新版本，先写临时目录再原子重命名，避免读到半成品"""
+        created_at = datetime.now()
+        version = f"v{created_at.strftime('%Y%m%d_%H%M%S_%f')}_{data_hash[:8]}"
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            model.save(os.path.join(tmp_dir, self.MODEL_FILE))
+            if self.EXPORT_SAVED_MODEL in self.export_formats:
+                self.export_saved_model(model, os.path.join(tmp_dir, self.SAVED_MODEL_DIR), time_step, len(feature_cols))
+            with open(os.path.join(tmp_dir, self.SCALERS_FILE), 'wb') as f:
+                pickle.dump({'scaler_X': scaler_X, 'scaler_y': scaler_y}, f)
+            if self.EXPORT_NUMPY in self.export_formats:
+                self.export_numpy_model(model, os.path.join(tmp_dir, self.NUMPY_MODEL_FILE))
+            meta = {
+                'created_at': created_at.isoformat(),
+                'data_hash': data_hash,
+                'feature_cols': list(feature_cols),
+                'time_step': int(time_step),
+                'model_metrics': model_metrics,
+                'last_training_time': last_training_time,
+                'incremental_updates': int(incremental_updates),
+                # 训练配置（网络结构、轮数等，见 training.TrainingConfig）
+                'training_config': training_config,
+                # 本次训练实际的 epoch 数、耗时、早停情况和逐 epoch 损失（见 training.TrainingProgress.summary）
+                'training': training,
+                # 归一化参数明文保存一份，numpy 推理时无需 pickle 和 scikit-learn
+                'scaler_params': {'scaler_X': ScalerParams.from_scaler(scaler_X).to_dict(),
+                                  'scaler_y': ScalerParams.from_scaler(scaler_y).to_dict()},
+            }
+            with open(os.path.join(tmp_dir, self.META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_dir, os.path.join(self.root, version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return version
+
+    @staticmethod
+    def export_saved_model(model, path, time_step, n_features):
+        """导出推理用 SavedModel，固定输入签名 (None, time_step, n_features)"""
+        import tensorflow as tf
+
+        @tf.function(input_signature=[tf.TensorSpec((None, time_step, n_features), tf.float32, name='x')])
+        def serve(x):
+            return {'y': model(x, training=False)}
+
+        tf.saved_model.save(model, path, signatures={'serving_default': serve})
+
+    @staticmethod
+    def export_numpy_model(model, path):
+        """导出 NumPy 推理模型，返回是否成功"""
+        try:
+            NumpyLSTMModel.from_keras(model).save(path)
+            return True
+        except Exception as e:
+            # 含 NumPy 引擎不支持的层时只影响 numpy 推理，TensorFlow 推理不受影响
+            print(f"NumPy 推理模型导出失败: {e}")
+            return False
+
+    def _load_keras(self, version_dir):
+        """加载版本目录中的 Keras 模型"""
+        from tensorflow.keras.models import load_model
+        from manual_lstm import ManualLSTM
+
+        return load_model(os.path.join(version_dir, self.MODEL_FILE), compile=False,
+                          custom_objects={'ManualLSTM': ManualLSTM})
+
+    def _export_missing(self, version_dir, export_format, meta):
+        """保存时未写出的推理格式在首次需要时从 Keras 模型生成，先写临时路径再原子放入版本目录"""
+        if export_format == self.EXPORT_NUMPY:
+            target = os.path.join(version_dir, self.NUMPY_MODEL_FILE)
+        else:
+            target = os.path.join(version_dir, self.SAVED_MODEL_DIR)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            model = self._load_keras(version_dir)
+            if export_format == self.EXPORT_NUMPY:
+                if not self.export_numpy_model(model, tmp_path):
+                    return
+            else:
+                self.export_saved_model(model, tmp_path, meta['time_step'], len(meta['feature_cols']))
+            os.replace(tmp_path, target)
+            print(f"模型版本 {meta['version']} 已补充导出 {export_format}")
+        except OSError:
+            # 其他进程已先完成导出
+            pass
+        except Exception as e:
+            print(f"模型版本 {meta['version']} 导出 {export_format} 失败: {e}")
+        finally:
+            if os.path.isdir(tmp_path):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load_latest(self, data_hash=None):
+        """加载与数据哈希匹配的最新版本，不存在时返回 None"""
+        for meta in self.list_versions():
+            if data_hash is not None and meta.get('data_hash') != data_hash:
+                continue
+            try:
+                return self.load(meta['version'])
+            except Exception as e:
+                print(f"模型版本 {meta['version']} 加载失败: {e}")
+        return None
+
+    def load(self, version):
+        """加载指定版本"""
+        version_dir = os.path.join(self.root, version)
+        with open(os.path.join(version_dir, self.META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(version_dir, self.SCALERS_FILE), 'rb') as f:
+            scalers = pickle.load(f)
+        meta['version'] = version
+        meta['model'] = self._load_keras(version_dir)
+        meta['scaler_X'] = scalers['scaler_X']
+        meta['scaler_y'] = scalers['scaler_y']
+        return meta
+
+    def load_serving(self, version=None, engine='tensorflow'):
+        """加载推理所需的模型和归一化器（默认最新版本），不依赖 Keras 模型类
+
+        engine='tensorflow' 加载 SavedModel；engine='numpy' 加载 NumPy 推理模型，不导入 TensorFlow 和 scikit-learn。
+        版本中还没有对应格式时先从 Keras 模型导出一次（需要 TensorFlow），导出失败时 numpy 退回 TensorFlow
+        """
+        if version is None:
+            versions = self.list_versions()
+            if not versions:
+                return None
+            version = versions[0]['version']
+        version_dir = os.path.join(self.root, version)
+        with open(os.path.join(version_dir, self.META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        meta['version'] = version
+        numpy_model_path = os.path.join(version_dir, self.NUMPY_MODEL_FILE)
+        if engine == 'numpy' and 'scaler_params' in meta and not os.path.isfile(numpy_model_path):
+            self._export_missing(version_dir, self.EXPORT_NUMPY, meta)
+        if engine == 'numpy' and os.path.isfile(numpy_model_path) and 'scaler_params' in meta:
+            meta['model'] = NumpyLSTMModel.load(numpy_model_path)
+            meta['scaler_X'] = ScalerParams(**meta['scaler_params']['scaler_X'])
+            meta['scaler_y'] = ScalerParams(**meta['scaler_params']['scaler_y'])
+            meta['engine'] = 'numpy'
+            return meta
+        if engine == 'numpy':
+            print(f"模型版本 {version} 没有 NumPy 推理模型，使用 TensorFlow")
+
+        import tensorflow as tf
+
+        with open(os.path.join(version_dir, self.SCALERS_FILE), 'rb') as f:
+            scalers = pickle.load(f)
+        saved_model_path = os.path.join(version_dir, self.SAVED_MODEL_DIR)
+        if not os.path.isdir(saved_model_path):
+            self._export_missing(version_dir, self.EXPORT_SAVED_MODEL, meta)
+        if os.path.isdir(saved_model_path):
+            meta['model'] = SavedModelRunner(tf.saved_model.load(saved_model_path))
+        else:
+            # 导出失败时退回加载 Keras 模型
+            meta['model'] = self._load_keras(version_dir)
+        meta['scaler_X'] = scalers['scaler_X']
+        meta['scaler_y'] = scalers['scaler_y']
+        meta['engine'] = 'tensorflow'
+        return meta
+
+    def _checkpoint_path(self, key):
+        return os.path.join(self.root, self.CHECKPOINTS_DIR, key)
+
+    def save_checkpoint(self, key, model, state, best_weights=None):
+        """写入训练检查点：模型和优化器状态、最优权重和训练进度，先写临时目录再替换旧检查点"""
+        import tensorflow as tf
+
+        path = self._checkpoint_path(key)
+        tmp_dir, old_dir = f"{path}.tmp", f"{path}.old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            tf.train.Checkpoint(model=model, optimizer=model.optimizer).write(
+                os.path.join(tmp_dir, self.CHECKPOINT_PREFIX))
+            if best_weights is not None:
+                with open(os.path.join(tmp_dir, self.CHECKPOINT_BEST_FILE), 'wb') as f:
+                    np.savez(f, *best_weights)
+            state = dict(state, saved_at=datetime.now().isoformat())
+            with open(os.path.join(tmp_dir, self.CHECKPOINT_STATE_FILE), 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            # 替换过程中崩溃时 .old 仍是完整的上一个检查点
+            shutil.rmtree(old_dir, ignore_errors=True)
+            if os.path.isdir(path):
+                os.replace(path, old_dir)
+            os.replace(tmp_dir, path)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def load_checkpoint(self, key, model):
+        """把检查点恢复到 model（结构需一致，已编译），返回 (训练进度字典, 最优权重列表或 None)；没有检查点时返回 None"""
+        import tensorflow as tf
+
+        path = self._checkpoint_path(key)
+        if not os.path.isfile(os.path.join(path, self.CHECKPOINT_STATE_FILE)):
+            path = f"{path}.old"
+            if not os.path.isfile(os.path.join(path, self.CHECKPOINT_STATE_FILE)):
+                return None
+        with open(os.path.join(path, self.CHECKPOINT_STATE_FILE), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        # 先创建优化器的矩估计变量，恢复后 Adam 从中断处继续
+        model.optimizer.build(model.trainable_variables)
+        tf.train.Checkpoint(model=model, optimizer=model.optimizer).read(
+            os.path.join(path, self.CHECKPOINT_PREFIX)).assert_existing_objects_matched()
+        best_weights = None
+        best_path = os.path.join(path, self.CHECKPOINT_BEST_FILE)
+        if os.path.isfile(best_path):
+            with np.load(best_path, allow_pickle=False) as data:
+                best_weights = [data[f'arr_{i}'] for i in range(len(data.files))]
+        return state, best_weights
+
+    def list_checkpoints(self):
+        """未完成训练的检查点 [{'key', 'epoch', 'saved_at', ...}]"""
+        root = os.path.join(self.root, self.CHECKPOINTS_DIR)
+        if not os.path.isdir(root):
+            return []
+        checkpoints = []
+        for key in sorted(os.listdir(root)):
+            state_path = os.path.join(root, key, self.CHECKPOINT_STATE_FILE)
+            if key.endswith(('.tmp', '.old')) or not os.path.isfile(state_path):
+                continue
+            try:
+                with open(state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            checkpoints.append({'key': key, 'epoch': state.get('epoch'), 'best_epoch': state.get('best_epoch'),
+                                'stopped_early': state.get('stopped_early'), 'saved_at': state.get('saved_at')})
+        return checkpoints
+
+    def clear_checkpoints(self, key=None, keep=None):
+        """删除 key 对应的检查点；不传 key 时删除除 keep 以外的全部检查点（数据或配置已变化，无法再继续）"""
+        root = os.path.join(self.root, self.CHECKPOINTS_DIR)
+        if not os.path.isdir(root):
+            return
+        for name in os.listdir(root):
+            base = name[:-4] if name.endswith(('.tmp', '.old')) else name
+            if (key is not None and base == key) or (key is None and base != keep):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    def prune(self, keep=5):
+        """只保留最近 keep 个版本"""
+        for meta in self.list_versions()[keep:]:
+            shutil.rmtree(os.path.join(self.root, meta['version']), ignore_errors=True)
+
+
+class SavedModelRunner:
+    """以 Keras 模型的调用方式包装 SavedModel 的 serving_default 签名"""
+
+    def __init__(self, loaded):
+        self._loaded = loaded
+        self._fn = loaded.signatures['serving_default']
+
+    def __call__(self, x, training=False):
+        return self._fn(x=x)['y']
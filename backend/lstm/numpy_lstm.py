@@ -0,0 +1,285 @@
+"""纯 NumPy 的 LSTM 推理引擎
+
+模型很小（一两层 LSTM、10 个时间步、25 个特征），单次推理中 TensorFlow 的调度开销远大于实际计算量。
+本模块从 Keras 的 LSTM / Bidirectional(LSTM) / ManualLSTM / Dense 层导出权重，用 NumPy 执行前向传播，
+推理进程可以完全不导入 TensorFlow。本模块只依赖 NumPy。
+"""
+import json
+
+import numpy as np
+
+# 内部统一的门顺序：输入门、遗忘门、输出门、候选值，前 3 个门一次 sigmoid，候选值一次 tanh
+GATE_ORDER = 'ifog'
+# Keras LSTM 的门顺序（c 为候选值）
+KERAS_GATE_ORDER = 'ifco'
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: sigmoid(x),
+}
+
+
+def sigmoid(x):
+    """数值稳定的 sigmoid（用 tanh 表示，大负数输入不会溢出）"""
+    return 0.5 * (np.tanh(0.5 * x) + 1)
+
+
+def reorder_gates(array, gate_order):
+    """把最后一维按 gate_order 排列的 4 个门重排为内部顺序 ifog"""
+    gate_order = gate_order.replace('c', 'g')
+    if gate_order == GATE_ORDER:
+        return array
+    chunks = np.split(array, 4, axis=-1)
+    return np.concatenate([chunks[gate_order.index(g)] for g in GATE_ORDER], axis=-1)
+
+
+class LSTMLayer:
+    """单向 LSTM 层
+
+    4 个门的权重融合为一个矩阵，输入投影 x @ W + b 对全部时间步一次矩阵乘法完成，循环中每步只剩 h @ U 一次乘法。
+    sigmoid(z) = 0.5 * tanh(z / 2) + 0.5，i、f、o 三个门的权重预先乘 0.5（2 的幂，不损失精度），
+    每步 4 个门只需一次 tanh，其余运算都在预分配的缓冲区上原地完成。
+    go_backwards 与 Keras 一致：倒序处理，输出序列也按处理顺序排列。
+    """
+
+    def __init__(self, kernel, recurrent_kernel, bias=None, gate_order=GATE_ORDER,
+                 return_sequences=False, go_backwards=False):
+        units = recurrent_kernel.shape[0]
+        if bias is None:
+            bias = np.zeros(4 * units)
+        self.units = units
+        self.return_sequences = bool(return_sequences)
+        self.go_backwards = bool(go_backwards)
+        gate_scale = np.ones(4 * units, dtype=np.float32)
+        gate_scale[:3 * units] = 0.5
+        self._gate_scale = gate_scale
+        self._kernel = self._fuse(kernel, gate_order)
+        self._recurrent_kernel = self._fuse(recurrent_kernel, gate_order)
+        self._bias = self._fuse(bias, gate_order)
+
+    def _fuse(self, array, gate_order):
+        return np.ascontiguousarray(reorder_gates(np.asarray(array, dtype=np.float32), gate_order) * self._gate_scale)
+
+    def __call__(self, x):
+        batch_size, time_step, n_features = x.shape
+        u = self.units
+        # (batch, time, 4u)：所有时间步的输入投影
+        projected = (x.reshape(-1, n_features) @ self._kernel + self._bias).reshape(batch_size, time_step, 4 * u)
+        steps = range(time_step - 1, -1, -1) if self.go_backwards else range(time_step)
+        outputs = np.empty((batch_size, time_step, u), dtype=np.float32) if self.return_sequences else None
+
+        gates = np.empty((batch_size, 4 * u), dtype=np.float32)
+        h = np.zeros((batch_size, u), dtype=np.float32)
+        c = np.zeros((batch_size, u), dtype=np.float32)
+        i, f, o, g = (gates[:, k * u:(k + 1) * u] for k in range(4))
+        for k, t in enumerate(steps):
+            if k == 0:
+                # 初始状态为 0，第一步省去 h @ U
+                np.copyto(gates, projected[:, t])
+            else:
+                np.matmul(h, self._recurrent_kernel, out=gates)
+                gates += projected[:, t]
+            np.tanh(gates, out=gates)
+            ifo = gates[:, :3 * u]
+            ifo *= 0.5
+            ifo += 0.5
+            c *= f
+            c += i * g
+            np.tanh(c, out=h)
+            h *= o
+            if outputs is not None:
+                outputs[:, k] = h
+        return outputs if outputs is not None else h
+
+    def config(self):
+        return {'type': 'lstm', 'return_sequences': self.return_sequences, 'go_backwards': self.go_backwards}
+
+    def arrays(self):
+        """按 ifog 门顺序的原始权重"""
+        return {'kernel': self._kernel / self._gate_scale,
+                'recurrent_kernel': self._recurrent_kernel / self._gate_scale,
+                'bias': self._bias / self._gate_scale}
+
+    @classmethod
+    def from_arrays(cls, config, arrays):
+        return cls(arrays['kernel'], arrays['recurrent_kernel'], arrays['bias'],
+                   return_sequences=config['return_sequences'], go_backwards=config['go_backwards'])
+
+
+class BidirectionalLayer:
+    """双向 LSTM：反向层的输出序列翻转回正向时间顺序后与正向层合并"""
+
+    MERGE_MODES = ('concat', 'sum', 'ave', 'mul')
+
+    def __init__(self, forward, backward, merge_mode='concat'):
+        if merge_mode not in self.MERGE_MODES:
+            raise ValueError(f"不支持的双向合并方式: {merge_mode}")
+        self.forward = forward
+        self.backward = backward
+        self.merge_mode = merge_mode
+
+    def __call__(self, x):
+        y_forward = self.forward(x)
+        y_backward = self.backward(x)
+        if self.backward.return_sequences:
+            y_backward = y_backward[:, ::-1]
+        if self.merge_mode == 'concat':
+            return np.concatenate([y_forward, y_backward], axis=-1)
+        if self.merge_mode == 'sum':
+            return y_forward + y_backward
+        if self.merge_mode == 'ave':
+            return (y_forward + y_backward) / 2
+        return y_forward * y_backward
+
+    def config(self):
+        return {'type': 'bidirectional', 'merge_mode': self.merge_mode,
+                'forward': self.forward.config(), 'backward': self.backward.config()}
+
+    def arrays(self):
+        arrays = {f'forward_{k}': v for k, v in self.forward.arrays().items()}
+        arrays.update({f'backward_{k}': v for k, v in self.backward.arrays().items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, config, arrays):
+        sub = {prefix: {k[len(prefix) + 1:]: v for k, v in arrays.items() if k.startswith(prefix + '_')}
+               for prefix in ('forward', 'backward')}
+        return cls(LSTMLayer.from_arrays(config['forward'], sub['forward']),
+                   LSTMLayer.from_arrays(config['backward'], sub['backward']), config['merge_mode'])
+
+
+class DenseLayer:
+    """全连接层"""
+
+    def __init__(self, kernel, bias=None, activation='linear'):
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"不支持的激活函数: {activation}")
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.bias = np.zeros(kernel.shape[1], dtype=np.float32) if bias is None else np.asarray(bias, dtype=np.float32)
+        self.activation = activation
+
+    def __call__(self, x):
+        return ACTIVATIONS[self.activation](x @ self.kernel + self.bias)
+
+    def config(self):
+        return {'type': 'dense', 'activation': self.activation}
+
+    def arrays(self):
+        return {'kernel': self.kernel, 'bias': self.bias}
+
+    @classmethod
+    def from_arrays(cls, config, arrays):
+        return cls(arrays['kernel'], arrays['bias'], config['activation'])
+
+
+LAYER_TYPES = {'lstm': LSTMLayer, 'bidirectional': BidirectionalLayer, 'dense': DenseLayer}
+
+
+def _keras_lstm(layer):
+    """Keras LSTM 层 -> LSTMLayer"""
+    config = layer.get_config()
+    if config.get('activation') != 'tanh' or config.get('recurrent_activation') != 'sigmoid':
+        raise ValueError(f"LSTM 层 {layer.name} 使用了非默认激活函数")
+    if config.get('stateful') or config.get('return_state'):
+        raise ValueError(f"LSTM 层 {layer.name} 为有状态或返回状态，不支持")
+    weights = layer.get_weights()
+    return LSTMLayer(weights[0], weights[1], weights[2] if config.get('use_bias', True) else None,
+                     gate_order=KERAS_GATE_ORDER, return_sequences=config.get('return_sequences', False),
+                     go_backwards=config.get('go_backwards', False))
+
+
+def _manual_lstm(layer):
+    """ManualLSTM 层（显式 W、U、b 权重）-> LSTMLayer"""
+    return LSTMLayer(np.asarray(layer.W), np.asarray(layer.U), np.asarray(layer.b),
+                     gate_order=getattr(layer, 'gate_order', GATE_ORDER),
+                     return_sequences=layer.return_sequences, go_backwards=getattr(layer, 'go_backwards', False))
+
+
+def _recurrent(layer):
+    if type(layer).__name__ == 'LSTM':
+        return _keras_lstm(layer)
+    if all(hasattr(layer, name) for name in ('W', 'U', 'b')):
+        return _manual_lstm(layer)
+    raise ValueError(f"NumPy 推理引擎不支持的循环层: {type(layer).__name__}")
+
+
+class NumpyLSTMModel:
+    """由 LSTM / 双向 LSTM / 全连接层顺序组成的推理模型，调用方式与 Keras 模型一致：model(x, training=False)"""
+
+    ARCHITECTURE_KEY = '__architecture__'
+
+    def __init__(self, layers):
+        self.layers = list(layers)
+
+    def __call__(self, x, training=False):
+        x = np.asarray(x, dtype=np.float32)
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+    def count_params(self):
+        return int(sum(a.size for layer in self.layers for a in layer.arrays().values()))
+
+    @classmethod
+    def from_keras(cls, model):
+        """从顺序结构的 Keras 模型导出权重；Dropout 等推理时为恒等变换的层直接跳过"""
+        layers = []
+        for layer in model.layers:
+            name = type(layer).__name__
+            if name in ('InputLayer', 'Dropout', 'SpatialDropout1D', 'GaussianNoise', 'GaussianDropout'):
+                continue
+            if name == 'Bidirectional':
+                layers.append(BidirectionalLayer(_recurrent(layer.forward_layer), _recurrent(layer.backward_layer),
+                                                 layer.merge_mode))
+            elif name == 'Dense':
+                config = layer.get_config()
+                weights = layer.get_weights()
+                layers.append(DenseLayer(weights[0], weights[1] if config.get('use_bias', True) else None,
+                                         config.get('activation', 'linear')))
+            else:
+                layers.append(_recurrent(layer))
+        if not layers:
+            raise ValueError("模型中没有可导出的层")
+        return cls(layers)
+
+    def save(self, path):
+        """保存为 npz：结构描述为 JSON 字符串，权重为 float32 数组（读取时无需 pickle）"""
+        arrays = {self.ARCHITECTURE_KEY: np.array(json.dumps([layer.config() for layer in self.layers]))}
+        for i, layer in enumerate(self.layers):
+            arrays.update({f'layer{i}_{k}': v for k, v in layer.arrays().items()})
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            configs = json.loads(str(data[cls.ARCHITECTURE_KEY]))
+            layers = []
+            for i, config in enumerate(configs):
+                prefix = f'layer{i}_'
+                arrays = {k[len(prefix):]: data[k] for k in data.files if k.startswith(prefix)}
+                layers.append(LAYER_TYPES[config['type']].from_arrays(config, arrays))
+        return cls(layers)
+
+
+class ScalerParams:
+    """MinMaxScaler 推理所需的参数（scale_、min_），加载时不需要 scikit-learn"""
+
+    def __init__(self, scale_, min_):
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+        self.min_ = np.asarray(min_, dtype=np.float64)
+
+    @classmethod
+    def from_scaler(cls, scaler):
+        return cls(scaler.scale_, scaler.min_)
+
+    def to_dict(self):
+        return {'scale_': self.scale_.tolist(), 'min_': self.min_.tolist()}
+
+    def transform(self, X):
+        return np.asarray(X) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X) - self.min_) / self.scale_
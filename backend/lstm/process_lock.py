@@ -0,0 +1,44 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，只在进程内互斥（Windows 上也只能单进程部署）
+    fcntl = None
+
+
+class ProcessLock:
+    """跨进程互斥锁（文件锁）
+
+    多个 worker 进程共享同一份历史数据仓库和模型仓库，数据导入和训练需要在进程之间串行执行；
+    同一进程内的线程先竞争线程锁，再竞争文件锁。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'a')
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except Exception:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+        return False
@@ -0,0 +1,231 @@
+import gc
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from training_jobs import TrainingJobQueue
+
+# 默认站点沿用单站点时的数据文件和仓库目录
+DEFAULT_SITE = 'default'
+# 站点ID只允许字母、数字、下划线和连字符，直接用作目录名
+SITE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# 站点目录下的初始数据文件
+SITE_DATA_FILE = 'data.csv'
+# 每个站点的计算图、预测缓存等固定开销估计
+SITE_OVERHEAD_BYTES = 16 * 1024 * 1024
+
+
+class SiteTenant:
+    """一个已加载的站点：预测器和它的训练队列"""
+
+    def __init__(self, site, predictor, training_queue):
+        self.site = site
+        self.predictor = predictor
+        self.training_queue = training_queue
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+    def touch(self):
+        self.last_used = time.time()
+
+    def memory_footprint(self):
+        """估算常驻内存（字节）"""
+        return self.predictor.memory_footprint() + SITE_OVERHEAD_BYTES
+
+    def is_idle(self):
+        """没有训练任务在等待或执行，可以卸载"""
+        return self.training_queue.is_idle()
+
+    def close(self):
+        """停止训练线程；模型和历史数据都已持久化，卸载后可随时重新加载"""
+        self.training_queue.close()
+
+    def info(self):
+        fmt = '%Y-%m-%d %H:%M:%S'
+        return {
+            'site': self.site,
+            'model_version': self.predictor.model_version,
+            'memory_bytes': self.memory_footprint(),
+            'idle': self.is_idle(),
+            'loaded_at': time.strftime(fmt, time.localtime(self.loaded_at)),
+            'last_used': time.strftime(fmt, time.localtime(self.last_used)),
+        }
+
+
+class SiteRegistry:
+    """多站点预测器注册表
+
+    所有站点共享同一个 TensorFlow 运行时、线程池和推理请求合并器；站点在首次访问时加载，
+    已加载站点的估算内存超过 memory_budget_bytes 或数量超过 max_sites 时，按最近最少使用顺序卸载空闲站点。
+    非默认站点的数据位于 sites_root/<site>/（data.csv、model_store/、history_store/）。
+    job_listener(site, job, operations, applied) 在任一站点的训练任务结束后调用。
+    """
+
+    def __init__(self, sites_root, memory_budget_bytes, max_sites=None, coalescer=None,
+                 inference_client=None, default_data_path='more_train.csv', job_listener=None):
+        self.sites_root = sites_root
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_sites = max_sites
+        self.coalescer = coalescer
+        # 独立推理进程只服务默认站点的模型仓库
+        self.inference_client = inference_client
+        self.default_data_path = default_data_path
+        self.job_listener = job_listener
+        self._tenants = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._closed = threading.Event()
+
+    def site_dir(self, site):
+        return os.path.join(self.sites_root, site)
+
+    def has_site(self, site):
+        """站点是否存在：默认站点总是存在，其他站点需要有数据文件或历史数据仓库"""
+        if site == DEFAULT_SITE:
+            return True
+        if not SITE_ID_PATTERN.match(site):
+            return False
+        site_dir = self.site_dir(site)
+        return (os.path.isfile(os.path.join(site_dir, SITE_DATA_FILE))
+                or os.path.isfile(os.path.join(site_dir, 'history_store', 'meta.json')))
+
+    def list_sites(self):
+        """全部站点ID（含未加载的）"""
+        sites = [DEFAULT_SITE]
+        if os.path.isdir(self.sites_root):
+            sites += sorted(name for name in os.listdir(self.sites_root)
+                            if name != DEFAULT_SITE and self.has_site(name))
+        return sites
+
+    def get(self, site):
+        """获取站点，未加载时加载；同一站点只会被一个线程加载"""
+        with self._lock:
+            tenant = self._tenants.get(site)
+            if tenant is not None:
+                self._tenants.move_to_end(site)
+                tenant.touch()
+                return tenant
+            if not self.has_site(site):
+                raise KeyError(site)
+            load_lock = self._loading.setdefault(site, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                tenant = self._tenants.get(site)
+                if tenant is not None:
+                    self._tenants.move_to_end(site)
+                    tenant.touch()
+                    return tenant
+            tenant = self._load(site)
+            with self._lock:
+                self._tenants[site] = tenant
+                self._loading.pop(site, None)
+                self._evict(keep=site)
+        return tenant
+
+    def loaded(self, site):
+        """已加载的站点，未加载时返回 None（不触发加载）"""
+        with self._lock:
+            return self._tenants.get(site)
+
+    def _load(self, site):
+        """创建站点的预测器和训练队列（模型从站点的模型仓库热启动）"""
+        # 预测器依赖 TensorFlow 和 scikit-learn，首次加载站点时才导入
+        from lstm_process import LSTMPredictor, MODEL_STORE_DIR, HISTORY_STORE_DIR
+
+        start = time.perf_counter()
+        if site == DEFAULT_SITE:
+            predictor = LSTMPredictor(data_path=self.default_data_path,
+                                      model_store_dir=MODEL_STORE_DIR,
+                                      history_store_dir=HISTORY_STORE_DIR,
+                                      inference_client=self.inference_client,
+                                      coalescer=self.coalescer)
+        else:
+            site_dir = self.site_dir(site)
+            predictor = LSTMPredictor(data_path=os.path.join(site_dir, SITE_DATA_FILE),
+                                      model_store_dir=os.path.join(site_dir, 'model_store'),
+                                      history_store_dir=os.path.join(site_dir, 'history_store'),
+                                      coalescer=self.coalescer)
+        on_finish = None
+        if self.job_listener is not None:
+            on_finish = lambda job, operations, applied: self.job_listener(site, job, operations, applied)
+        tenant = SiteTenant(site, predictor, TrainingJobQueue(predictor, on_finish=on_finish))
+        print(f"站点 {site} 加载完成，用时 {time.perf_counter() - start:.1f} 秒")
+        return tenant
+
+    def _evict(self, keep=None):
+        """超出内存预算或站点数上限时，按 LRU 顺序卸载空闲站点（调用方持有 self._lock）"""
+        def over_budget():
+            if self.max_sites is not None and len(self._tenants) > self.max_sites:
+                return True
+            total = sum(t.memory_footprint() for t in self._tenants.values())
+            return total > self.memory_budget_bytes
+
+        evicted = False
+        for site in list(self._tenants):
+            if not over_budget():
+                break
+            tenant = self._tenants[site]
+            if site == keep or not tenant.is_idle():
+                continue
+            del self._tenants[site]
+            tenant.close()
+            self._evictions += 1
+            evicted = True
+            print(f"站点 {site} 空闲且超出内存预算，已卸载")
+        if evicted:
+            gc.collect()
+        if over_budget():
+            print("已加载站点超出内存预算，但其余站点都在训练或刚被访问，暂不卸载")
+
+    def sync(self):
+        """同步其他进程对已加载站点的数据和模型所做的更新（多 worker 部署时定期调用）"""
+        with self._lock:
+            tenants = list(self._tenants.values())
+        for tenant in tenants:
+            if not tenant.is_idle():
+                continue
+            try:
+                with tenant.predictor.write_lock:
+                    tenant.predictor.sync_from_store()
+            except Exception as e:
+                print(f"站点 {tenant.site} 同步失败: {e}")
+
+    def start_sync(self, interval):
+        """启动后台同步线程，每 interval 秒同步一次"""
+        def run():
+            while not self._closed.wait(interval):
+                self.sync()
+
+        threading.Thread(target=run, name='site-sync', daemon=True).start()
+
+    def close(self, timeout=None):
+        """关闭所有站点的训练队列（不再接受新任务），等待已入队的任务完成，返回是否全部完成"""
+        self._closed.set()
+        with self._lock:
+            tenants = list(self._tenants.values())
+        for tenant in tenants:
+            tenant.close()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        finished = True
+        for tenant in tenants:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            finished = tenant.training_queue.join(remaining) and finished
+        return finished
+
+    def stats(self):
+        """注册表状态"""
+        with self._lock:
+            tenants = [t.info() for t in self._tenants.values()]
+            evictions = self._evictions
+        return {
+            'loaded_sites': tenants,
+            'loaded_count': len(tenants),
+            'memory_bytes': sum(t['memory_bytes'] for t in tenants),
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'max_sites': self.max_sites,
+            'evictions': evictions,
+        }
@@ -0,0 +1,248 @@
+import threading
+
+import numpy as np
+
+# 汇总统计返回的百分位
+PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+DAY_NAMES = ('周一', '周二', '周三', '周四', '周五', '周六', '周日')
+
+
+def day_of_week(days):
+    """距 1970-01-01 的天数 -> 星期（周一为 0；1970-01-01 是周四）"""
+    return (days + 3) % 7
+
+
+def week_key(days):
+    """所在周周一的天数"""
+    return days - day_of_week(days)
+
+
+def month_key(days):
+    """距 1970-01 的月数"""
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def format_day(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+def format_month(month):
+    return str(np.datetime64(int(month), 'M'))
+
+
+def parse_day(value):
+    """'YYYY-MM-DD' -> 距 1970-01-01 的天数"""
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def interpolate_percentile(sorted_values, q):
+    """在已排序数组上做线性插值百分位，O(1)"""
+    n = len(sorted_values)
+    if n == 0:
+        return None
+    pos = q / 100 * (n - 1)
+    lo = int(pos)
+    hi = min(lo + 1, n - 1)
+    return float(sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo))
+
+
+def rollup(keys, y, start_row=0):
+    """按连续的分组键汇总：返回各组的键、起始行、行数、和、平方和、最小值、最大值"""
+    if len(keys) == 0:
+        empty = np.empty(0)
+        return {'key': np.empty(0, dtype=np.int64), 'start': np.empty(0, dtype=np.int64),
+                'count': np.empty(0, dtype=np.int64), 'sum': empty, 'sumsq': empty, 'min': empty, 'max': empty}
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return {
+        'key': keys[starts],
+        'start': starts + start_row,
+        'count': np.diff(np.r_[starts, len(keys)]),
+        'sum': np.add.reduceat(y, starts),
+        'sumsq': np.add.reduceat(y * y, starts),
+        'min': np.minimum.reduceat(y, starts),
+        'max': np.maximum.reduceat(y, starts),
+    }
+
+
+def reserve(array, size):
+    """容量不足 size 时按倍数扩容（保留已有内容），追加的均摊代价为 O(1)"""
+    if len(array) >= size:
+        return array
+    grown = np.empty(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class StatsIndex:
+    """客流量（y 列）的增量统计索引
+
+    维护前缀和、前缀平方和、前缀最值、排序后的取值以及按周、按月、按星期的汇总。历史数据从第 first_row 行起
+    发生变化时只读取和重算该行之后的部分（按日期追加时即只处理新增行），按周、按月汇总从受影响的第一个分组起重算；
+    各数组按倍数扩容，之前的行原地保留、不复制。全局统计和百分位读取为 O(1)，
+    任意日期区间的行数、均值、标准差为 O(log n)。
+    """
+
+    ROLLUP_KEYS = {'week': week_key, 'month': month_key}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 以下数组有预留容量：行数组的有效部分为 [:_n]，前缀和为 [:_n + 1]
+        self._n = 0
+        self._ds = np.empty(0, dtype=np.int64)
+        self._y = np.empty(0)
+        self._cum_sum = np.zeros(1)
+        self._cum_sumsq = np.zeros(1)
+        self._cum_min = np.empty(0)
+        self._cum_max = np.empty(0)
+        self._sorted = np.empty(0)
+        self._dow_count = np.zeros(7, dtype=np.int64)
+        self._dow_sum = np.zeros(7)
+        self._dow_sumsq = np.zeros(7)
+        # 分组汇总数组同样预留容量，有效部分为 [:_rollup_len[kind]]
+        self._rollups = {kind: rollup(np.empty(0, dtype=np.int64), np.empty(0)) for kind in self.ROLLUP_KEYS}
+        self._rollup_len = {kind: 0 for kind in self.ROLLUP_KEYS}
+        self.version = None
+
+    def update(self, history, first_row=0):
+        """历史数据从 first_row 行起（含）发生了追加或修改后调用，只读取第 first_row 行之后的数据"""
+        n = history.n_rows
+        with self._lock:
+            r = max(0, min(first_row, self._n, n))
+            new_ds = np.array(history.dates()[r:], dtype=np.int64)
+            new_y = np.array(history.column('y')[r:], dtype=np.float64)
+            old_ds, old_y = self._ds[r:self._n], self._y[r:self._n]
+
+            # 按星期汇总：减去旧的尾部，加上新的尾部
+            for sign, part_ds, part_y in ((-1, old_ds, old_y), (1, new_ds, new_y)):
+                dow = day_of_week(part_ds)
+                self._dow_count += sign * np.bincount(dow, minlength=7)
+                self._dow_sum += sign * np.bincount(dow, weights=part_y, minlength=7)
+                self._dow_sumsq += sign * np.bincount(dow, weights=part_y * part_y, minlength=7)
+
+            # 排序数组：删除旧的尾部取值，插入新的尾部取值（重复值逐个对应删除）
+            if len(old_y):
+                old_sorted = np.sort(old_y)
+                rank = np.arange(len(old_sorted)) - np.searchsorted(old_sorted, old_sorted, 'left')
+                remaining = np.delete(self._sorted, np.searchsorted(self._sorted, old_sorted, 'left') + rank)
+            else:
+                remaining = self._sorted
+            new_sorted = np.sort(new_y)
+            self._sorted = np.insert(remaining, np.searchsorted(remaining, new_sorted), new_sorted)
+
+            # 行数据和前缀数组：第 r 行之前原样保留，只写入第 r 行之后
+            self._ds = reserve(self._ds, n)
+            self._y = reserve(self._y, n)
+            self._ds[r:n] = new_ds
+            self._y[r:n] = new_y
+            self._cum_sum = reserve(self._cum_sum, n + 1)
+            self._cum_sumsq = reserve(self._cum_sumsq, n + 1)
+            self._cum_sum[r + 1:n + 1] = self._cum_sum[r] + np.cumsum(new_y)
+            self._cum_sumsq[r + 1:n + 1] = self._cum_sumsq[r] + np.cumsum(new_y * new_y)
+            prev_min = self._cum_min[r - 1] if r else np.inf
+            prev_max = self._cum_max[r - 1] if r else -np.inf
+            self._cum_min = reserve(self._cum_min, n)
+            self._cum_max = reserve(self._cum_max, n)
+            self._cum_min[r:n] = np.minimum.accumulate(np.r_[prev_min, new_y])[1:]
+            self._cum_max[r:n] = np.maximum.accumulate(np.r_[prev_max, new_y])[1:]
+            self._n = n
+
+            # 按周、按月汇总：从第 r 行所在的分组起重算
+            for kind, key_fn in self.ROLLUP_KEYS.items():
+                current = self._rollups[kind]
+                keep = self._rollup_len[kind]
+                start_row = n
+                if r < n:
+                    keep = int(np.searchsorted(current['key'][:keep], key_fn(new_ds[:1])[0]))
+                    start_row = int(current['start'][keep]) if keep < self._rollup_len[kind] else r
+                    start_row = min(start_row, r)
+                tail = rollup(key_fn(self._ds[start_row:n]), self._y[start_row:n], start_row)
+                size = keep + len(tail['key'])
+                for name in current:
+                    current[name] = reserve(current[name], size)
+                    current[name][keep:size] = tail[name]
+                self._rollup_len[kind] = size
+
+            self.version = history.version
+
+    @staticmethod
+    def _moments(count, total, total_sq):
+        if count == 0:
+            return None, None
+        mean = total / count
+        var = max(total_sq / count - mean * mean, 0.0)
+        return float(mean), float(np.sqrt(var))
+
+    def summary(self):
+        """全局统计：行数、均值、标准差、最值、日期范围和百分位（O(1)）"""
+        with self._lock:
+            n = self._n
+            mean, std = self._moments(n, self._cum_sum[n], self._cum_sumsq[n])
+            return {
+                'count': n,
+                'mean': mean,
+                'std': std,
+                'min': float(self._cum_min[n - 1]) if n else None,
+                'max': float(self._cum_max[n - 1]) if n else None,
+                'start_date': format_day(self._ds[0]) if n else None,
+                'end_date': format_day(self._ds[n - 1]) if n else None,
+                'percentiles': {f'p{q}': interpolate_percentile(self._sorted, q) for q in PERCENTILES},
+            }
+
+    def day_of_week(self):
+        """按星期汇总"""
+        with self._lock:
+            result = []
+            for dow in range(7):
+                count = int(self._dow_count[dow])
+                mean, std = self._moments(count, self._dow_sum[dow], self._dow_sumsq[dow])
+                result.append({'day_of_week': dow, 'name': DAY_NAMES[dow], 'count': count, 'mean': mean, 'std': std})
+            return result
+
+    def rollup(self, kind, start=None, end=None):
+        """按周（week）或按月（month）汇总，可限定日期区间 [start, end]（天数）"""
+        with self._lock:
+            size = self._rollup_len[kind]
+            data = {name: values[:size] for name, values in self._rollups[kind].items()}
+            key_fn = self.ROLLUP_KEYS[kind]
+            lo = 0 if start is None else int(np.searchsorted(data['key'], key_fn(np.array([start]))[0], 'left'))
+            hi = len(data['key']) if end is None else int(np.searchsorted(data['key'], key_fn(np.array([end]))[0], 'right'))
+            fmt = format_day if kind == 'week' else format_month
+            buckets = []
+            for i in range(lo, hi):
+                count = int(data['count'][i])
+                mean, std = self._moments(count, data['sum'][i], data['sumsq'][i])
+                buckets.append({
+                    kind: fmt(data['key'][i]),
+                    'count': count,
+                    'sum': float(data['sum'][i]),
+                    'mean': mean,
+                    'std': std,
+                    'min': float(data['min'][i]),
+                    'max': float(data['max'][i]),
+                })
+            return buckets
+
+    def range(self, start=None, end=None):
+        """日期区间 [start, end]（天数）的统计：行数、和、均值、标准差由前缀和 O(log n) 得到，最值和百分位扫描区间"""
+        with self._lock:
+            ds = self._ds[:self._n]
+            lo = 0 if start is None else int(np.searchsorted(ds, start, 'left'))
+            hi = self._n if end is None else int(np.searchsorted(ds, end, 'right'))
+            count = max(hi - lo, 0)
+            if count == 0:
+                return {'count': 0, 'sum': 0.0, 'mean': None, 'std': None, 'min': None, 'max': None,
+                        'start_date': None, 'end_date': None, 'percentiles': {}}
+            total = self._cum_sum[hi] - self._cum_sum[lo]
+            mean, std = self._moments(count, total, self._cum_sumsq[hi] - self._cum_sumsq[lo])
+            window = np.sort(self._y[lo:hi])
+            return {
+                'count': count,
+                'sum': float(total),
+                'mean': mean,
+                'std': std,
+                'min': float(window[0]),
+                'max': float(window[-1]),
+                'start_date': format_day(self._ds[lo]),
+                'end_date': format_day(self._ds[hi - 1]),
+                'percentiles': {f'p{q}': interpolate_percentile(window, q) for q in PERCENTILES},
+            }
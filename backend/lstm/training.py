@@ -0,0 +1,612 @@
+"""训练流水线：数据加载、70/30 划分、MinMax 归一化、构造窗口、建模、训练、评估和未来 n 天预测
+
+两个离线脚本（Based_on_LSTM_... / Self_Build_Based_on_LSTM_...）、后端 LSTMPredictor 和命令行共用这一份实现，
+由 TrainingConfig 选择数据、结构（Keras 双向 LSTM 或 ManualLSTM）、轮数和批大小。
+训练输入默认走 tf.data：归一化后的特征在图内切窗口、缓存、有界缓冲区打乱并预取；批大小变化时按规则调整学习率。
+验证集损失不再下降时提前停止并恢复最优权重；传入 Checkpointer 时定期把训练状态写入模型仓库，崩溃或重新部署后从最后一个检查点继续。
+
+命令行（无界面运行离线实验）:
+    python backend/lstm/training.py --data backend/lstm/more_test.csv --architecture manual --epochs 150
+    python backend/lstm/training.py --config experiment.json --output report.json --model-store /tmp/models
+"""
+import sys
+import json
+import math
+import hashlib
+import time
+import argparse
+from dataclasses import dataclass, field, asdict, fields
+from datetime import timedelta
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from windowing import make_windows
+
+# 可选的网络结构
+ARCHITECTURES = ('bilstm', 'manual', 'bimanual')
+# 训练输入：dataset（tf.data 流水线）或 numpy（整个窗口数组交给 model.fit）
+INPUT_PIPELINES = ('dataset', 'numpy')
+# 批大小相对 base_batch_size 变化时学习率的调整方式
+LR_SCALING = ('none', 'linear', 'sqrt')
+# 只影响训练何时结束或输出的字段，修改后仍可从检查点继续训练
+RESUMABLE_FIELDS = ('data_path', 'epochs', 'early_stopping_patience', 'min_delta', 'restore_best_weights',
+                    'checkpoint_every', 'forecast_days', 'verbose')
+# 特征列为第 3 到第 28 列（共 25 个）
+FEATURE_SLICE = slice(3, 28)
+TARGET_COL = 'y'
+
+
+@dataclass
+class TrainingConfig:
+    """训练配置
+
+    architecture: bilstm（Keras Bidirectional(LSTM)）、manual（单向 ManualLSTM）、bimanual（双向 ManualLSTM）
+    l2 只作用于 Keras LSTM 的输入权重；unroll 只作用于 ManualLSTM；mixed_precision 时循环层用 bfloat16 计算
+    learning_rate 对应 base_batch_size，batch_size 不同时按 lr_scaling（线性或平方根）调整，见 scaled_learning_rate
+    epochs 为上限：val_loss 连续 early_stopping_patience 个 epoch 没有改善超过 min_delta 时提前停止（0 为不早停），
+    restore_best_weights 时训练结束后恢复最优 epoch 的权重；checkpoint_every 为检查点间隔（epoch 数，0 为不写检查点）
+    """
+
+    data_path: str = 'more_train.csv'
+    architecture: str = 'bilstm'
+    units: tuple = (128, 64)
+    dropout: tuple = (0.25, 0.2)
+    l2: float = 0.0
+    epochs: int = 50
+    batch_size: int = 32
+    learning_rate: float = 1e-3
+    base_batch_size: int = 32
+    lr_scaling: str = 'sqrt'
+    input_pipeline: str = 'dataset'
+    shuffle_buffer: int = 1024
+    early_stopping_patience: int = 10
+    min_delta: float = 0.0
+    restore_best_weights: bool = True
+    checkpoint_every: int = 5
+    time_step: int = 10
+    train_ratio: float = 0.7
+    unroll: bool = True
+    jit_compile: bool = False
+    mixed_precision: bool = False
+    forecast_days: int = 7
+    verbose: int = 0
+
+    def __post_init__(self):
+        if self.architecture not in ARCHITECTURES:
+            raise ValueError(f"未知的网络结构: {self.architecture}，可选 {', '.join(ARCHITECTURES)}")
+        if self.input_pipeline not in INPUT_PIPELINES:
+            raise ValueError(f"未知的训练输入方式: {self.input_pipeline}，可选 {', '.join(INPUT_PIPELINES)}")
+        if self.lr_scaling not in LR_SCALING:
+            raise ValueError(f"未知的学习率调整方式: {self.lr_scaling}，可选 {', '.join(LR_SCALING)}")
+        if self.batch_size <= 0 or self.base_batch_size <= 0:
+            raise ValueError("batch_size 和 base_batch_size 必须为正数")
+        self.units = tuple(self.units)
+        self.dropout = tuple(self.dropout)
+        if len(self.units) != len(self.dropout):
+            raise ValueError("units 和 dropout 的层数不一致")
+
+    @classmethod
+    def from_dict(cls, values):
+        """从字典创建，忽略未知字段"""
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in values.items() if k in names})
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        values = asdict(self)
+        values['units'] = list(self.units)
+        values['dropout'] = list(self.dropout)
+        return values
+
+
+@dataclass
+class PreparedData:
+    """划分、归一化并构造好窗口的训练数据"""
+
+    train_df: Any
+    test_df: Any
+    feature_cols: list
+    scaler_X: Any
+    scaler_y: Any
+    x_train: np.ndarray
+    y_train: np.ndarray
+    x_test: np.ndarray
+    y_test: np.ndarray
+    # 归一化后的连续特征和目标（x_*/y_* 是其上的窗口视图），tf.data 流水线直接在它们上切窗口
+    X_train_scaled: np.ndarray = None
+    y_train_scaled: np.ndarray = None
+    X_test_scaled: np.ndarray = None
+    y_test_scaled: np.ndarray = None
+
+
+@dataclass
+class TrainingProgress:
+    """训练进度：逐 epoch 的损失和耗时、早停状态；同时是检查点中保存的训练状态"""
+
+    monitor: str = 'val_loss'
+    # 已完成的 epoch 数
+    epoch: int = 0
+    history: dict = field(default_factory=dict)
+    epoch_seconds: list = field(default_factory=list)
+    # 最优 epoch（从 1 开始，0 为尚无）及其指标
+    best_epoch: int = 0
+    best_loss: float = None
+    # 最优 epoch 之后没有改善的 epoch 数
+    wait: int = 0
+    stopped_early: bool = False
+    # 从检查点恢复时已完成的 epoch 数
+    resumed_from: int = 0
+
+    @classmethod
+    def from_dict(cls, values):
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in values.items() if k in names})
+
+    def to_dict(self):
+        return asdict(self)
+
+    def record(self, epoch, logs, seconds):
+        """记录一个 epoch 的损失和耗时"""
+        self.epoch = epoch
+        for name, value in logs.items():
+            self.history.setdefault(name, []).append(float(value))
+        self.epoch_seconds.append(float(seconds))
+
+    def epochs(self):
+        """逐 epoch 的损失和耗时 [{'epoch', 'loss', 'val_loss', 'seconds'}]"""
+        rows = []
+        for k, seconds in enumerate(self.epoch_seconds):
+            row = {'epoch': k + 1, 'seconds': round(seconds, 3)}
+            row.update({name: values[k] for name, values in self.history.items() if k < len(values)})
+            rows.append(row)
+        return rows
+
+    def summary(self):
+        """给运维查看的摘要：实际训练的 epoch 数、总耗时（含恢复前的 epoch）、早停和恢复情况以及逐 epoch 明细"""
+        return {
+            'epochs_run': self.epoch,
+            'train_seconds': round(sum(self.epoch_seconds), 3),
+            'monitor': self.monitor,
+            'best_epoch': self.best_epoch,
+            'best_loss': self.best_loss,
+            'stopped_early': self.stopped_early,
+            'resumed_from': self.resumed_from,
+            'epochs': self.epochs(),
+        }
+
+
+class Checkpointer:
+    """训练检查点：每 every 个 epoch 把模型权重、优化器状态、最优权重和训练进度写入模型仓库
+
+    key 由训练数据哈希和影响训练过程的配置决定，进程崩溃或重新部署后同一数据、同一配置的训练从最后一个检查点继续
+    """
+
+    def __init__(self, store, key, every=5):
+        self.store = store
+        self.key = key
+        self.every = every
+
+    @staticmethod
+    def make_key(data_hash, config):
+        values = {k: v for k, v in config.to_dict().items() if k not in RESUMABLE_FIELDS}
+        payload = json.dumps({'data_hash': data_hash, 'config': values}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    def due(self, epoch, epochs):
+        """第 epoch 个 epoch 结束后是否写检查点（最后一个 epoch 总是写）"""
+        return bool(self.every) and (epoch % self.every == 0 or epoch >= epochs)
+
+    def restore(self, model):
+        """恢复模型和优化器状态，返回 (TrainingProgress, 最优权重)；没有检查点或恢复失败时返回 None"""
+        try:
+            checkpoint = self.store.load_checkpoint(self.key, model)
+        except Exception as e:
+            print(f"训练检查点 {self.key} 恢复失败，重新开始训练: {e}")
+            return None
+        if checkpoint is None:
+            return None
+        state, best_weights = checkpoint
+        return TrainingProgress.from_dict(state), best_weights
+
+    def save(self, model, progress, best_weights=None):
+        try:
+            self.store.save_checkpoint(self.key, model, progress.to_dict(), best_weights)
+        except Exception as e:
+            # 检查点只用于恢复，写入失败不影响本次训练
+            print(f"训练检查点写入失败: {e}")
+
+    def clear(self):
+        self.store.clear_checkpoints(self.key)
+
+
+@dataclass
+class TrainingResult:
+    """一次训练的全部产出"""
+
+    config: TrainingConfig
+    model: Any
+    data: PreparedData
+    history: dict
+    train_metrics: dict
+    test_metrics: dict
+    y_test_true: np.ndarray
+    y_test_pred: np.ndarray
+    forecast: list
+    forecast_dates: list
+    train_seconds: float
+    epoch_seconds: list = field(default_factory=list)
+    progress: TrainingProgress = None
+
+    @property
+    def samples_per_second(self):
+        """训练吞吐：训练样本数 / 每个 epoch 耗时的中位数（首个 epoch 含图追踪，不计入）"""
+        steady = self.epoch_seconds[1:] or self.epoch_seconds
+        if not steady:
+            return 0.0
+        return len(self.data.y_train) / float(np.median(steady))
+
+    def report(self):
+        """可 JSON 序列化的摘要"""
+        return {
+            'config': self.config.to_dict(),
+            'train_metrics': self.train_metrics,
+            'test_metrics': self.test_metrics,
+            'train_seconds': round(self.train_seconds, 3),
+            'epoch_seconds': [round(s, 3) for s in self.epoch_seconds],
+            'samples_per_second': round(self.samples_per_second, 1),
+            'training': self.progress.summary() if self.progress else None,
+            'forecast': [{'date': d.strftime('%Y-%m-%d'), 'visitors': float(v)}
+                         for d, v in zip(self.forecast_dates, self.forecast)],
+        }
+
+
+def feature_columns(df):
+    """特征列：第 3 到第 28 列"""
+    return df.columns[FEATURE_SLICE].tolist()
+
+
+def load_csv(path):
+    """读取训练数据 CSV，解析日期列"""
+    df = pd.read_csv(path)
+    df['ds'] = pd.to_datetime(df['ds'])
+    return df
+
+
+def split_frame(df, train_ratio=0.7):
+    """按时间顺序划分训练/测试集（iloc 切片，不复制）"""
+    train_size = int(len(df) * train_ratio)
+    return df.iloc[:train_size], df.iloc[train_size:]
+
+
+def prepare_data(df, feature_cols, time_step=10, train_ratio=0.7):
+    """划分、在训练集上拟合 MinMax 归一化器并构造 LSTM 窗口"""
+    from sklearn.preprocessing import MinMaxScaler
+
+    train_df, test_df = split_frame(df, train_ratio)
+    X_train = train_df[feature_cols].values
+    y_train = train_df[TARGET_COL].values.reshape(-1, 1)
+    X_test = test_df[feature_cols].values
+    y_test = test_df[TARGET_COL].values.reshape(-1, 1)
+
+    scaler_X = MinMaxScaler(feature_range=(0, 1))
+    scaler_y = MinMaxScaler(feature_range=(0, 1))
+    X_train_scaled = scaler_X.fit_transform(X_train)
+    y_train_scaled = scaler_y.fit_transform(y_train)
+    X_test_scaled = scaler_X.transform(X_test)
+    y_test_scaled = scaler_y.transform(y_test)
+
+    x_train_lstm, y_train_lstm = make_windows(X_train_scaled, y_train_scaled, time_step)
+    x_test_lstm, y_test_lstm = make_windows(X_test_scaled, y_test_scaled, time_step)
+    return PreparedData(train_df, test_df, list(feature_cols), scaler_X, scaler_y,
+                        x_train_lstm, y_train_lstm, x_test_lstm, y_test_lstm,
+                        X_train_scaled, y_train_scaled, X_test_scaled, y_test_scaled)
+
+
+def windowed_dataset(X, y, time_step, batch_size, shuffle_buffer=0, seed=None):
+    """tf.data 训练输入：与 make_windows 对齐（第 i 个样本为 X[i:i+time_step]，目标为 y[i+time_step, 0]）
+
+    特征只转换一次为 float32 常量，窗口在图内用下标切出；第一轮之后窗口从缓存读取，
+    shuffle_buffer > 0 时用有界缓冲区逐轮打乱，分批后预取，下一批的准备与当前批的训练重叠
+    """
+    import tensorflow as tf
+
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32).reshape(len(X), -1)[:, 0]
+    n_samples = len(X) - time_step
+    if n_samples <= 0:
+        raise ValueError(f"数据只有 {len(X)} 行，不足以构造时间步为 {time_step} 的样本")
+    # 长度 len(X)-1 的数据恰好切出 n_samples 个窗口
+    dataset = tf.keras.utils.timeseries_dataset_from_array(
+        X[:-1], y[time_step:], sequence_length=time_step, batch_size=None, shuffle=False)
+    dataset = dataset.cache()
+    if shuffle_buffer:
+        dataset = dataset.shuffle(min(shuffle_buffer, n_samples), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def scaled_learning_rate(config):
+    """按批大小调整后的学习率：linear 与批大小成正比，sqrt 与其平方根成正比"""
+    ratio = config.batch_size / config.base_batch_size
+    if config.lr_scaling == 'linear':
+        return config.learning_rate * ratio
+    if config.lr_scaling == 'sqrt':
+        return config.learning_rate * math.sqrt(ratio)
+    return config.learning_rate
+
+
+def build_model(config, n_features):
+    """按配置构建并编译模型：循环层 units[k] + Dropout(dropout[k])，最后 Dense(1)"""
+    import tensorflow as tf
+    from tensorflow.keras.layers import LSTM, Bidirectional, Dense, Dropout
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import Adam
+    from tensorflow.keras.regularizers import l2
+    from manual_lstm import ManualLSTM
+
+    dtype = 'mixed_bfloat16' if config.mixed_precision else None
+    layers = [tf.keras.Input(shape=(config.time_step, n_features))]
+    for k, (units, rate) in enumerate(zip(config.units, config.dropout)):
+        return_sequences = k < len(config.units) - 1
+        if config.architecture == 'bilstm':
+            regularizer = l2(config.l2) if config.l2 else None
+            layers.append(Bidirectional(LSTM(units, return_sequences=return_sequences,
+                                             kernel_regularizer=regularizer, dtype=dtype)))
+        else:
+            recurrent = ManualLSTM(units, return_sequences=return_sequences, unroll=config.unroll, dtype=dtype)
+            layers.append(Bidirectional(recurrent) if config.architecture == 'bimanual' else recurrent)
+        layers.append(Dropout(rate))
+    # 输出层保持 float32
+    layers.append(Dense(1, dtype='float32'))
+
+    model = Sequential(layers)
+    model.compile(optimizer=Adam(learning_rate=scaled_learning_rate(config)), loss='mse',
+                  jit_compile=config.jit_compile)
+    return model
+
+
+def fit_model(model, data, config, callbacks=None, progress_callback=None, checkpointer=None):
+    """训练模型，返回 TrainingProgress
+
+    以 val_loss（没有测试窗口时为 loss）为指标早停，结束时恢复最优权重；传入 checkpointer 时先从检查点恢复，
+    之后按 checkpoint_every 写检查点。progress_callback(epoch, epochs, logs) 在每个 epoch 结束时调用，
+    logs 中的 epoch_seconds 为该 epoch 的耗时
+    """
+    import tensorflow as tf
+
+    has_validation = len(data.y_test) > 0
+    progress = TrainingProgress(monitor='val_loss' if has_validation else 'loss')
+    best_weights = None
+    restored = checkpointer.restore(model) if checkpointer is not None else None
+    if restored is not None:
+        progress, best_weights = restored
+        progress.resumed_from = progress.epoch
+        print(f"从训练检查点恢复：已完成 {progress.epoch}/{config.epochs} 个 epoch")
+
+    class TrainingMonitor(tf.keras.callbacks.Callback):
+        """记录损失和耗时、早停、写检查点并上报进度"""
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self.start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            nonlocal best_weights
+            seconds = time.perf_counter() - self.start
+            logs = {k: float(v) for k, v in (logs or {}).items()}
+            progress.record(epoch + 1, logs, seconds)
+            current = logs.get(progress.monitor)
+            if current is not None and (progress.best_loss is None or current < progress.best_loss - config.min_delta):
+                progress.best_loss, progress.best_epoch, progress.wait = current, epoch + 1, 0
+                if config.restore_best_weights:
+                    best_weights = self.model.get_weights()
+            else:
+                progress.wait += 1
+                if config.early_stopping_patience and progress.wait >= config.early_stopping_patience:
+                    progress.stopped_early = True
+                    self.model.stop_training = True
+            if checkpointer is not None and (progress.stopped_early or checkpointer.due(epoch + 1, config.epochs)):
+                checkpointer.save(self.model, progress, best_weights)
+            if progress_callback is not None:
+                progress_callback(epoch + 1, config.epochs, dict(logs, epoch_seconds=seconds))
+
+    if progress.epoch < config.epochs and not progress.stopped_early:
+        callbacks = [TrainingMonitor()] + list(callbacks or [])
+        if config.input_pipeline == 'dataset' and data.X_train_scaled is not None:
+            train = windowed_dataset(data.X_train_scaled, data.y_train_scaled, config.time_step, config.batch_size,
+                                     config.shuffle_buffer)
+            validation = None
+            if has_validation:
+                validation = windowed_dataset(data.X_test_scaled, data.y_test_scaled, config.time_step,
+                                              config.batch_size)
+            model.fit(train, epochs=config.epochs, initial_epoch=progress.epoch, verbose=config.verbose,
+                      validation_data=validation, callbacks=callbacks)
+        else:
+            model.fit(
+                data.x_train, data.y_train,
+                epochs=config.epochs,
+                initial_epoch=progress.epoch,
+                batch_size=config.batch_size,
+                verbose=config.verbose,
+                validation_data=(data.x_test, data.y_test) if has_validation else None,
+                callbacks=callbacks,
+            )
+
+    if best_weights is not None and progress.best_epoch != progress.epoch:
+        model.set_weights(best_weights)
+        print(f"恢复第 {progress.best_epoch} 个 epoch 的最优权重（{progress.monitor} {progress.best_loss:.6f}）")
+    return progress
+
+
+def calc_metrics(y_true, y_pred):
+    """MSE、MAE、RMSE、MAPE"""
+    y_true = np.asarray(y_true, dtype=np.float64).reshape(-1)
+    y_pred = np.asarray(y_pred, dtype=np.float64).reshape(-1)
+    errors = y_true - y_pred
+    mse = float(np.mean(errors ** 2))
+    return {
+        'mse': mse,
+        'mae': float(np.mean(np.abs(errors))),
+        'rmse': math.sqrt(mse),
+        'mape': float(np.mean(np.abs(errors / (y_true + 1e-8))) * 100),
+    }
+
+
+def predict_targets(model, scaler_y, x):
+    """对窗口预测并反归一化，返回 (样本数, 1)"""
+    if len(x) == 0:
+        return np.empty((0, 1))
+    return scaler_y.inverse_transform(np.asarray(model.predict(x, verbose=0), dtype=np.float64).reshape(-1, 1))
+
+
+def evaluate_model(model, scaler_y, x_test, y_test):
+    """在测试集上计算评估指标；accuracy 为未来 7 天准确率参考（用测试集最后 3 天误差代替，不足 3 天时用整体 MAPE）"""
+    y_test_pred = predict_targets(model, scaler_y, x_test)
+    y_test_true = scaler_y.inverse_transform(np.asarray(y_test).reshape(-1, 1))
+    metrics = calc_metrics(y_test_true, y_test_pred)
+    if len(y_test_true) >= 3:
+        metrics['accuracy'] = 100 - calc_metrics(y_test_true[-3:], y_test_pred[-3:])['mape']
+    else:
+        metrics['accuracy'] = 100 - metrics['mape']
+    return metrics
+
+
+def predict_next_days(model, scaler_X, scaler_y, last_window, n_days=7):
+    """从最后 time_step 天的原始特征出发预测未来 n_days 天（未来特征沿用最后一天），一次前向传播完成"""
+    from forecasting import forecast_batch
+    from model_bundle import ModelBundle
+
+    last_window = np.asarray(last_window, dtype=np.float64)
+    bundle = ModelBundle(model=model, scaler_X=scaler_X, scaler_y=scaler_y,
+                         feature_cols=tuple(range(last_window.shape[1])), time_step=last_window.shape[0])
+    return forecast_batch(bundle, last_window[None], n_days)[0].tolist()
+
+
+def run_pipeline(config, df=None, callbacks=None, checkpointer=None):
+    """完整流水线：加载（未传入 df 时读取 config.data_path）、训练、评估并预测未来 config.forecast_days 天"""
+    if df is None:
+        df = load_csv(config.data_path)
+    feature_cols = feature_columns(df)
+    data = prepare_data(df, feature_cols, config.time_step, config.train_ratio)
+
+    model = build_model(config, len(feature_cols))
+    start = time.perf_counter()
+    progress = fit_model(model, data, config, callbacks, checkpointer=checkpointer)
+    train_seconds = time.perf_counter() - start
+
+    y_train_true = data.scaler_y.inverse_transform(data.y_train.reshape(-1, 1))
+    y_train_pred = predict_targets(model, data.scaler_y, data.x_train)
+    y_test_true = data.scaler_y.inverse_transform(data.y_test.reshape(-1, 1))
+    y_test_pred = predict_targets(model, data.scaler_y, data.x_test)
+    test_metrics = evaluate_model(model, data.scaler_y, data.x_test, data.y_test)
+
+    last_window = data.test_df[feature_cols].values[-config.time_step:]
+    forecast = predict_next_days(model, data.scaler_X, data.scaler_y, last_window, config.forecast_days)
+    last_date = data.test_df['ds'].iloc[-1]
+    forecast_dates = [last_date + timedelta(days=i + 1) for i in range(config.forecast_days)]
+
+    return TrainingResult(
+        config=config,
+        model=model,
+        data=data,
+        history=progress.history,
+        train_metrics=calc_metrics(y_train_true, y_train_pred),
+        test_metrics=test_metrics,
+        y_test_true=y_test_true,
+        y_test_pred=y_test_pred,
+        forecast=forecast,
+        forecast_dates=forecast_dates,
+        train_seconds=train_seconds,
+        epoch_seconds=progress.epoch_seconds,
+        progress=progress,
+    )
+
+
+def print_report(result):
+    """打印预测和评估结果"""
+    print(f"\n=== 后续 {len(result.forecast)} 日客流量预测 ===")
+    for d, p in zip(result.forecast_dates, result.forecast):
+        print(f"{d.strftime('%Y-%m-%d')}: {p:.0f} 人")
+
+    print("\n=== 未来七天预测准确率参考（基于测试集最后几天）===")
+    print(f"准确率: {result.test_metrics['accuracy']:.2f}%")
+    print("(注意: 这是基于测试集最后几天的参考值，不是真实未来数据的准确率)")
+
+    print("\n=== 模型评估 ===")
+    for name, m in (('Train', result.train_metrics), ('Test ', result.test_metrics)):
+        print(f"{name} MSE: {m['mse']:.4f} | MAE: {m['mae']:.4f} | RMSE: {m['rmse']:.4f} | MAPE: {m['mape']:.2f}%")
+    print(f"\n训练用时 {result.train_seconds:.1f} 秒（{len(result.epoch_seconds)} 个 epoch）")
+    if result.epoch_seconds:
+        steady = result.epoch_seconds[1:] or result.epoch_seconds
+        print(f"每个 epoch 耗时中位数 {np.median(steady):.2f} 秒（首个 epoch {result.epoch_seconds[0]:.2f} 秒，"
+              f"{result.samples_per_second:.0f} 样本/秒，{result.config.input_pipeline} 输入，"
+              f"批大小 {result.config.batch_size}，学习率 {scaled_learning_rate(result.config):.2e}）")
+    progress = result.progress
+    if progress is not None:
+        if progress.resumed_from:
+            print(f"从检查点恢复训练，恢复前已完成 {progress.resumed_from} 个 epoch")
+        if progress.stopped_early:
+            print(f"{progress.monitor} 连续 {result.config.early_stopping_patience} 个 epoch 没有改善，"
+                  f"在第 {progress.epoch}/{result.config.epochs} 个 epoch 提前停止")
+        if progress.best_epoch and result.config.restore_best_weights:
+            print(f"使用第 {progress.best_epoch} 个 epoch 的权重（{progress.monitor} {progress.best_loss:.6f}）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='LSTM 客流量预测离线训练')
+    parser.add_argument('--config', help='JSON 配置文件，命令行参数覆盖其中的同名字段')
+    parser.add_argument('--data', dest='data_path')
+    parser.add_argument('--architecture', choices=ARCHITECTURES)
+    parser.add_argument('--epochs', type=int)
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--learning-rate', type=float, help='对应 --base-batch-size 的学习率')
+    parser.add_argument('--base-batch-size', type=int)
+    parser.add_argument('--lr-scaling', choices=LR_SCALING)
+    parser.add_argument('--input-pipeline', choices=INPUT_PIPELINES)
+    parser.add_argument('--shuffle-buffer', type=int)
+    parser.add_argument('--l2', type=float)
+    parser.add_argument('--time-step', type=int)
+    parser.add_argument('--forecast-days', type=int)
+    parser.add_argument('--jit-compile', action='store_true', default=None)
+    parser.add_argument('--mixed-precision', action='store_true', default=None)
+    parser.add_argument('--early-stopping-patience', type=int, help='val_loss 连续多少个 epoch 没有改善时停止，0 为不早停')
+    parser.add_argument('--checkpoint-every', type=int, help='每隔多少个 epoch 写一次检查点（需要 --model-store）')
+    parser.add_argument('--verbose', type=int)
+    parser.add_argument('--output', help='把评估结果和预测写入 JSON 文件')
+    parser.add_argument('--model-store', help='把训练好的模型保存为该模型仓库中的新版本；训练中断后再次运行时从检查点继续')
+    args = parser.parse_args(argv)
+
+    values = TrainingConfig.load(args.config).to_dict() if args.config else {}
+    values.update({k: v for k, v in vars(args).items() if v is not None and k not in ('config', 'output', 'model_store')})
+    config = TrainingConfig.from_dict(values)
+
+    df = load_csv(config.data_path)
+    store = checkpointer = data_hash = None
+    if args.model_store:
+        from model_store import ModelStore
+
+        store = ModelStore(args.model_store)
+        data_hash = ModelStore.compute_data_hash(df, feature_columns(df), config.time_step)
+        checkpointer = Checkpointer(store, Checkpointer.make_key(data_hash, config), config.checkpoint_every)
+    result = run_pipeline(config, df, checkpointer=checkpointer)
+    print_report(result)
+
+    report = result.report()
+    if store is not None:
+        report['model_version'] = store.save(
+            result.model, result.data.scaler_X, result.data.scaler_y, result.data.feature_cols, config.time_step,
+            result.test_metrics, data_hash, training_config=config.to_dict(), training=result.progress.summary())
+        checkpointer.clear()
+        print(f"模型已保存到 {args.model_store}，版本 {report['model_version']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
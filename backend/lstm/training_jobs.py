@@ -0,0 +1,219 @@
+import uuid
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+
+class TrainingJob:
+    """一次后台训练任务，可合并多次数据更新"""
+
+    def __init__(self, mode='full'):
+        self.id = uuid.uuid4().hex
+        # full: 全量重训；incremental: 基于当前权重增量更新
+        self.mode = mode
+        self.status = 'pending'
+        self.operations = []
+        self.epoch = 0
+        self.total_epochs = 0
+        self.logs = {}
+        # 逐 epoch 的损失和耗时 [{'epoch', 'loss', 'val_loss', 'epoch_seconds'}]
+        self.epoch_log = []
+        self.message = '等待训练'
+        self.result = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def progress(self):
+        """训练进度（0~1）"""
+        if self.status in ('succeeded', 'failed'):
+            return 1.0
+        if not self.total_epochs:
+            return 0.0
+        return min(1.0, self.epoch / self.total_epochs)
+
+    def update_progress(self, epoch, total_epochs, logs=None):
+        """训练回调：记录当前轮次和该轮的损失、耗时"""
+        self.epoch = epoch
+        self.total_epochs = total_epochs
+        self.logs = {k: float(v) for k, v in (logs or {}).items()}
+        self.epoch_log.append(dict(self.logs, epoch=epoch))
+        self.message = f"训练中 {epoch}/{total_epochs}"
+
+    def progress_dict(self):
+        """进度信息"""
+        return {
+            'job_id': self.id,
+            'mode': self.mode,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'epoch': self.epoch,
+            'total_epochs': self.total_epochs,
+            'logs': self.logs,
+            'compute_seconds': round(sum(e.get('epoch_seconds', 0.0) for e in self.epoch_log), 3),
+            'message': self.message,
+        }
+
+    def to_dict(self):
+        """任务完整信息"""
+        fmt = '%Y-%m-%d %H:%M:%S'
+        info = self.progress_dict()
+        info.update({
+            'operations': [{'type': op_type} for op_type, _ in self.operations],
+            'merged_updates': len(self.operations),
+            'epochs': list(self.epoch_log),
+            'result': self.result,
+            'created_at': self.created_at.strftime(fmt),
+            'started_at': self.started_at.strftime(fmt) if self.started_at else None,
+            'finished_at': self.finished_at.strftime(fmt) if self.finished_at else None,
+        })
+        return info
+
+
+class TrainingJobQueue:
+    """单写者训练队列：一个后台线程按顺序应用数据更新并训练模型
+
+    on_finish(job, operations, applied) 在每个任务结束后（无论成功与否）于后台线程中调用，
+    applied 为各数据更新的结果，与 operations 一一对应（任务中途失败时可能较短）。
+    """
+
+    def __init__(self, predictor, max_history=100, on_finish=None):
+        self.predictor = predictor
+        self.max_history = max_history
+        self.on_finish = on_finish
+        self._jobs = OrderedDict()
+        self._queue = deque()
+        self._pending = None
+        self._running = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name='training-worker', daemon=True)
+        self._worker.start()
+
+    def submit(self, op_type, payload, mode='full'):
+        """提交数据更新；若已有等待中的任务则合并进该任务，任一更新需要全量重训时整个任务全量重训"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("训练队列已关闭")
+            job = self._pending
+            if job is None:
+                job = TrainingJob(mode)
+                self._jobs[job.id] = job
+                self._queue.append(job)
+                self._pending = job
+                self._trim_history()
+            elif mode == 'full':
+                job.mode = 'full'
+            job.operations.append((op_type, payload))
+            self._cond.notify()
+            return job
+
+    def get(self, job_id):
+        """按ID获取任务"""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        """按创建时间倒序列出任务"""
+        with self._cond:
+            return list(reversed(self._jobs.values()))
+
+    def is_idle(self):
+        """没有等待中或正在执行的任务"""
+        with self._cond:
+            return not self._queue and self._running is None
+
+    def close(self):
+        """关闭队列：不再接受新任务，已入队的任务执行完后后台线程退出"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def join(self, timeout=None):
+        """等待后台线程退出（先调用 close），返回是否已退出"""
+        self._worker.join(timeout)
+        return not self._worker.is_alive()
+
+    def _trim_history(self):
+        """只保留最近 max_history 个已结束的任务"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ('succeeded', 'failed')]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def _run(self):
+        """后台线程主循环"""
+        while True:
+            with self._cond:
+                while not self._queue:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                job = self._queue.popleft()
+                self._running = job
+                # 开始执行后不再合并新数据，新数据进入下一个任务
+                if self._pending is job:
+                    self._pending = None
+                job.status = 'running'
+                job.started_at = datetime.now()
+                job.message = '正在应用数据更新'
+                operations = list(job.operations)
+            self._execute(job, operations)
+            with self._cond:
+                self._running = None
+
+    def _execute(self, job, operations):
+        """在写锁内应用数据更新（先同步其他进程写入的数据和模型），再在训练锁内训练
+
+        训练期间不持有写锁，其他 worker 的启动、同步和数据写入不会被训练阻塞
+        """
+        applied = []
+        try:
+            with self.predictor.write_lock:
+                self.predictor.sync_from_store()
+                for op_type, payload in operations:
+                    if op_type == 'file':
+                        result = self.predictor.merge_data_file(payload['path'])
+                    elif op_type == 'single':
+                        result = self.predictor.upsert_single_day(**payload)
+                    else:
+                        result = {"status": "error", "message": f"未知的数据更新类型: {op_type}"}
+                    applied.append(result)
+
+            # 没有任何数据更新成功（例如文件没有有效数据行）时不训练
+            if applied and not any(result.get('status') == 'success' for result in applied):
+                job.result = {'updates': applied, 'model_version': self.predictor.model_version}
+                job.status = 'failed'
+                job.message = '没有导入任何数据，跳过训练'
+                return
+
+            job.message = '开始训练'
+            with self.predictor.train_lock:
+                if job.mode == 'incremental':
+                    trained = self.predictor.fine_tune_model(progress_callback=job.update_progress)
+                else:
+                    trained = self.predictor.build_and_train_model(progress_callback=job.update_progress)
+            job.result = {
+                'updates': applied,
+                'model_metrics': self.predictor.get_model_metrics(),
+                'model_version': self.predictor.model_version,
+            }
+            bundle = self.predictor.bundle
+            if trained and bundle is not None:
+                job.result['training'] = bundle.training
+            if trained:
+                job.status = 'succeeded'
+                job.message = '模型训练完成'
+            else:
+                job.status = 'failed'
+                job.message = '模型训练失败，继续使用当前模型'
+        except Exception as e:
+            job.status = 'failed'
+            job.message = f"训练任务失败: {str(e)}"
+        finally:
+            job.finished_at = datetime.now()
+            if self.on_finish is not None:
+                try:
+                    self.on_finish(job, operations, applied)
+                except Exception as e:
+                    print(f"训练任务结束回调失败: {e}")
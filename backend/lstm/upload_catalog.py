@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_BYTES = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL,
+    original_filename TEXT NOT NULL,
+    saved_filename TEXT,
+    file_path TEXT,
+    file_type TEXT,
+    file_size INTEGER,
+    content_hash TEXT,
+    uploaded_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duplicate_of INTEGER,
+    row_count INTEGER,
+    rows_rejected INTEGER,
+    date_start TEXT,
+    date_end TEXT,
+    ingest_seconds REAL,
+    rows_per_second REAL,
+    job_id TEXT,
+    job_status TEXT,
+    training_result TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_uploads_hash ON uploads (site, content_hash);
+CREATE INDEX IF NOT EXISTS idx_uploads_site ON uploads (site, id);
+"""
+
+
+def hash_file(path):
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadCatalog:
+    """上传记录目录（SQLite）
+
+    每次上传记录文件大小、内容哈希、导入行数、日期跨度、导入耗时和训练结果。状态流转：
+    queued（已入队）-> ingested / failed；与同站点已导入的文件内容相同时记为 duplicate，不再解析和训练；
+    legacy 为目录建立前已在上传目录中的文件。
+
+    训练队列只在内存中，进程在任务执行前退出时记录会一直停留在 queued，因此只以 ingested 作为去重依据；
+    同一内容在导入完成前重复上传会再导入一次，按日期更新的结果相同。
+    """
+
+    # 可以作为去重依据的状态
+    DEDUP_STATUSES = ('ingested',)
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _now():
+        return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        record = dict(row)
+        if record.get('training_result'):
+            record['training_result'] = json.loads(record['training_result'])
+        return record
+
+    def backfill(self, folder, site):
+        """目录为空时登记上传目录中已有的文件（状态 legacy），返回登记数量"""
+        with self._lock:
+            if self._conn.execute('SELECT 1 FROM uploads LIMIT 1').fetchone():
+                return 0
+        if not os.path.isdir(folder):
+            return 0
+        files = []
+        for filename in os.listdir(folder):
+            file_path = os.path.join(folder, filename)
+            if os.path.isfile(file_path):
+                stat = os.stat(file_path)
+                files.append((stat.st_mtime, filename, file_path, stat.st_size))
+        rows = [(site, filename, filename, file_path,
+                 filename.rsplit('.', 1)[1].lower() if '.' in filename else 'unknown', size, hash_file(file_path),
+                 datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S'), 'legacy')
+                for mtime, filename, file_path, size in sorted(files)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO uploads (site, original_filename, saved_filename, file_path, file_type, file_size, '
+                'content_hash, uploaded_at, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def find_duplicate(self, site, content_hash):
+        """同站点中内容相同且已导入的最早一次上传"""
+        placeholders = ', '.join('?' * len(self.DEDUP_STATUSES))
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT * FROM uploads WHERE site = ? AND content_hash = ? AND status IN ({placeholders}) '
+                'ORDER BY id LIMIT 1', (site, content_hash) + self.DEDUP_STATUSES).fetchone()
+        return self._to_dict(row)
+
+    def add(self, site, original_filename, saved_filename, file_path, file_type, file_size, content_hash,
+            status='queued', duplicate_of=None, message=None):
+        """新增上传记录，返回记录ID"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO uploads (site, original_filename, saved_filename, file_path, file_type, file_size, '
+                'content_hash, uploaded_at, status, duplicate_of, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (site, original_filename, saved_filename, file_path, file_type, file_size, content_hash,
+                 self._now(), status, duplicate_of, message))
+            return cursor.lastrowid
+
+    def set_job(self, upload_id, job_id):
+        """关联训练任务"""
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE uploads SET job_id = ?, job_status = ? WHERE id = ?',
+                               (job_id, 'pending', upload_id))
+
+    def record_result(self, upload_id, ingest_result, job):
+        """训练任务结束后记录导入统计和训练结果"""
+        ingest_result = ingest_result or {}
+        ingested = ingest_result.get('status') == 'success'
+        training_result = {
+            'status': job.status,
+            'message': job.message,
+            'model_version': (job.result or {}).get('model_version'),
+            'model_metrics': (job.result or {}).get('model_metrics'),
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE uploads SET status = ?, row_count = ?, rows_rejected = ?, date_start = ?, date_end = ?, '
+                'ingest_seconds = ?, rows_per_second = ?, job_status = ?, training_result = ?, message = ? '
+                'WHERE id = ?',
+                ('ingested' if ingested else 'failed', ingest_result.get('rows_ingested'),
+                 ingest_result.get('rows_rejected'), ingest_result.get('date_start'), ingest_result.get('date_end'),
+                 ingest_result.get('elapsed_seconds'), ingest_result.get('rows_per_second'), job.status,
+                 json.dumps(training_result, ensure_ascii=False), ingest_result.get('message'), upload_id))
+
+    def get(self, upload_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+        return self._to_dict(row)
+
+    def history(self, page=1, page_size=20, site=None):
+        """按上传顺序倒序分页查询，返回 (记录列表, 总数)"""
+        where, params = ('WHERE site = ?', (site,)) if site else ('', ())
+        with self._lock:
+            total = self._conn.execute(f'SELECT COUNT(*) FROM uploads {where}', params).fetchone()[0]
+            rows = self._conn.execute(f'SELECT * FROM uploads {where} ORDER BY id DESC LIMIT ? OFFSET ?',
+                                      params + (page_size, (page - 1) * page_size)).fetchall()
+        return [self._to_dict(row) for row in rows], total
@@ -0,0 +1,18 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def make_windows(X, y, time_step=10):
+    """构造LSTM样本：返回 (样本数, time_step, 特征数) 的窗口视图和对应目标值
+
+    窗口是原数组上的只读跨步视图，不复制数据；第 i 个样本为 X[i:i+time_step]，目标为 y[i+time_step, 0]
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    n_samples = len(X) - time_step
+    if n_samples <= 0:
+        return np.empty((0, time_step) + X.shape[1:], dtype=X.dtype), np.empty((0,), dtype=y.dtype)
+
+    # sliding_window_view 把窗口维放在最后：(len-time_step+1, 特征数, time_step)
+    windows = sliding_window_view(X, time_step, axis=0)[:n_samples]
+    return np.swapaxes(windows, 1, 2), y[time_step:, 0]
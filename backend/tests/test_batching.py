@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+
+from batching import RequestCoalescer
+
+
+class FakeBundle:
+    def __init__(self):
+        self.model = object()
+
+
+def submit_concurrently(coalescer, bundle, inputs):
+    """并发提交，返回与 inputs 一一对应的结果"""
+    results = [None] * len(inputs)
+
+    def run(i):
+        results[i] = coalescer.submit(bundle, inputs[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def windows(values):
+    """(样本数, time_step=2, 特征数=1) 的窗口，第一个时间步的值即样本标识"""
+    return np.array(values, dtype=float).reshape(-1, 1, 1).repeat(2, axis=1)
+
+
+def test_concurrent_requests_share_one_forward_pass():
+    calls = []
+
+    def predict(bundle, x):
+        calls.append(len(x))
+        return x[:, 0, 0] * 10
+
+    coalescer = RequestCoalescer(predict, max_batch_size=3, max_wait_ms=1000, max_batch_rows=12)
+    inputs = [windows([1]), windows([2, 3]), windows([4, 5, 6])]
+    results = submit_concurrently(coalescer, FakeBundle(), inputs)
+
+    assert calls == [6]
+    for x, result in zip(inputs, results):
+        np.testing.assert_allclose(result, x[:, 0, 0] * 10)
+    stats = coalescer.stats()
+    assert stats['batches'] == 1
+    assert stats['forward_passes'] == 1
+    assert stats['requests'] == 3
+    assert stats['rows'] == 6
+    # 填充率按行数计：6 / 12，而不是按请求数的 3 / 3
+    assert stats['batch_fill_rate'] == pytest.approx(0.5)
+
+
+def test_row_cap_splits_batches():
+    calls = []
+
+    def predict(bundle, x):
+        calls.append(len(x))
+        return x[:, 0, 0]
+
+    coalescer = RequestCoalescer(predict, max_batch_size=10, max_wait_ms=200, max_batch_rows=4)
+    inputs = [windows([1, 2, 3]), windows([4, 5, 6])]
+    results = submit_concurrently(coalescer, FakeBundle(), inputs)
+
+    assert calls == [3, 3]
+    for x, result in zip(inputs, results):
+        np.testing.assert_allclose(result, x[:, 0, 0])
+    stats = coalescer.stats()
+    assert stats['batches'] == 2
+    assert stats['batch_fill_rate'] == pytest.approx(6 / 8)
+
+
+def test_oversized_request_counts_as_full_batch():
+    coalescer = RequestCoalescer(lambda bundle, x: x[:, 0, 0], max_batch_size=4, max_wait_ms=1, max_batch_rows=2)
+    result = coalescer.submit(FakeBundle(), windows([1, 2, 3]))
+
+    np.testing.assert_allclose(result, [1, 2, 3])
+    stats = coalescer.stats()
+    assert stats['rows'] == 3
+    assert stats['batch_fill_rate'] == pytest.approx(1.0)
+
+
+def test_errors_reach_every_request_in_the_batch():
+    def predict(bundle, x):
+        raise RuntimeError('boom')
+
+    coalescer = RequestCoalescer(predict, max_batch_size=2, max_wait_ms=1000)
+    bundle = FakeBundle()
+    errors = []
+
+    def run():
+        try:
+            coalescer.submit(bundle, windows([1]))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ['boom', 'boom']
@@ -0,0 +1,73 @@
+import io
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('matplotlib')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+import chart_renderer
+from chart_renderer import ChartRenderer, PredictionChartTemplate, chart_filename
+from chart_store import ChartStore
+
+DATES = [datetime(2025, 1, 1) + timedelta(days=i) for i in range(7)]
+
+
+def artist_counts(template):
+    counts = []
+    for ax in (template.ax1, template.ax2):
+        counts.append((len(ax.patches), len(ax.lines), len(ax.collections), len(ax.texts),
+                       len(ax.containers), ax.get_legend() is not None))
+    return counts
+
+
+def test_reused_template_does_not_accumulate_artists():
+    """复用模板渲染多次，图元和容器数量保持不变"""
+    template = PredictionChartTemplate()
+    dates = [datetime(2025, 1, 1) + timedelta(days=i) for i in range(7)]
+
+    template.render(io.BytesIO(), [float(i) for i in range(7)], dates)
+    first = artist_counts(template)
+    for n in range(10):
+        template.render(io.BytesIO(), [float(i + n) for i in range(7)], dates)
+
+    assert artist_counts(template) == first
+    assert [len(ax.containers) for ax in (template.ax1, template.ax2)] == [1, 0]
+
+
+def test_identical_forecasts_render_once(tmp_path):
+    renderer = ChartRenderer(ChartStore(str(tmp_path)))
+    predictions = [float(i * 10) for i in range(7)]
+
+    filename = renderer.submit(predictions, DATES)
+    assert renderer.submit(list(predictions), list(DATES)) == filename
+    assert filename == chart_filename(predictions, DATES)
+    assert renderer.wait(filename, timeout=30)
+
+    assert renderer.store.get(filename).startswith(b'\x89PNG')
+    assert renderer.submit(predictions, DATES) == filename
+    assert renderer.stats()['submitted'] == 1
+    assert renderer.stats()['deduplicated'] == 2
+    assert renderer.submit([p + 1 for p in predictions], DATES) != filename
+
+
+def test_failed_renders_are_reported_and_bounded(tmp_path, monkeypatch):
+    def fail(predictions, prediction_dates):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(chart_renderer, 'render_chart_bytes', fail)
+    store = ChartStore(str(tmp_path))
+    renderer = ChartRenderer(store, max_failed=2)
+
+    filenames = []
+    for n in range(3):
+        filenames.append(renderer.submit([float(n)] * 7, DATES))
+        assert not renderer.wait(filenames[-1], timeout=30)
+
+    # 只记住最近 max_failed 个失败，渲染标记已清除
+    assert [renderer.status(name) for name in filenames] == [None, 'failed', 'failed']
+    assert not any(store.is_rendering(name) for name in filenames)
+    assert renderer.stats()['failed'] == 2
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from chart_store import ChartStore
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 1000
+
+
+def test_chart_written_by_one_worker_is_served_by_another(tmp_path):
+    """两个 worker 共享同一图表目录：A 写入的图表 B 也能读取"""
+    worker_a = ChartStore(str(tmp_path))
+    worker_b = ChartStore(str(tmp_path))
+    name = 'prediction_chart_0123456789abcdef01234567.png'
+
+    worker_a.put(name, PNG)
+
+    assert worker_b.exists(name)
+    assert worker_b.get(name) == PNG
+    assert worker_b.stats()['adopted'] == 1
+
+
+def test_rendering_marker_is_visible_to_other_workers(tmp_path):
+    worker_a = ChartStore(str(tmp_path))
+    worker_b = ChartStore(str(tmp_path))
+    name = 'prediction_chart_aaaaaaaaaaaaaaaaaaaaaaaa.png'
+
+    worker_a.mark_rendering(name)
+    assert worker_b.is_rendering(name)
+    assert worker_b.get(name) is None
+
+    worker_a.put(name, PNG)
+    assert not worker_b.is_rendering(name)
+    assert worker_b.get(name) == PNG
+
+
+def test_invalid_names_are_not_read_from_disk(tmp_path):
+    store = ChartStore(str(tmp_path / 'charts'))
+    (tmp_path / 'secret.png').write_bytes(PNG)
+
+    assert store.get('../secret.png') is None
+    assert not store.exists('../secret.png')
+
+
+def test_eviction_counts_charts_from_other_workers(tmp_path):
+    """写入新图表时纳入其他 worker 的图表，整个目录保持在文件数预算以内"""
+    worker_a = ChartStore(str(tmp_path), max_files=3)
+    worker_b = ChartStore(str(tmp_path), max_files=3)
+    for i in range(3):
+        worker_a.put(f'chart_a{i}.png', PNG)
+    for i in range(2):
+        worker_b.put(f'chart_b{i}.png', PNG)
+
+    assert len([n for n in os.listdir(tmp_path) if n.endswith('.png')]) == 3
+    assert worker_b.stats()['files'] == 3
+
+
+def test_charts_deleted_by_other_workers_are_forgotten(tmp_path):
+    worker_a = ChartStore(str(tmp_path), max_files=2)
+    worker_b = ChartStore(str(tmp_path), max_files=2)
+    worker_b.put('chart_old.png', PNG)
+    worker_a.put('chart_1.png', PNG)
+    worker_a.put('chart_2.png', PNG)
+
+    # A 已淘汰 chart_old.png，B 写入新图表时与目录同步并把它移出索引
+    assert not os.path.exists(tmp_path / 'chart_old.png')
+    worker_b.put('chart_3.png', PNG)
+    assert worker_b.stats()['files'] == 2
+    assert worker_b.stats()['bytes'] == 2 * len(PNG)
+
+
+def test_least_recently_read_chart_is_evicted(tmp_path):
+    store = ChartStore(str(tmp_path), max_files=2)
+    store.put('chart_a.png', PNG)
+    time.sleep(0.01)
+    store.put('chart_b.png', PNG)
+    time.sleep(0.01)
+    assert store.get('chart_a.png') == PNG
+    time.sleep(0.01)
+
+    store.put('chart_c.png', PNG)
+
+    assert sorted(n for n in os.listdir(tmp_path) if n.endswith('.png')) == ['chart_a.png', 'chart_c.png']
+    assert store.get('chart_b.png') is None
+    assert store.stats()['evictions'] == 1
+
+
+def test_expired_charts_are_removed(tmp_path):
+    store = ChartStore(str(tmp_path), ttl_seconds=60)
+    store.put('chart_old.png', PNG)
+    store.put('chart_new.png', PNG)
+    old = time.time() - 120
+    os.utime(tmp_path / 'chart_old.png', (old, old))
+
+    # 重启后扫描目录时删除过期图表
+    restarted = ChartStore(str(tmp_path), ttl_seconds=60)
+    assert not os.path.exists(tmp_path / 'chart_old.png')
+    assert restarted.get('chart_old.png') is None
+    assert restarted.get('chart_new.png') == PNG
+
+
+def test_recent_charts_are_served_from_memory(tmp_path):
+    ChartStore(str(tmp_path)).put('chart_a.png', PNG)
+    ChartStore(str(tmp_path)).put('chart_b.png', PNG)
+    # 内存缓存只放得下一张图表
+    store = ChartStore(str(tmp_path), memory_max_bytes=len(PNG) + 100)
+
+    assert store.get('chart_a.png') == PNG
+    assert store.get('chart_a.png') == PNG
+    assert store.get('chart_b.png') == PNG
+    assert store.get('chart_a.png') == PNG
+    stats = store.stats()
+    assert (stats['disk_hits'], stats['memory_hits']) == (3, 1)
+    assert stats['memory_bytes'] == len(PNG)
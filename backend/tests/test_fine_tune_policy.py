@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+pytest.importorskip('tensorflow')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from lstm_process import LSTMPredictor
+from model_bundle import ModelBundle
+from numpy_lstm import ScalerParams
+
+
+def make_predictor():
+    """只有增量更新策略参数的预测器：不加载数据和模型"""
+    predictor = LSTMPredictor.__new__(LSTMPredictor)
+    predictor.feature_cols = ['weekday']
+    predictor.replay_window = 10
+    predictor.drift_tolerance = 0.2
+    predictor.max_incremental_updates = 3
+    return predictor
+
+
+def make_bundle(**kwargs):
+    # 归一化器把客流 0~100 映射到 0~1
+    return ModelBundle(model=object(), scaler_X=ScalerParams([1.0], [0.0]), scaler_y=ScalerParams([0.01], [0.0]),
+                       feature_cols=('weekday',), time_step=3, version='v1', **kwargs)
+
+
+def make_frame(recent_y):
+    y = np.concatenate([np.linspace(0, 100, 40), recent_y])
+    return pd.DataFrame({'y': y, 'weekday': np.arange(len(y)) % 7})
+
+
+def test_recent_data_within_history_is_fine_tuned():
+    full, reason = make_predictor().should_full_retrain(make_bundle(), make_frame(np.full(10, 90.0)))
+
+    assert (full, reason) == (False, "")
+
+
+@pytest.mark.parametrize('bundle, frame', [
+    (None, make_frame(np.full(10, 50.0))),
+    (ModelBundle(model=None, scaler_X=None, scaler_y=None, feature_cols=('weekday',), time_step=3),
+     make_frame(np.full(10, 50.0))),
+    (ModelBundle(model=object(), scaler_X=None, scaler_y=None, feature_cols=('weekday', 'holiday'), time_step=3),
+     make_frame(np.full(10, 50.0))),
+    (make_bundle(incremental_updates=3), make_frame(np.full(10, 50.0))),
+    # 最近客流比历史最高值高出归一化区间的 50%，超过漂移容忍度
+    (make_bundle(), make_frame(np.full(10, 150.0))),
+], ids=['no-model', 'fallback', 'features-changed', 'too-many-updates', 'drift'])
+def test_policy_requires_full_retrain(bundle, frame):
+    full, reason = make_predictor().should_full_retrain(bundle, frame)
+
+    assert full
+    assert reason
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from forecast_cache import ForecastCache
+from history_store import HistoryStore
+
+
+def make_worker(root):
+    """只有历史数据仓库和预测缓存的预测器，模拟共享同一仓库的一个 worker"""
+    pytest.importorskip('tensorflow')
+    from lstm_process import LSTMPredictor
+
+    predictor = LSTMPredictor.__new__(LSTMPredictor)
+    predictor.forecast_cache = ForecastCache()
+    predictor._data_revision = 0
+    predictor._history_version = None
+    predictor._bundle = None
+    predictor.history = HistoryStore(root)
+    predictor.stats_index = type('NoIndex', (), {'update': lambda self, history, first_row: None})()
+    return predictor
+
+
+def test_workers_on_the_same_history_share_etags(tmp_path):
+    root = str(tmp_path / 'history')
+    HistoryStore(root).create(['y'], [])
+    worker_a, worker_b = make_worker(root), make_worker(root)
+    worker_a.refresh_from_history()
+    worker_b.refresh_from_history()
+    # 本进程内替换数据的次数不同，不影响 ETag
+    worker_b.refresh_from_history()
+
+    key_a, key_b = worker_a.cache_key('lstm', 7), worker_b.cache_key('lstm', 7)
+    assert key_a == key_b
+    assert ForecastCache.etag(key_a) == ForecastCache.etag(key_b)
+
+
+def test_etag_changes_when_another_worker_writes(tmp_path):
+    root = str(tmp_path / 'history')
+    HistoryStore(root).create(['y'], [])
+    worker_a, worker_b = make_worker(root), make_worker(root)
+    worker_a.refresh_from_history()
+    worker_b.refresh_from_history()
+
+    worker_a.history.upsert(pd.DataFrame({'ds': ['2025-01-01'], 'y': [10.0]}))
+    worker_a.refresh_from_history()
+    assert worker_a.cache_key('lstm', 7) != worker_b.cache_key('lstm', 7)
+
+    assert worker_b.history.reload()
+    worker_b.refresh_from_history()
+    assert worker_a.cache_key('lstm', 7) == worker_b.cache_key('lstm', 7)
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = ForecastCache(max_entries=2)
+    cache.put(('forecast', 'v1', 'h1', 7), {'n': 7})
+    cache.put(('forecast', 'v1', 'h1', 14), {'n': 14})
+    assert cache.get(('forecast', 'v1', 'h1', 7)) == {'n': 7}
+
+    cache.put(('forecast', 'v1', 'h1', 30), {'n': 30})
+
+    assert cache.get(('forecast', 'v1', 'h1', 14)) is None
+    assert cache.get(('forecast', 'v1', 'h1', 7)) == {'n': 7}
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.invalidate()
+    assert cache.get(('forecast', 'v1', 'h1', 7)) is None
+
+
+def test_etag_depends_on_every_key_part():
+    key = ('forecast', 'v1', 'h1', 7)
+
+    assert ForecastCache.etag(key) == ForecastCache.etag(tuple(key))
+    for changed in (('scenarios', 'v1', 'h1', 7), ('forecast', 'v2', 'h1', 7),
+                    ('forecast', 'v1', 'h2', 7), ('forecast', 'v1', 'h1', 8)):
+        assert ForecastCache.etag(changed) != ForecastCache.etag(key)
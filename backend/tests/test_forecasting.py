@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+
+from forecasting import build_forecast_windows, forecast_batch
+from model_bundle import ModelBundle
+from numpy_lstm import ScalerParams
+
+TIME_STEP = 4
+N_FEATURES = 3
+
+
+def make_bundle():
+    return ModelBundle(model=object(), scaler_X=ScalerParams([0.5, 0.1, 2.0], [0.0, -0.2, 1.0]),
+                       scaler_y=ScalerParams([0.01], [0.1]), feature_cols=('a', 'b', 'c'),
+                       time_step=TIME_STEP)
+
+
+def loop_windows(bundle, last_windows, n_days, future_features=None):
+    """逐步构造窗口的参照实现：第 k 步窗口为历史窗口后 time_step-k 行接未来特征的前 k 行"""
+    windows = []
+    for i, last_window in enumerate(last_windows):
+        if future_features is None:
+            future = np.repeat(last_window[-1:], n_days - 1, axis=0)
+        else:
+            future = np.asarray(future_features[i])[:n_days - 1]
+        rows = np.concatenate([last_window, future])
+        for k in range(n_days):
+            windows.append(bundle.scaler_X.transform(rows[k:k + TIME_STEP]))
+    return np.array(windows, dtype=np.float32)
+
+
+@pytest.mark.parametrize('n_days', [1, 2, 7])
+@pytest.mark.parametrize('with_features', [False, True])
+def test_windows_match_step_by_step_construction(n_days, with_features):
+    rng = np.random.default_rng(0)
+    bundle = make_bundle()
+    last_windows = rng.random((3, TIME_STEP, N_FEATURES))
+    future = rng.random((3, n_days, N_FEATURES)) if with_features else None
+
+    actual = build_forecast_windows(bundle, last_windows, n_days, future)
+
+    assert actual.shape == (3 * n_days, TIME_STEP, N_FEATURES)
+    assert actual.dtype == np.float32
+    np.testing.assert_allclose(actual, loop_windows(bundle, last_windows, n_days, future), rtol=1e-6)
+
+
+def test_forecast_uses_one_forward_pass():
+    bundle = make_bundle()
+    calls = []
+
+    def predict(bundle, x):
+        calls.append(x.shape)
+        # 以窗口最后一行第一个特征作为归一化预测值
+        return x[:, -1, 0]
+
+    last_windows = np.arange(2 * TIME_STEP * N_FEATURES, dtype=float).reshape(2, TIME_STEP, N_FEATURES)
+    future = np.full((2, 5, N_FEATURES), -10.0)
+    predictions = forecast_batch(bundle, last_windows, 5, future, predict=predict)
+
+    assert calls == [(10, TIME_STEP, N_FEATURES)]
+    assert predictions.shape == (2, 5)
+    expected_first = bundle.scaler_y.inverse_transform(bundle.scaler_X.transform(last_windows[:, -1])[:, :1])
+    np.testing.assert_allclose(predictions[:, 0], expected_first[:, 0], rtol=1e-5)
+    # 未来特征为 -10 时反归一化结果为负，预测值截断为 0
+    np.testing.assert_array_equal(predictions[:, 1:], 0)
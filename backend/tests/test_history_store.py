@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from history_store import HistoryStore
+
+
+def make_store(tmp_path, initial_capacity=4):
+    store = HistoryStore(str(tmp_path / 'history'), initial_capacity=initial_capacity)
+    store.create(['y', 'weekday', 'holiday'], ['weekday', 'holiday'])
+    return store
+
+
+def frame(dates, y):
+    dates = pd.to_datetime(dates)
+    return pd.DataFrame({'ds': dates, 'y': np.asarray(y, dtype=float),
+                         'weekday': dates.weekday.astype(float), 'holiday': np.zeros(len(dates))})
+
+
+def test_appends_updates_and_tail_merges_stay_sorted(tmp_path):
+    store = make_store(tmp_path)
+
+    result = store.upsert(frame(['2025-01-01', '2025-01-02', '2025-01-05'], [10, 20, 50]))
+    assert result == {'inserted': 3, 'updated': 0, 'first_row': 0}
+
+    # 同一批中的重复日期以最后一行为准
+    result = store.upsert(frame(['2025-01-02', '2025-01-03', '2025-01-03'], [21, 30, 31]))
+    assert result == {'inserted': 1, 'updated': 1, 'first_row': 1}
+
+    # 超出初始容量时扩容
+    result = store.upsert(frame(['2025-01-06', '2025-01-07'], [60, 70]))
+    assert result == {'inserted': 2, 'updated': 0, 'first_row': 4}
+
+    df = store.frame()
+    assert list(df['ds'].dt.day) == [1, 2, 3, 5, 6, 7]
+    assert list(df['y']) == [10, 21, 31, 50, 60, 70]
+    assert store.n_rows == 6
+    assert store.version == 3
+
+
+def test_partial_columns_leave_other_values(tmp_path):
+    store = make_store(tmp_path)
+    store.upsert(frame(['2025-01-01'], [10]))
+
+    store.upsert(pd.DataFrame({'ds': pd.to_datetime(['2025-01-01', '2025-01-02']), 'y': [11.0, 12.0]}))
+
+    df = store.frame()
+    assert list(df['y']) == [11, 12]
+    assert df['weekday'].iloc[0] == 2.0
+    assert np.isnan(df['weekday'].iloc[1])
+
+
+def test_views_are_read_only_and_snapshots_are_stable(tmp_path):
+    store = make_store(tmp_path)
+    store.upsert(frame(['2025-01-01', '2025-01-02'], [10, 20]))
+
+    with pytest.raises(ValueError):
+        store.column('y')[0] = 0
+    assert np.shares_memory(store.features(), store.values())
+
+    snapshot = store.snapshot()
+    store.upsert(frame(['2025-01-01'], [99]))
+    assert list(snapshot['y']) == [10, 20]
+    assert list(store.frame()['y']) == [99, 20]
+
+
+def test_other_instances_see_writes_after_reload(tmp_path):
+    writer = make_store(tmp_path)
+    writer.upsert(frame(['2025-01-01'], [10]))
+    reader = HistoryStore(writer.root)
+    assert reader.n_rows == 1
+    assert not reader.reload()
+
+    writer.upsert(frame(['2025-01-02', '2025-01-03'], [20, 30]))
+    assert reader.n_rows == 1
+    assert reader.reload()
+    assert list(reader.frame()['y']) == [10, 20, 30]
+    assert reader.version == writer.version
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import threading
+from multiprocessing.connection import Listener
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+
+from inference_server import InferenceClient, InferenceServer, ModelVersionMismatch
+
+
+class FakePredictor:
+    """推理角色替身：forecast 返回全零预测和当前版本，load 模拟加载和预热耗时"""
+
+    def __init__(self, version, load_seconds=0.0):
+        self.version = version
+        self.load_seconds = load_seconds
+        self.bundle = None
+
+    def forecast(self, last_windows, n_days, future_features=None):
+        return {'predictions': np.zeros((len(last_windows), n_days)), 'model_version': self.version}
+
+    def load(self, version=None):
+        time.sleep(self.load_seconds)
+        self.version = version
+        return version
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    monkeypatch.setenv('INFERENCE_AUTHKEY', 'test-authkey-0123456789')
+    listeners = []
+
+    def start(predictor):
+        server = InferenceServer(predictor, ('127.0.0.1', 0))
+        listener = Listener(('127.0.0.1', 0), authkey=server.authkey)
+        listeners.append(listener)
+
+        def accept():
+            while True:
+                try:
+                    conn = listener.accept()
+                except OSError:
+                    return
+                threading.Thread(target=server.serve_connection, args=(conn,), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+        return listener.address
+
+    yield start
+    for listener in listeners:
+        listener.close()
+
+
+def test_forecast_checks_model_version(serve):
+    client = InferenceClient(serve(FakePredictor('v2')))
+    windows = np.zeros((3, 10, 2))
+
+    assert client.forecast_batch(windows, 4, expected_version='v2').shape == (3, 4)
+    with pytest.raises(ModelVersionMismatch) as excinfo:
+        client.forecast_batch(windows, 4, expected_version='v3')
+    assert (excinfo.value.expected, excinfo.value.actual) == ('v3', 'v2')
+
+
+def test_reload_uses_its_own_timeout(serve):
+    address = serve(FakePredictor('v1', load_seconds=0.5))
+    client = InferenceClient(address, timeout=0.1, reload_timeout=5.0)
+
+    assert client.reload('v2') == {'model_version': 'v2'}
+    assert client.forecast_batch(np.zeros((1, 10, 2)), 1, expected_version='v2').shape == (1, 1)
+    # 普通请求的超时不足以等待加载完成
+    with pytest.raises(TimeoutError):
+        client.call('reload', version='v3')
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from history_store import HistoryStore
+from ingestion import check_file, ingest_file
+
+FEATURES = ['weekday', 'holiday']
+
+
+def make_history(tmp_path):
+    history = HistoryStore(str(tmp_path / 'history'))
+    history.create(['y', *FEATURES], FEATURES)
+    return history
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / 'upload.csv'
+    path.write_text(text)
+    return str(path)
+
+
+def test_header_only_file_is_rejected(tmp_path):
+    path = write_csv(tmp_path, 'ds,y,weekday,holiday\n')
+    assert check_file(path, FEATURES) == "数据文件没有数据行"
+    assert ingest_file(path, make_history(tmp_path))['status'] == 'error'
+
+
+def test_missing_feature_column_is_rejected(tmp_path):
+    path = write_csv(tmp_path, 'ds,y,weekday\n2025-01-01,10,2\n')
+    history = make_history(tmp_path)
+
+    assert 'holiday' in check_file(path, FEATURES)
+    result = ingest_file(path, history)
+    assert result['status'] == 'error'
+    assert 'holiday' in result['message']
+    assert history.n_rows == 0
+
+
+def test_non_numeric_features_are_rejected_rows(tmp_path):
+    path = write_csv(tmp_path, 'ds,y,weekday,holiday\n'
+                               '2025-01-01,10,2,FALSE\n'
+                               '2025-01-02,12,abc,0\n'
+                               '2025-01-03,14,4,\n')
+    history = make_history(tmp_path)
+
+    assert check_file(path, FEATURES) is None
+    result = ingest_file(path, history)
+    assert result['status'] == 'success'
+    assert result['rows_ingested'] == 1
+    assert result['rows_rejected'] == 2
+    assert np.isfinite(history.values()).all()
@@ -0,0 +1,44 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LSTM_DIR = os.path.join(BACKEND_DIR, 'lstm')
+# Web 层导入时不应加载的模块（由后台预热线程或 gunicorn 预加载导入）
+HEAVY_MODULES = ('tensorflow', 'keras', 'sklearn', 'matplotlib', 'pandas')
+# app.py 在模块级导入的 lstm 模块
+WEB_LAYER_MODULES = ('chart_renderer', 'chart_store', 'upload_catalog', 'site_registry', 'batching',
+                     'forecasting', 'stats_index')
+
+
+def loaded_heavy_modules(statement, cwd):
+    """在新进程中执行导入语句，返回其间加载的重型模块"""
+    script = (f"import sys, json\n{statement}\n"
+              f"print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY_MODULES!r}))))")
+    proc = subprocess.run([sys.executable, '-c', script], cwd=cwd, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def test_web_layer_modules_do_not_import_heavy_dependencies():
+    statement = '\n'.join(f"import {name}" for name in WEB_LAYER_MODULES)
+
+    assert loaded_heavy_modules(statement, LSTM_DIR) == []
+
+
+def test_chart_renderer_loads_matplotlib_on_first_render():
+    pytest.importorskip('matplotlib')
+    statement = ("import chart_renderer\n"
+                 "assert 'matplotlib' not in sys.modules\n"
+                 "chart_renderer.load_matplotlib()")
+
+    assert loaded_heavy_modules(statement, LSTM_DIR) == ['matplotlib']
+
+
+def test_app_import_is_light():
+    pytest.importorskip('flask')
+
+    assert loaded_heavy_modules('import app', BACKEND_DIR) == []
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+tf = pytest.importorskip('tensorflow')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from manual_lstm import ManualLSTM, bidirectional_manual_lstm
+from numpy_lstm import KERAS_GATE_ORDER, reorder_gates
+
+UNITS = 4
+TIME_STEP = 6
+N_FEATURES = 3
+
+
+def inputs(seed=0):
+    return np.random.default_rng(seed).random((5, TIME_STEP, N_FEATURES)).astype(np.float32)
+
+
+def keras_lstm_like(layer, **kwargs):
+    """与 ManualLSTM 权重相同的 Keras LSTM（门顺序 ifog -> ifco）"""
+    keras_layer = tf.keras.layers.LSTM(UNITS, **kwargs)
+    keras_layer.build((None, TIME_STEP, N_FEATURES))
+    weights = []
+    for array in (layer.W.numpy(), layer.U.numpy(), layer.b.numpy()):
+        chunks = np.split(array, 4, axis=-1)
+        order = [ManualLSTM.gate_order.index(g.replace('c', 'g')) for g in KERAS_GATE_ORDER]
+        weights.append(np.concatenate([chunks[k] for k in order], axis=-1))
+    keras_layer.set_weights(weights)
+    return keras_layer
+
+
+@pytest.mark.parametrize('return_sequences', [False, True])
+@pytest.mark.parametrize('go_backwards', [False, True])
+def test_matches_keras_lstm(return_sequences, go_backwards):
+    layer = ManualLSTM(UNITS, return_sequences=return_sequences, go_backwards=go_backwards)
+    x = inputs()
+    actual = layer(x).numpy()
+
+    expected = keras_lstm_like(layer, return_sequences=return_sequences, go_backwards=go_backwards)(x).numpy()
+    np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('options', [{'unroll': True}, {'jit_compile': True}])
+def test_unrolled_and_compiled_loops_match_while_loop(options):
+    x = inputs()
+    reference = ManualLSTM(UNITS, return_sequences=True)
+    reference(x)
+    layer = ManualLSTM(UNITS, return_sequences=True, **options)
+    layer(x)
+    layer.set_weights(reference.get_weights())
+
+    np.testing.assert_allclose(layer(x).numpy(), reference(x).numpy(), rtol=1e-5, atol=1e-6)
+
+
+def test_bidirectional_gradients_and_config_round_trip():
+    layer = bidirectional_manual_lstm(UNITS, unroll=True)
+    x = tf.constant(inputs())
+    with tf.GradientTape() as tape:
+        loss = tf.reduce_sum(layer(x) ** 2)
+    gradients = tape.gradient(loss, layer.trainable_variables)
+
+    assert layer(x).shape == (5, 2 * UNITS)
+    assert len(gradients) == 6
+    assert all(g is not None and np.isfinite(g.numpy()).all() for g in gradients)
+    config = layer.forward_layer.get_config()
+    assert ManualLSTM.from_config(config).get_config() == config
+
+
+def test_gate_order_matches_numpy_engine():
+    layer = ManualLSTM(UNITS)
+    layer(inputs())
+
+    keras_order = keras_lstm_like(layer).get_weights()[0]
+    np.testing.assert_array_equal(reorder_gates(keras_order, KERAS_GATE_ORDER), layer.W.numpy())
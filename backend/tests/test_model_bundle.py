@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+import dataclasses
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+
+from model_bundle import ModelBundle
+
+
+def make_bundle(version, model=None):
+    return ModelBundle(model=model if model is not None else object(), scaler_X=None, scaler_y=None,
+                       feature_cols=('weekday',), time_step=3, version=version)
+
+
+def make_predictor():
+    """只有发布状态的预测器：不加载数据、不训练"""
+    pytest.importorskip('tensorflow')
+    from lstm_process import LSTMPredictor
+    from forecast_cache import ForecastCache
+
+    predictor = LSTMPredictor.__new__(LSTMPredictor)
+    predictor._bundle = None
+    predictor._previous_bundle = None
+    predictor._publish_lock = threading.Lock()
+    predictor.forecast_cache = ForecastCache()
+    predictor.inference_client = None
+    return predictor
+
+
+def test_bundle_is_immutable():
+    bundle = make_bundle('v1')
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        bundle.version = 'v2'
+    assert dataclasses.replace(bundle, version='v2').version == 'v2'
+    assert bundle.version == 'v1'
+
+
+def test_fallback_bundle_has_no_model():
+    bundle = ModelBundle(model=None, scaler_X=None, scaler_y=None, feature_cols=(), time_step=3,
+                         version='fallback_1', fallback_model=object())
+
+    assert bundle.is_fallback
+    assert bundle.info()['is_fallback'] is True
+
+
+def test_publish_and_rollback_swap_bundles():
+    predictor = make_predictor()
+    assert predictor.rollback() is None
+
+    first, second = make_bundle('v1'), make_bundle('v2')
+    predictor.publish(first)
+    assert predictor.rollback() is None
+    predictor.publish(second)
+    assert predictor.bundle is second
+
+    assert predictor.rollback() == 'v1'
+    assert predictor.bundle is first
+    # 回滚后再回滚回到较新的版本
+    assert predictor.rollback() == 'v2'
+    assert predictor.bundle is second
+
+
+def test_publish_and_rollback_invalidate_forecast_cache():
+    predictor = make_predictor()
+    predictor.publish(make_bundle('v1'))
+    predictor.publish(make_bundle('v2'))
+    key = ('forecast', 'v2', 'h1', 7)
+
+    predictor.forecast_cache.put(key, {'predictions': [1.0]})
+    predictor.rollback()
+    assert predictor.forecast_cache.get(key) is None
+
+    predictor.forecast_cache.put(key, {'predictions': [1.0]})
+    predictor.publish(make_bundle('v3'))
+    assert predictor.forecast_cache.get(key) is None
+
+
+def test_readers_see_whole_bundles_during_swaps():
+    predictor = make_predictor()
+    bundles = [make_bundle(f"v{i}", model=i) for i in range(2)]
+    predictor.publish(bundles[0])
+    mismatched = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            bundle = predictor.bundle
+            if bundle.version != f"v{bundle.model}":
+                mismatched.append(bundle)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for i in range(200):
+        predictor.publish(bundles[i % 2])
+    stop.set()
+    reader.join()
+    assert mismatched == []
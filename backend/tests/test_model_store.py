@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+
+from model_store import ModelStore
+from numpy_lstm import ScalerParams
+
+FEATURE_COLS = ('weekday', 'holiday')
+
+
+class FakeModel:
+    """只实现 save 的模型替身，保存后即可测试仓库的版本管理"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def save(self, path):
+        if self.fail:
+            raise RuntimeError('disk full')
+        with open(path, 'wb') as f:
+            f.write(b'model')
+
+
+def make_frame(y):
+    return pd.DataFrame({
+        'ds': pd.date_range('2024-01-01', periods=len(y)),
+        'y': np.asarray(y, dtype=float),
+        'weekday': np.arange(len(y)) % 7,
+        'holiday': np.zeros(len(y)),
+    })
+
+
+def save_version(store, data_hash, model=None):
+    scaler = ScalerParams([1.0, 1.0], [0.0, 0.0])
+    return store.save(model or FakeModel(), scaler, ScalerParams([1.0], [0.0]), FEATURE_COLS, 3,
+                      {'mse': 1.0}, data_hash)
+
+
+def test_data_hash_tracks_training_data():
+    df = make_frame([10, 20, 30, 40])
+    digest = ModelStore.compute_data_hash(df, FEATURE_COLS, 3)
+
+    assert ModelStore.compute_data_hash(df.copy(), FEATURE_COLS, 3) == digest
+    assert ModelStore.compute_data_hash(make_frame([10, 20, 30, 41]), FEATURE_COLS, 3) != digest
+    assert ModelStore.compute_data_hash(df, FEATURE_COLS, 4) != digest
+
+
+def test_versions_listed_newest_first_and_pruned(tmp_path):
+    store = ModelStore(str(tmp_path))
+    versions = []
+    for data_hash in ('a' * 64, 'b' * 64, 'c' * 64):
+        versions.append(save_version(store, data_hash))
+        time.sleep(0.01)
+
+    listed = store.list_versions()
+    assert [meta['version'] for meta in listed] == versions[::-1]
+    assert listed[0]['data_hash'] == 'c' * 64
+    assert listed[0]['feature_cols'] == list(FEATURE_COLS)
+    assert versions[0].endswith('_' + 'a' * 8)
+
+    store.prune(keep=2)
+    assert [meta['version'] for meta in store.list_versions()] == versions[:0:-1]
+
+
+def test_failed_save_leaves_no_version(tmp_path):
+    store = ModelStore(str(tmp_path))
+
+    with pytest.raises(RuntimeError):
+        save_version(store, 'a' * 64, FakeModel(fail=True))
+
+    assert store.list_versions() == []
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_load_latest_matches_data_hash(tmp_path):
+    pytest.importorskip('tensorflow')
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([tf.keras.Input((3, 2)), tf.keras.layers.LSTM(4), tf.keras.layers.Dense(1)])
+    store = ModelStore(str(tmp_path))
+    version = save_version(store, 'a' * 64, model)
+
+    assert store.load_latest('b' * 64) is None
+    artifact = store.load_latest('a' * 64)
+    assert artifact['version'] == version
+    x = np.random.rand(5, 3, 2).astype(np.float32)
+    np.testing.assert_allclose(artifact['model'](x).numpy(), model(x).numpy(), rtol=1e-6)
+    np.testing.assert_array_equal(artifact['scaler_X'].scale_, [1.0, 1.0])
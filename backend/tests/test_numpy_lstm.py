@@ -0,0 +1,108 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from numpy_lstm import (KERAS_GATE_ORDER, BidirectionalLayer, DenseLayer, LSTMLayer, NumpyLSTMModel,
+                        ScalerParams)
+
+UNITS = 5
+N_FEATURES = 3
+
+
+def reference_lstm(x, kernel, recurrent_kernel, bias, return_sequences=False, go_backwards=False):
+    """逐步计算的参照实现，门顺序与 Keras 相同（i、f、c、o）"""
+    def sigmoid(z):
+        return 1 / (1 + np.exp(-z))
+
+    x = x[:, ::-1] if go_backwards else x
+    h = np.zeros((len(x), UNITS))
+    c = np.zeros((len(x), UNITS))
+    outputs = []
+    for t in range(x.shape[1]):
+        z = x[:, t] @ kernel + h @ recurrent_kernel + bias
+        i, f, g, o = np.split(z, 4, axis=-1)
+        c = sigmoid(f) * c + sigmoid(i) * np.tanh(g)
+        h = sigmoid(o) * np.tanh(c)
+        outputs.append(h)
+    return np.stack(outputs, axis=1) if return_sequences else h
+
+
+def random_weights(rng):
+    return (rng.normal(0, 0.5, (N_FEATURES, 4 * UNITS)), rng.normal(0, 0.5, (UNITS, 4 * UNITS)),
+            rng.normal(0, 0.5, 4 * UNITS))
+
+
+@pytest.mark.parametrize('return_sequences', [False, True])
+@pytest.mark.parametrize('go_backwards', [False, True])
+def test_lstm_layer_matches_reference(return_sequences, go_backwards):
+    rng = np.random.default_rng(0)
+    weights = random_weights(rng)
+    x = rng.random((4, 6, N_FEATURES))
+
+    layer = LSTMLayer(*weights, gate_order=KERAS_GATE_ORDER, return_sequences=return_sequences,
+                      go_backwards=go_backwards)
+
+    expected = reference_lstm(x, *weights, return_sequences=return_sequences, go_backwards=go_backwards)
+    np.testing.assert_allclose(layer(x.astype(np.float32)), expected, rtol=1e-4, atol=1e-5)
+
+
+def test_bidirectional_layer_aligns_backward_sequence():
+    rng = np.random.default_rng(1)
+    forward_weights, backward_weights = random_weights(rng), random_weights(rng)
+    x = rng.random((2, 6, N_FEATURES))
+
+    layer = BidirectionalLayer(
+        LSTMLayer(*forward_weights, gate_order=KERAS_GATE_ORDER, return_sequences=True),
+        LSTMLayer(*backward_weights, gate_order=KERAS_GATE_ORDER, return_sequences=True, go_backwards=True))
+
+    expected = np.concatenate([
+        reference_lstm(x, *forward_weights, return_sequences=True),
+        reference_lstm(x, *backward_weights, return_sequences=True, go_backwards=True)[:, ::-1],
+    ], axis=-1)
+    np.testing.assert_allclose(layer(x.astype(np.float32)), expected, rtol=1e-4, atol=1e-5)
+
+
+def test_saved_model_reloads_with_identical_outputs(tmp_path):
+    rng = np.random.default_rng(2)
+    model = NumpyLSTMModel([
+        BidirectionalLayer(LSTMLayer(*random_weights(rng), return_sequences=True),
+                           LSTMLayer(*random_weights(rng), return_sequences=True, go_backwards=True), 'sum'),
+        DenseLayer(rng.normal(size=(UNITS, 1)), rng.normal(size=1), 'relu'),
+    ])
+    path = str(tmp_path / 'model.npz')
+    model.save(path)
+
+    loaded = NumpyLSTMModel.load(path)
+    x = rng.random((3, 6, N_FEATURES))
+    np.testing.assert_array_equal(loaded(x), model(x))
+    assert loaded.count_params() == model.count_params()
+
+
+def test_scaler_params_round_trip():
+    scaler = ScalerParams([0.5, 2.0], [0.1, -1.0])
+    X = np.array([[1.0, 2.0], [3.0, 4.0]])
+
+    np.testing.assert_allclose(scaler.transform(X), [[0.6, 3.0], [1.6, 7.0]])
+    np.testing.assert_allclose(scaler.inverse_transform(scaler.transform(X)), X)
+    assert ScalerParams(**scaler.to_dict()).to_dict() == scaler.to_dict()
+
+
+def test_from_keras_matches_keras_predictions():
+    tf = pytest.importorskip('tensorflow')
+    from tensorflow.keras.layers import LSTM, Bidirectional, Dense, Dropout
+
+    model = tf.keras.Sequential([
+        tf.keras.Input((6, N_FEATURES)),
+        Bidirectional(LSTM(8, return_sequences=True)),
+        Dropout(0.2),
+        Bidirectional(LSTM(4)),
+        Dense(1),
+    ])
+    x = np.random.default_rng(3).random((5, 6, N_FEATURES)).astype(np.float32)
+
+    np.testing.assert_allclose(NumpyLSTMModel.from_keras(model)(x), model(x, training=False).numpy(),
+                               rtol=1e-4, atol=1e-5)
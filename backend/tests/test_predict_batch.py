@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+pytest.importorskip('tensorflow')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from lstm_process import LSTMPredictor
+from model_bundle import ModelBundle
+
+
+def make_predictor(recorded):
+    """不加载数据和模型的预测器：只有一个假模型包，run_forecast 记录参数并返回全零"""
+    predictor = LSTMPredictor.__new__(LSTMPredictor)
+    predictor._bundle = ModelBundle(model=object(), scaler_X=None, scaler_y=None,
+                                    feature_cols=('y', 'weekday'), time_step=3)
+    predictor._df = pd.DataFrame({'y': [10.0, 20.0, 30.0, 40.0], 'weekday': [0.0, 1.0, 2.0, 3.0]})
+
+    def run_forecast(bundle, last_windows, n_days, future_features=None):
+        recorded.append((n_days, future_features))
+        return np.zeros((len(last_windows), n_days))
+
+    predictor.run_forecast = run_forecast
+    return predictor
+
+
+def test_single_day_batch_with_features():
+    """所有请求都只预测一天且带未来特征时不需要构造未来特征"""
+    recorded = []
+    predictor = make_predictor(recorded)
+
+    result = predictor.predict_batch([(1, [[50.0, 4.0]]), (1, None)])
+
+    assert result == [[0.0], [0.0]]
+    assert recorded == [(1, None)]
+
+
+def test_empty_features_fall_back_to_last_day():
+    recorded = []
+    predictor = make_predictor(recorded)
+
+    predictor.predict_batch([(3, []), (2, [[50.0, 4.0]])])
+
+    n_days, future = recorded[0]
+    assert n_days == 3
+    np.testing.assert_array_equal(future[0], [[40.0, 3.0], [40.0, 3.0]])
+    np.testing.assert_array_equal(future[1], [[50.0, 4.0], [50.0, 4.0]])
@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from site_registry import DEFAULT_SITE, SITE_DATA_FILE, SITE_OVERHEAD_BYTES, SiteRegistry, SiteTenant
+from training_jobs import TrainingJobQueue
+
+
+class FakePredictor:
+    model_version = 'v1'
+
+    def __init__(self, memory_bytes=0):
+        self.memory_bytes = memory_bytes
+
+    def memory_footprint(self):
+        return self.memory_bytes
+
+
+class FakeRegistry(SiteRegistry):
+    """站点加载为假预测器，记录加载次数"""
+
+    def __init__(self, *args, memory_bytes=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.memory_bytes = memory_bytes
+        self.loads = []
+
+    def _load(self, site):
+        self.loads.append(site)
+        predictor = FakePredictor(self.memory_bytes)
+        return SiteTenant(site, predictor, TrainingJobQueue(predictor))
+
+
+def add_site(root, site):
+    os.makedirs(os.path.join(root, site))
+    with open(os.path.join(root, site, SITE_DATA_FILE), 'w') as f:
+        f.write('ds,y\n')
+
+
+def test_sites_are_discovered_from_data_files(tmp_path):
+    root = str(tmp_path)
+    add_site(root, 'north')
+    add_site(root, 'south')
+    os.makedirs(os.path.join(root, 'empty'))
+    registry = FakeRegistry(root, memory_budget_bytes=1 << 40)
+
+    assert registry.list_sites() == [DEFAULT_SITE, 'north', 'south']
+    assert not registry.has_site('empty')
+    assert not registry.has_site('../north')
+    with pytest.raises(KeyError):
+        registry.get('missing')
+
+
+def test_concurrent_gets_load_a_site_once(tmp_path):
+    root = str(tmp_path)
+    add_site(root, 'north')
+    registry = FakeRegistry(root, memory_budget_bytes=1 << 40)
+    tenants = []
+
+    threads = [threading.Thread(target=lambda: tenants.append(registry.get('north'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert registry.loads == ['north']
+    assert len({id(tenant) for tenant in tenants}) == 1
+    assert registry.close(timeout=5)
+
+
+def test_least_recently_used_idle_site_is_unloaded(tmp_path):
+    root = str(tmp_path)
+    for site in ('a', 'b', 'c'):
+        add_site(root, site)
+    registry = FakeRegistry(root, memory_budget_bytes=1 << 40, max_sites=2)
+
+    registry.get('a')
+    registry.get('b')
+    registry.get('a')
+    registry.get('c')
+
+    assert registry.loaded('b') is None
+    assert registry.loaded('a') is not None
+    assert registry.stats()['evictions'] == 1
+    registry.get('b')
+    assert registry.loads == ['a', 'b', 'c', 'b']
+    assert registry.close(timeout=5)
+
+
+def test_memory_budget_skips_busy_sites(tmp_path):
+    root = str(tmp_path)
+    for site in ('a', 'b'):
+        add_site(root, site)
+    # 每个站点约 SITE_OVERHEAD_BYTES + 1 字节，预算只够一个站点
+    registry = FakeRegistry(root, memory_budget_bytes=SITE_OVERHEAD_BYTES + 10, memory_bytes=1)
+
+    busy = registry.get('a')
+    busy.is_idle = lambda: False
+    registry.get('b')
+
+    # 正在训练的站点不卸载，刚访问的站点也保留
+    assert registry.loaded('a') is busy
+    assert registry.loaded('b') is not None
+    assert registry.stats()['memory_bytes'] == 2 * (SITE_OVERHEAD_BYTES + 1)
+    assert registry.close(timeout=5)
@@ -0,0 +1,104 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from history_store import HistoryStore
+from stats_index import StatsIndex
+
+
+def make_history(tmp_path, days, start='2025-01-01'):
+    history = HistoryStore(str(tmp_path / 'history'))
+    history.create(['y'], [])
+    rng = np.random.default_rng(0)
+    history.upsert(pd.DataFrame({'ds': pd.date_range(start, periods=days), 'y': rng.uniform(10, 90, days)}))
+    return history
+
+
+def rebuilt(history):
+    index = StatsIndex()
+    index.update(history)
+    return index
+
+
+def assert_stats_equal(actual, expected):
+    """浮点字段按近似比较（前缀和的累加顺序不同）"""
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            assert_stats_equal(actual[key], expected[key])
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            assert_stats_equal(a, e)
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected)
+    else:
+        assert actual == expected
+
+
+def assert_same(index, expected):
+    assert_stats_equal(index.summary(), expected.summary())
+    assert_stats_equal(index.day_of_week(), expected.day_of_week())
+    for kind in ('week', 'month'):
+        assert_stats_equal(index.rollup(kind), expected.rollup(kind))
+    assert_stats_equal(index.range(), expected.range())
+
+
+def test_incremental_appends_match_a_full_rebuild(tmp_path):
+    history = make_history(tmp_path, 40)
+    index = rebuilt(history)
+    for k in range(5):
+        counts = history.upsert(pd.DataFrame({'ds': pd.date_range(f'2025-02-{10 + 3 * k:02d}', periods=3),
+                                              'y': [5.0 + k, 50.0, 95.0 - k]}))
+        index.update(history, counts['first_row'])
+    assert_same(index, rebuilt(history))
+
+
+def test_update_in_the_middle_rebuilds_from_the_affected_bucket(tmp_path):
+    history = make_history(tmp_path, 60)
+    index = rebuilt(history)
+    counts = history.upsert(pd.DataFrame({'ds': ['2025-01-20', '2025-01-21'], 'y': [1000.0, 0.0]}))
+    index.update(history, counts['first_row'])
+    assert_same(index, rebuilt(history))
+    assert index.summary()['max'] == 1000.0
+
+
+def test_update_only_reads_the_tail(tmp_path):
+    """追加时只读取 first_row 之后的行"""
+    history = make_history(tmp_path, 30)
+    index = rebuilt(history)
+    counts = history.upsert(pd.DataFrame({'ds': ['2025-03-01'], 'y': [42.0]}))
+
+    class TailOnly:
+        n_rows = history.n_rows
+        version = history.version
+
+        def dates(self):
+            return TailView(history.dates(), counts['first_row'])
+
+        def column(self, name):
+            return TailView(history.column(name), counts['first_row'])
+
+    class TailView:
+        def __init__(self, array, first_row):
+            self.array, self.first_row = array, first_row
+
+        def __getitem__(self, item):
+            assert isinstance(item, slice) and item.start >= self.first_row
+            return self.array[item]
+
+    index.update(TailOnly(), counts['first_row'])
+    assert_same(index, rebuilt(history))
+
+
+def test_empty_history_has_null_stats():
+    index = StatsIndex()
+    summary = index.summary()
+    assert summary['count'] == 0
+    assert summary['min'] is None and summary['max'] is None
+    assert index.rollup('week') == []
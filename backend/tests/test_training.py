@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from training import (Checkpointer, TrainingConfig, TrainingProgress, calc_metrics, feature_columns,
+                      scaled_learning_rate, split_frame)
+from windowing import make_windows
+
+
+def make_frame(days=60, n_features=4, seed=0):
+    """与训练数据相同的列布局：ds、y、第三列为非特征列，之后为特征"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'ds': pd.date_range('2024-01-01', periods=days),
+        'y': rng.uniform(100, 500, days),
+        'remark': ['-'] * days,
+    })
+    for k in range(n_features):
+        df[f'f{k}'] = rng.random(days)
+    return df
+
+
+def test_config_round_trips_through_json(tmp_path):
+    config = TrainingConfig(architecture='bimanual', units=[16, 8], dropout=[0.1, 0.1], epochs=3)
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(dict(config.to_dict(), unknown_field=1)), encoding='utf-8')
+
+    loaded = TrainingConfig.load(str(path))
+    assert loaded == config
+    assert loaded.units == (16, 8)
+
+
+@pytest.mark.parametrize('values', [
+    {'architecture': 'gru'},
+    {'input_pipeline': 'generator'},
+    {'lr_scaling': 'cubic'},
+    {'batch_size': 0},
+    {'units': (16, 8), 'dropout': (0.1,)},
+])
+def test_invalid_config_is_rejected(values):
+    with pytest.raises(ValueError):
+        TrainingConfig(**values)
+
+
+def test_split_and_feature_columns_follow_the_data_layout():
+    df = make_frame(days=10)
+
+    train_df, test_df = split_frame(df, 0.7)
+    assert (len(train_df), len(test_df)) == (7, 3)
+    assert test_df['ds'].iloc[0] > train_df['ds'].iloc[-1]
+    assert feature_columns(df) == ['f0', 'f1', 'f2', 'f3']
+
+
+def test_metrics():
+    metrics = calc_metrics([100.0, 200.0], [110.0, 190.0])
+
+    assert metrics['mse'] == pytest.approx(100.0)
+    assert metrics['mae'] == pytest.approx(10.0)
+    assert metrics['rmse'] == pytest.approx(10.0)
+    assert metrics['mape'] == pytest.approx(7.5)
+
+
+def test_prepare_data_fits_scalers_on_the_training_split():
+    pytest.importorskip('sklearn')
+    from training import prepare_data
+
+    df = make_frame(days=40)
+    data = prepare_data(df, feature_columns(df), time_step=5, train_ratio=0.75)
+
+    assert data.x_train.shape == (30 - 5, 5, 4)
+    assert data.x_test.shape == (10 - 5, 5, 4)
+    assert data.X_train_scaled.min() == pytest.approx(0.0)
+    assert data.X_train_scaled.max() == pytest.approx(1.0)
+    np.testing.assert_allclose(data.scaler_y.inverse_transform(data.y_train.reshape(-1, 1))[:, 0],
+                               df['y'].values[5:30])
+
+
+def test_pipeline_trains_and_forecasts():
+    pytest.importorskip('sklearn')
+    pytest.importorskip('tensorflow')
+    from training import run_pipeline
+
+    config = TrainingConfig(architecture='manual', units=(8,), dropout=(0.0,), epochs=2, time_step=5,
+                            early_stopping_patience=0, forecast_days=3)
+    result = run_pipeline(config, make_frame(days=60))
+
+    assert len(result.forecast) == 3
+    assert all(value >= 0 for value in result.forecast)
+    assert result.forecast_dates[0] == pd.Timestamp('2024-03-01')
+    assert result.progress.epoch == 2
+    report = result.report()
+    assert json.loads(json.dumps(report))['config']['architecture'] == 'manual'
+
+
+@pytest.mark.parametrize('lr_scaling, expected', [('none', 1e-3), ('linear', 4e-3), ('sqrt', 2e-3)])
+def test_learning_rate_scales_with_batch_size(lr_scaling, expected):
+    config = TrainingConfig(batch_size=128, base_batch_size=32, learning_rate=1e-3, lr_scaling=lr_scaling)
+
+    assert scaled_learning_rate(config) == pytest.approx(expected)
+
+
+def test_dataset_yields_the_same_windows_as_make_windows():
+    pytest.importorskip('tensorflow')
+    from training import windowed_dataset
+
+    rng = np.random.default_rng(0)
+    X = rng.random((23, 4))
+    y = rng.random((23, 1))
+    xs, ys = make_windows(X, y, 5)
+
+    batches = list(windowed_dataset(X, y, 5, batch_size=4).as_numpy_iterator())
+    assert [len(batch_y) for _, batch_y in batches] == [4, 4, 4, 4, 2]
+    np.testing.assert_allclose(np.concatenate([batch_x for batch_x, _ in batches]), xs, rtol=1e-6)
+    np.testing.assert_allclose(np.concatenate([batch_y for _, batch_y in batches]), ys, rtol=1e-6)
+
+    # 打乱后每轮仍是同一组样本
+    shuffled = list(windowed_dataset(X, y, 5, batch_size=4, shuffle_buffer=100, seed=1).as_numpy_iterator())
+    shuffled_y = np.concatenate([batch_y for _, batch_y in shuffled])
+    np.testing.assert_allclose(np.sort(shuffled_y), np.sort(ys.astype(np.float32)), rtol=1e-6)
+
+
+def test_dataset_rejects_too_few_rows():
+    pytest.importorskip('tensorflow')
+    from training import windowed_dataset
+
+    with pytest.raises(ValueError):
+        windowed_dataset(np.zeros((5, 2)), np.zeros((5, 1)), 5, batch_size=4)
+
+
+def test_checkpoint_key_ignores_fields_that_only_affect_when_training_ends():
+    config = TrainingConfig(epochs=10)
+    key = Checkpointer.make_key('a' * 64, config)
+
+    assert Checkpointer.make_key('a' * 64, TrainingConfig(epochs=50, early_stopping_patience=3, verbose=2)) == key
+    assert Checkpointer.make_key('b' * 64, config) != key
+    assert Checkpointer.make_key('a' * 64, TrainingConfig(batch_size=64)) != key
+
+
+def test_checkpoints_are_due_every_n_epochs_and_at_the_end():
+    checkpointer = Checkpointer(store=None, key='k', every=3)
+
+    assert [epoch for epoch in range(1, 8) if checkpointer.due(epoch, 7)] == [3, 6, 7]
+    assert not Checkpointer(store=None, key='k', every=0).due(7, 7)
+
+
+def test_progress_round_trips_as_checkpoint_state():
+    progress = TrainingProgress()
+    progress.record(1, {'loss': 0.5, 'val_loss': 0.6}, 1.25)
+    progress.record(2, {'loss': 0.4, 'val_loss': 0.7}, 1.0)
+    progress.best_epoch, progress.best_loss = 1, 0.6
+
+    restored = TrainingProgress.from_dict(json.loads(json.dumps(progress.to_dict())))
+    assert restored == progress
+    summary = restored.summary()
+    assert summary['epochs_run'] == 2
+    assert summary['train_seconds'] == pytest.approx(2.25)
+    assert summary['epochs'][1] == {'epoch': 2, 'seconds': 1.0, 'loss': 0.4, 'val_loss': 0.7}
+
+
+def prepared(days=60):
+    from training import prepare_data
+
+    df = make_frame(days=days)
+    return prepare_data(df, feature_columns(df), time_step=5)
+
+
+def test_early_stopping_restores_the_best_weights():
+    pytest.importorskip('sklearn')
+    pytest.importorskip('tensorflow')
+    from training import build_model, fit_model
+
+    config = TrainingConfig(architecture='manual', units=(4,), dropout=(0.0,), epochs=20, time_step=5,
+                            early_stopping_patience=2)
+    data = prepared()
+    model = build_model(config, data.x_train.shape[2])
+    # 学习率极大时验证损失很快不再下降
+    model.optimizer.learning_rate.assign(5.0)
+    progress = fit_model(model, data, config)
+
+    assert progress.stopped_early
+    assert progress.epoch == progress.best_epoch + 2
+    val_loss = model.evaluate(data.x_test, data.y_test, verbose=0)
+    assert val_loss == pytest.approx(progress.best_loss, rel=1e-3)
+
+
+def test_interrupted_training_resumes_from_the_checkpoint(tmp_path):
+    pytest.importorskip('sklearn')
+    pytest.importorskip('tensorflow')
+    from model_store import ModelStore
+    from training import build_model, fit_model
+
+    class Interrupt(Exception):
+        pass
+
+    def interrupt_after_three(epoch, epochs, logs):
+        if epoch == 3:
+            raise Interrupt()
+
+    config = TrainingConfig(architecture='manual', units=(4,), dropout=(0.0,), epochs=5, time_step=5,
+                            early_stopping_patience=0, checkpoint_every=1)
+    data = prepared()
+    store = ModelStore(str(tmp_path))
+    checkpointer = Checkpointer(store, 'key', config.checkpoint_every)
+    with pytest.raises(Interrupt):
+        fit_model(build_model(config, 4), data, config, progress_callback=interrupt_after_three,
+                  checkpointer=checkpointer)
+    assert store.list_checkpoints()[0]['epoch'] == 3
+
+    epochs_run = []
+    progress = fit_model(build_model(config, 4), data, config, checkpointer=checkpointer,
+                         progress_callback=lambda epoch, epochs, logs: epochs_run.append(epoch))
+    assert epochs_run == [4, 5]
+    assert (progress.resumed_from, progress.epoch) == (3, 5)
+    assert len(progress.epoch_seconds) == 5
@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+
+import pytest
+
+fcntl = pytest.importorskip('fcntl')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from process_lock import ProcessLock
+from training_jobs import TrainingJobQueue
+
+
+def file_lock_free(path):
+    """另一个打开的文件描述能否立即取得文件锁（相当于另一个 worker 进程）"""
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return True
+
+
+class FakePredictor:
+    """记录训练期间写锁和训练锁状态的预测器"""
+
+    def __init__(self, root):
+        self.write_lock_path = os.path.join(root, '.write.lock')
+        self.train_lock_path = os.path.join(root, '.train.lock')
+        self.write_lock = ProcessLock(self.write_lock_path)
+        self.train_lock = ProcessLock(self.train_lock_path)
+        self.model_version = 'v1'
+        self.bundle = None
+        self.merged = []
+        self.observed = None
+
+    def sync_from_store(self):
+        assert not file_lock_free(self.write_lock_path)
+
+    def merge_data_file(self, path):
+        assert not file_lock_free(self.write_lock_path)
+        self.merged.append(path)
+        return {'status': 'success' if path.endswith('.csv') else 'error'}
+
+    def build_and_train_model(self, progress_callback=None):
+        self.observed = {'write_lock_free': file_lock_free(self.write_lock_path),
+                         'train_lock_free': file_lock_free(self.train_lock_path)}
+        return True
+
+    fine_tune_model = build_and_train_model
+
+    def get_model_metrics(self):
+        return {}
+
+
+def run_job(predictor, path):
+    queue = TrainingJobQueue(predictor)
+    job = queue.submit('file', {'path': path})
+    queue.close()
+    assert queue.join(timeout=10)
+    return job
+
+
+def test_training_runs_outside_the_write_lock(tmp_path):
+    predictor = FakePredictor(str(tmp_path))
+    job = run_job(predictor, 'upload.csv')
+
+    assert job.status == 'succeeded'
+    assert predictor.merged == ['upload.csv']
+    # 训练期间其他 worker 可以取得写锁，但训练锁被占用
+    assert predictor.observed == {'write_lock_free': True, 'train_lock_free': False}
+
+
+def test_job_without_ingested_data_skips_training(tmp_path):
+    predictor = FakePredictor(str(tmp_path))
+    job = run_job(predictor, 'empty.txt')
+
+    assert job.status == 'failed'
+    assert predictor.observed is None
+
+
+class BlockingPredictor(FakePredictor):
+    """训练阻塞到 release 置位，期间提交的更新进入下一个任务"""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.training = threading.Event()
+        self.release = threading.Event()
+        self.modes = []
+
+    def upsert_single_day(self, **payload):
+        return {'status': 'success'}
+
+    def build_and_train_model(self, progress_callback=None):
+        return self.train('full', progress_callback)
+
+    def fine_tune_model(self, progress_callback=None):
+        return self.train('incremental', progress_callback)
+
+    def train(self, mode, progress_callback):
+        self.modes.append(mode)
+        self.training.set()
+        assert self.release.wait(10)
+        progress_callback(1, 1, {'loss': 0.5})
+        return True
+
+
+def test_updates_submitted_during_training_are_merged(tmp_path):
+    predictor = BlockingPredictor(str(tmp_path))
+    finished = []
+    queue = TrainingJobQueue(predictor, on_finish=lambda job, operations, applied: finished.append(
+        (job.id, [op for op, _ in operations], len(applied))))
+
+    first = queue.submit('file', {'path': 'a.csv'}, mode='incremental')
+    assert predictor.training.wait(10)
+    second = queue.submit('file', {'path': 'b.csv'}, mode='incremental')
+    # 等待中的任务合并后续更新，任一更新需要全量重训时整个任务全量重训
+    assert queue.submit('file', {'path': 'c.csv'}, mode='full') is second
+    assert queue.submit('single', {}, mode='incremental') is second
+    assert second.status == 'pending'
+    assert first.status == 'running'
+    predictor.release.set()
+    queue.close()
+    assert queue.join(timeout=10)
+
+    assert predictor.merged == ['a.csv', 'b.csv', 'c.csv']
+    assert predictor.modes == ['incremental', 'full']
+    assert (first.status, second.status) == ('succeeded', 'succeeded')
+    assert second.to_dict()['merged_updates'] == 3
+    assert second.progress == 1.0
+    assert second.epoch_log == [{'loss': 0.5, 'epoch': 1}]
+    assert finished == [(first.id, ['file'], 1), (second.id, ['file', 'file', 'single'], 3)]
+    assert [job.id for job in queue.list_jobs()] == [second.id, first.id]
+    assert queue.is_idle()
+
+
+def test_closed_queue_rejects_jobs(tmp_path):
+    queue = TrainingJobQueue(FakePredictor(str(tmp_path)))
+    queue.close()
+
+    with pytest.raises(RuntimeError):
+        queue.submit('file', {'path': 'a.csv'})
+    assert queue.join(timeout=10)
@@ -0,0 +1,56 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+from upload_catalog import UploadCatalog, hash_file
+
+
+def finished_job(status='succeeded'):
+    return SimpleNamespace(status=status, message='', result={'model_version': 'v1'})
+
+
+def test_ingested_upload_is_a_duplicate(tmp_path):
+    catalog = UploadCatalog(str(tmp_path / 'catalog.db'))
+    upload_id = catalog.add('main', 'a.csv', 'a.csv', '/tmp/a.csv', 'csv', 10, 'hash-a')
+    catalog.record_result(upload_id, {'status': 'success', 'rows_ingested': 3}, finished_job())
+
+    original = catalog.find_duplicate('main', 'hash-a')
+    assert original['id'] == upload_id
+    assert original['status'] == 'ingested'
+    # 其他站点不受影响
+    assert catalog.find_duplicate('other', 'hash-a') is None
+
+
+def test_failed_upload_is_not_a_duplicate(tmp_path):
+    catalog = UploadCatalog(str(tmp_path / 'catalog.db'))
+    upload_id = catalog.add('main', 'a.csv', 'a.csv', '/tmp/a.csv', 'csv', 10, 'hash-a')
+    catalog.record_result(upload_id, {'status': 'error', 'message': 'bad'}, finished_job('failed'))
+
+    assert catalog.find_duplicate('main', 'hash-a') is None
+
+
+def test_upload_left_queued_by_restart_is_not_a_duplicate(tmp_path):
+    """进程在训练任务执行前重启：记录停留在 queued，同一内容再次上传时仍可导入"""
+    path = str(tmp_path / 'catalog.db')
+    catalog = UploadCatalog(path)
+    catalog.add('main', 'a.csv', 'a.csv', '/tmp/a.csv', 'csv', 10, 'hash-a')
+    catalog._conn.close()
+
+    restarted = UploadCatalog(path)
+    assert restarted.history()[0][0]['status'] == 'queued'
+    assert restarted.find_duplicate('main', 'hash-a') is None
+
+
+def test_backfill_registers_existing_files_once(tmp_path):
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    (folder / 'old.csv').write_text('ds,y\n2025-01-01,10\n')
+    catalog = UploadCatalog(str(tmp_path / 'catalog.db'))
+
+    assert catalog.backfill(str(folder), 'main') == 1
+    assert catalog.backfill(str(folder), 'main') == 0
+    records, total = catalog.history()
+    assert total == 1
+    assert records[0]['status'] == 'legacy'
+    assert records[0]['content_hash'] == hash_file(str(folder / 'old.csv'))
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lstm'))
+
+from windowing import make_windows
+
+
+def loop_make_dataset(X, y, time_step):
+    """原实现：逐个复制窗口"""
+    xs, ys = [], []
+    for i in range(len(X) - time_step):
+        xs.append(X[i:i+time_step])
+        ys.append(y[i+time_step, 0])
+    return np.array(xs), np.array(ys)
+
+
+@pytest.mark.parametrize('time_step', [1, 3, 10])
+def test_windows_match_the_copying_loop(time_step):
+    rng = np.random.default_rng(0)
+    X = rng.random((30, 4))
+    y = rng.random((30, 1))
+
+    xs, ys = make_windows(X, y, time_step)
+    expected_xs, expected_ys = loop_make_dataset(X, y, time_step)
+
+    assert xs.shape == (30 - time_step, time_step, 4)
+    np.testing.assert_array_equal(xs, expected_xs)
+    np.testing.assert_array_equal(ys, expected_ys)
+
+
+def test_windows_are_read_only_views():
+    X = np.arange(40, dtype=float).reshape(20, 2)
+    y = np.arange(20, dtype=float).reshape(-1, 1)
+
+    xs, ys = make_windows(X, y, 5)
+
+    assert np.shares_memory(xs, X)
+    assert np.shares_memory(ys, y)
+    assert not xs.flags.writeable
+
+
+def test_too_few_rows_give_empty_windows():
+    xs, ys = make_windows(np.zeros((3, 2)), np.zeros((3, 1)), 3)
+
+    assert xs.shape == (0, 3, 2)
+    assert ys.shape == (0,)
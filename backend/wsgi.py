@@ -0,0 +1,11 @@
+"""生产环境 WSGI 入口
+
+gunicorn（多进程，推荐）:
+    gunicorn -c gunicorn.conf.py wsgi:app
+    主进程预加载应用和模块，fork 出的 worker 各自从模型仓库热启动模型；kill -HUP <主进程> 平滑重启 worker，不会重新训练
+waitress（单进程多线程，Windows 可用）:
+    waitress-serve --threads=8 --port=5000 --call app:create_app
+"""
+from app import create_app
+
+app = create_app(preload=True)
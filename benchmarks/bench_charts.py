@@ -0,0 +1,102 @@
+"""图表渲染基准：原 pyplot 实现（全局状态，只能串行）与 Figure/FigureCanvasAgg 模板实现的每秒图表数对比
+
+用法: python benchmarks/bench_charts.py [--charts 40] [--days 7] [--workers 4]
+"""
+import os
+import sys
+import io
+import time
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lstm'))
+from chart_renderer import render_chart_bytes
+
+
+def pyplot_chart_bytes(predictions, prediction_dates):
+    """原实现：每次通过 pyplot 新建图形并设置全局字体"""
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 12))
+    dates_str = [d.strftime('%m-%d') for d in prediction_dates]
+    bars = ax1.bar(dates_str, predictions, color='skyblue', edgecolor='navy', alpha=0.8)
+    for bar, val in zip(bars, predictions):
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
+                f'{int(val)}', ha='center', va='bottom', fontweight='bold')
+    ax1.set_title(f'未来{len(predictions)}天客流量预测', fontsize=16, fontweight='bold', pad=20)
+    ax1.set_xlabel('日期', fontsize=12)
+    ax1.set_ylabel('预测客流量 (人)', fontsize=12)
+    ax1.grid(axis='y', alpha=0.3)
+    ax1.tick_params(axis='x', rotation=45)
+    ax2.plot(dates_str, predictions, marker='o', linewidth=3, markersize=8,
+            color='#ff6b6b', label='预测趋势')
+    ax2.fill_between(dates_str, predictions, alpha=0.3, color='#ff6b6b')
+    ax2.set_title('客流量预测趋势', fontsize=16, fontweight='bold', pad=20)
+    ax2.set_xlabel('日期', fontsize=12)
+    ax2.set_ylabel('客流量 (人)', fontsize=12)
+    ax2.grid(True, alpha=0.3)
+    ax2.legend()
+    ax2.tick_params(axis='x', rotation=45)
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
+    plt.close()
+    return buffer.getvalue()
+
+
+def make_inputs(n_charts, n_days):
+    """生成 n_charts 组不同的预测值"""
+    start = datetime(2025, 1, 1)
+    rng = np.random.default_rng(0)
+    return [(list(rng.uniform(20, 80, n_days)), [start + timedelta(days=i + k) for i in range(n_days)])
+            for k in range(n_charts)]
+
+
+def run(fn, inputs, executor=None):
+    """返回每秒图表数"""
+    start = time.perf_counter()
+    if executor is None:
+        for predictions, dates in inputs:
+            fn(predictions, dates)
+    else:
+        list(executor.map(fn, *zip(*inputs)))
+    return len(inputs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='图表渲染基准')
+    parser.add_argument('--charts', type=int, default=40)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.charts, args.days)
+    warmup = inputs[:2]
+    print(f"{args.charts} 张图表，每张 {args.days} 天，{args.workers} 个工作线程/进程（CPU 核数 {os.cpu_count()}）")
+    print(f"{'impl':>22} {'charts/s':>10}")
+
+    run(pyplot_chart_bytes, warmup)
+    print(f"{'pyplot (serial)':>22} {run(pyplot_chart_bytes, inputs):>10.2f}")
+
+    run(render_chart_bytes, warmup)
+    print(f"{'figure template':>22} {run(render_chart_bytes, inputs):>10.2f}")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(render_chart_bytes, *zip(*(warmup * args.workers))))
+        print(f"{'figure x threads':>22} {run(render_chart_bytes, inputs, executor):>10.2f}")
+
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        list(executor.map(render_chart_bytes, *zip(*(warmup * args.workers))))
+        print(f"{'figure x processes':>22} {run(render_chart_bytes, inputs, executor):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""启动耗时基准：用 -X importtime 统计导入 Web 层（backend/app.py）的耗时和最慢的模块，
+并测量新进程从启动到 /api/health 可响应、到预热完成（ready）的时间
+
+导入耗时超过 --budget-ms 或 Web 层导入了重型依赖（TensorFlow、scikit-learn、matplotlib、pandas）时以非零状态退出，
+可放在 CI 中跟踪回退。
+
+用法: python benchmarks/bench_importtime.py [--repeat 3] [--top 15] [--budget-ms 1000] [--no-ready]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+# Web 层导入时不应加载的模块（由后台预热线程或 gunicorn 预加载导入）
+HEAVY_MODULES = ('tensorflow', 'keras', 'sklearn', 'matplotlib', 'pandas')
+
+# 在新进程中创建应用，记录 /api/health 首次响应和预热完成的时间（工作目录为临时目录，不写入仓库）
+STARTUP_SCRIPT = """
+import os, sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {backend!r})
+import app as backend
+application = backend.create_app()
+client = application.test_client()
+health = client.get('/api/health').get_json()
+result = {{'health_seconds': time.perf_counter() - start, 'health_state': health['state']}}
+if {wait_ready!r}:
+    while backend.startup['state'] not in ('ready', 'failed'):
+        time.sleep(0.05)
+    result['ready_seconds'] = time.perf_counter() - start
+    result['state'] = backend.startup['state']
+    result['phases'] = backend.startup['phases']
+print(json.dumps(result))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    env.setdefault('PYTHONWARNINGS', 'ignore')
+    return env
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 [(模块, 自身微秒, 累计微秒, 层级)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        head, cumulative_us, name = line.split('|')
+        self_us = int(head.split(':')[1])
+        # 模块名前有一个空格，之后每两个空格表示一层嵌套
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), self_us, int(cumulative_us), depth))
+    return rows
+
+
+def measure_import():
+    """在新进程中导入 app，返回解析后的 importtime 记录"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                          cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 app 失败:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def measure_startup(wait_ready):
+    """在新进程中创建应用并请求 /api/health"""
+    script = STARTUP_SCRIPT.format(backend=BACKEND_DIR, wait_ready=wait_ready)
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = subprocess.run([sys.executable, '-c', script], cwd=workdir, env=child_env(),
+                              capture_output=True, text=True)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+    if not lines:
+        raise RuntimeError(f"启动测量失败:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时基准')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=1000.0)
+    parser.add_argument('--no-ready', action='store_true', help='不等待模型预热完成')
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(args.repeat)]
+    totals = [next(cum for name, _, cum, depth in rows if name == 'app' and depth == 0) / 1000 for rows in runs]
+    rows = runs[totals.index(statistics.median(totals))]
+
+    print(f"import app: 中位数 {statistics.median(totals):.1f} ms（{args.repeat} 次: "
+          f"{', '.join(f'{t:.1f}' for t in totals)}），预算 {args.budget_ms:.0f} ms")
+    print("\n累计耗时最多的顶层依赖（app 直接导入）:")
+    print(f"{'module':>32} {'cumulative ms':>14} {'self ms':>9}")
+    # importtime 先输出子模块再输出父模块：app 之前、上一个顶层模块之后的第一层即 app 的直接依赖
+    app_index = next(i for i, r in enumerate(rows) if r[0] == 'app' and r[3] == 0)
+    first = max((i + 1 for i, r in enumerate(rows[:app_index]) if r[3] == 0), default=0)
+    direct = sorted((r for r in rows[first:app_index] if r[3] == 1), key=lambda r: r[2], reverse=True)
+    for name, self_us, cumulative_us, _ in direct[:args.top]:
+        print(f"{name:>32} {cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}")
+
+    heavy_roots = sorted({name.split('.')[0] for name, _, _, _ in rows if name.split('.')[0] in HEAVY_MODULES})
+    print(f"\n重型依赖: {', '.join(heavy_roots) if heavy_roots else '无'}")
+
+    startup = measure_startup(wait_ready=not args.no_ready)
+    print(f"\n新进程到 /api/health 响应: {startup['health_seconds'] * 1000:.0f} ms（state={startup['health_state']}）")
+    if 'ready_seconds' in startup:
+        phases = ', '.join(f"{k}={v:.2f}s" for k, v in startup['phases'].items())
+        print(f"新进程到预热完成: {startup['ready_seconds']:.2f} s（state={startup['state']}; {phases}）")
+
+    failed = False
+    if statistics.median(totals) > args.budget_ms:
+        print(f"\n回退: import app 超出预算 {args.budget_ms:.0f} ms")
+        failed = True
+    if heavy_roots:
+        print(f"\n回退: Web 层导入了重型依赖 {', '.join(heavy_roots)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
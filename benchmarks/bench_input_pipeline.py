@@ -0,0 +1,74 @@
+"""训练输入基准：numpy 数组直接交给 model.fit 与 tf.data 流水线（图内切窗口、缓存、打乱、预取）对比每个 epoch 的耗时
+
+数据为 backend/lstm/more_train.csv（--rows 大于其行数时按年平移重复拼接，模拟多年历史）；
+学习率按 --lr-scaling 随批大小调整，speedup 相对同一批大小的第一种输入方式；同时列出最后一轮的验证集损失，确认加大批大小后收敛情况。
+第一个 epoch 包含图追踪，单独列出，耗时按其余 epoch 的中位数计算。
+
+用法: python benchmarks/bench_input_pipeline.py [--batch-sizes 32 128 512] [--epochs 5] [--rows 5000]
+      [--architecture bilstm] [--lr-scaling sqrt]
+"""
+import os
+import sys
+import argparse
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+import numpy as np
+import pandas as pd
+
+LSTM_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lstm'))
+sys.path.insert(0, LSTM_DIR)
+from training import (ARCHITECTURES, INPUT_PIPELINES, LR_SCALING, TrainingConfig, build_model, feature_columns,
+                      fit_model, load_csv, prepare_data, scaled_learning_rate)
+
+
+def load_history(rows):
+    """读取训练数据，不足 rows 行时把整段数据按年平移后重复拼接"""
+    df = load_csv(os.path.join(LSTM_DIR, 'more_train.csv'))
+    parts, offset = [df], 0
+    while sum(len(p) for p in parts) < rows:
+        offset += 1
+        shifted = df.copy()
+        shifted['ds'] = shifted['ds'] + pd.DateOffset(years=offset)
+        parts.insert(0, shifted)
+    return pd.concat(parts, ignore_index=True).tail(rows).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='训练输入流水线基准')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 128, 512])
+    parser.add_argument('--pipelines', nargs='+', default=['numpy', 'dataset'], choices=INPUT_PIPELINES)
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--architecture', default='bilstm', choices=ARCHITECTURES)
+    parser.add_argument('--lr-scaling', default='sqrt', choices=LR_SCALING)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    df = load_history(args.rows)
+    feature_cols = feature_columns(df)
+    print(f"CPU {os.cpu_count()} 核，{len(df)} 行，{args.architecture}，{args.epochs} epoch")
+    print(f"{'pipeline':>9} {'batch':>6} {'lr':>9} {'first epoch(s)':>15} {'epoch(s)':>9} {'samples/s':>10} "
+          f"{'speedup':>8} {'val_loss':>9}")
+    for batch_size in args.batch_sizes:
+        baseline = None
+        for pipeline in args.pipelines:
+            config = TrainingConfig(architecture=args.architecture, epochs=args.epochs, batch_size=batch_size,
+                                    lr_scaling=args.lr_scaling, input_pipeline=pipeline, early_stopping_patience=0)
+            data = prepare_data(df, feature_cols, config.time_step, config.train_ratio)
+            tf.keras.backend.clear_session()
+            tf.keras.utils.set_random_seed(0)
+            model = build_model(config, len(feature_cols))
+            progress = fit_model(model, data, config)
+            history, epoch_seconds = progress.history, progress.epoch_seconds
+            epoch = float(np.median(epoch_seconds[1:] or epoch_seconds))
+            if baseline is None:
+                baseline = epoch
+            print(f"{pipeline:>9} {batch_size:>6} {scaled_learning_rate(config):>9.2e} {epoch_seconds[0]:>15.2f} "
+                  f"{epoch:>9.3f} {len(data.y_train) / epoch:>10.0f} {baseline / epoch:>7.2f}x "
+                  f"{history['val_loss'][-1]:>9.4f}")
+
+
+if __name__ == '__main__':
+    main()
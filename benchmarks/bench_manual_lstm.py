@@ -0,0 +1,159 @@
+"""ManualLSTM 训练吞吐基准（CPU）：与 Keras LSTM 对比每秒训练样本数
+
+对比的实现：
+    keras          Keras LSTM
+    keras_xla      Keras LSTM，model.compile(jit_compile=True)（CPU 上极慢，默认不运行）
+    stepwise       原 ManualLSTM：每个时间步单独计算 x_t @ W，三个门分别 sigmoid
+    manual         ManualLSTM：输入投影在循环前一次完成，tf.while_loop
+    manual_unroll  ManualLSTM(unroll=True)
+    manual_xla     ManualLSTM(unroll=True)，model.compile(jit_compile=True)
+    manual_bf16    ManualLSTM(unroll=True)，dtype='mixed_bfloat16'（输出层保持 float32）
+结构为服务端的双向 128+64（--architecture bidirectional）或 Self_Build 脚本的单向 128+64（unidirectional）。
+第一个 epoch 包含图追踪/编译，单独列出，吞吐按其余 epoch 计算。
+
+用法: python benchmarks/bench_manual_lstm.py [--architecture bidirectional unidirectional] [--variants ...]
+      [--samples 1000] [--epochs 3] [--batch-size 32]
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import LSTM, Bidirectional, Dense, Dropout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lstm'))
+from manual_lstm import ManualLSTM
+
+VARIANTS = ('keras', 'keras_xla', 'stepwise', 'manual', 'manual_unroll', 'manual_xla', 'manual_bf16')
+
+
+class StepwiseLSTM(tf.keras.layers.Layer):
+    """优化前的 ManualLSTM（基线）：循环内每步计算 x_t @ W + h @ U"""
+
+    def __init__(self, units, return_sequences=False, go_backwards=False, **kwargs):
+        super().__init__(**kwargs)
+        self.units = units
+        self.return_sequences = return_sequences
+        self.go_backwards = go_backwards
+        self.return_state = False
+        self.stateful = False
+
+    def build(self, input_shape):
+        dim = int(input_shape[-1])
+        self.W = self.add_weight(shape=(dim, 4 * self.units), initializer='glorot_uniform', name='W')
+        self.U = self.add_weight(shape=(self.units, 4 * self.units), initializer='orthogonal', name='U')
+        self.b = self.add_weight(shape=(4 * self.units,), initializer='zeros', name='b')
+        super().build(input_shape)
+
+    def call(self, inputs):
+        if self.go_backwards:
+            inputs = tf.reverse(inputs, [1])
+        batch_size = tf.shape(inputs)[0]
+        time_step = tf.shape(inputs)[1]
+        h = tf.zeros((batch_size, self.units))
+        c = tf.zeros((batch_size, self.units))
+        outputs = tf.TensorArray(dtype=tf.float32, size=time_step)
+
+        def loop_body(t, h, c, ta):
+            z = tf.matmul(inputs[:, t, :], self.W) + tf.matmul(h, self.U) + self.b
+            i, f, o, g = tf.split(z, 4, axis=1)
+            c = tf.sigmoid(f) * c + tf.sigmoid(i) * tf.tanh(g)
+            h = tf.sigmoid(o) * tf.tanh(c)
+            return t + 1, h, c, ta.write(t, h)
+
+        _, h, _, outputs = tf.while_loop(lambda t, *_: t < time_step, loop_body, [0, h, c, outputs])
+        return tf.transpose(outputs.stack(), [1, 0, 2]) if self.return_sequences else h
+
+    def compute_output_shape(self, input_shape):
+        input_shape = tf.TensorShape(input_shape)
+        if self.return_sequences:
+            return input_shape[:-1].concatenate([self.units])
+        return tf.TensorShape([input_shape[0], self.units])
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'units': self.units, 'return_sequences': self.return_sequences,
+                       'go_backwards': self.go_backwards})
+        return config
+
+
+def recurrent_factory(variant):
+    """返回 (创建循环层的函数, 是否 XLA 编译整个训练步)"""
+    if variant.startswith('keras'):
+        return (lambda units, **kw: LSTM(units, **kw)), variant == 'keras_xla'
+    if variant == 'stepwise':
+        return (lambda units, **kw: StepwiseLSTM(units, **kw)), False
+    if variant == 'manual':
+        return (lambda units, **kw: ManualLSTM(units, **kw)), False
+    if variant == 'manual_bf16':
+        return (lambda units, **kw: ManualLSTM(units, unroll=True, dtype='mixed_bfloat16', **kw)), False
+    return (lambda units, **kw: ManualLSTM(units, unroll=True, **kw)), variant == 'manual_xla'
+
+
+def build_model(variant, architecture, time_step, n_features):
+    """128+64 两层循环网络 + Dropout + Dense(1)"""
+    make, jit_compile = recurrent_factory(variant)
+    wrap = Bidirectional if architecture == 'bidirectional' else (lambda layer: layer)
+    inputs = tf.keras.layers.Input(shape=(time_step, n_features))
+    x = wrap(make(128, return_sequences=True))(inputs)
+    x = Dropout(0.25)(x)
+    x = wrap(make(64, return_sequences=False))(x)
+    x = Dropout(0.2)(x)
+    model = tf.keras.Model(inputs, Dense(1, dtype='float32')(x))
+    model.compile(optimizer='adam', loss='mse', jit_compile=jit_compile)
+    return model
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    def on_train_begin(self, logs=None):
+        self.times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.times.append(time.perf_counter() - self._start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ManualLSTM 训练吞吐基准')
+    parser.add_argument('--architecture', nargs='+', default=['bidirectional', 'unidirectional'],
+                        choices=['bidirectional', 'unidirectional'])
+    parser.add_argument('--variants', nargs='+', default=[v for v in VARIANTS if v != 'keras_xla'], choices=VARIANTS)
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--time-step', type=int, default=10)
+    parser.add_argument('--features', type=int, default=25)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    x = rng.random((args.samples, args.time_step, args.features), dtype=np.float32)
+    y = rng.random((args.samples, 1), dtype=np.float32)
+    print(f"CPU {os.cpu_count()} 核，{args.samples} 样本 x {args.epochs} epoch，batch {args.batch_size}")
+    for architecture in args.architecture:
+        print(f"\n[{architecture}]")
+        print(f"{'variant':>14} {'first epoch(s)':>15} {'epoch(s)':>9} {'samples/s':>10} {'vs keras':>9} {'loss':>8}")
+        baseline = None
+        for variant in args.variants:
+            tf.keras.backend.clear_session()
+            tf.keras.utils.set_random_seed(0)
+            model = build_model(variant, architecture, args.time_step, args.features)
+            timer = EpochTimer()
+            history = model.fit(x, y, epochs=args.epochs, batch_size=args.batch_size, verbose=0, callbacks=[timer])
+            steady = timer.times[1:] or timer.times
+            epoch_seconds = float(np.median(steady))
+            throughput = args.samples / epoch_seconds
+            if variant == 'keras':
+                baseline = throughput
+            ratio = f"{throughput / baseline:.2f}x" if baseline else '-'
+            print(f"{variant:>14} {timer.times[0]:>15.2f} {epoch_seconds:>9.2f} {throughput:>10.0f} {ratio:>9} "
+                  f"{history.history['loss'][-1]:>8.4f}")
+
+
+if __name__ == '__main__':
+    main()
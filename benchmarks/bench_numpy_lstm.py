@@ -0,0 +1,129 @@
+"""NumPy 推理引擎基准：与 model.predict、编译的 tf.function 对比各批大小的推理延迟和输出误差
+
+模型为服务端使用的 Bidirectional(LSTM) 结构和 Self_Build 脚本中的 ManualLSTM 结构（随机权重），
+另外在新进程中测量 numpy 引擎从模型仓库加载最新版本的耗时，并确认整个过程没有导入 TensorFlow。
+
+用法: python benchmarks/bench_numpy_lstm.py [--batch-sizes 1 7 32 256] [--repeat 50] [--model-store backend/lstm/model_store]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+import numpy as np
+
+LSTM_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lstm'))
+sys.path.insert(0, LSTM_DIR)
+from numpy_lstm import NumpyLSTMModel
+
+# 在新进程中用 numpy 引擎加载模型仓库的最新版本并预测一次
+SERVING_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {lstm_dir!r})
+import numpy as np
+from model_store import ModelStore
+from model_bundle import ModelBundle
+from forecasting import forecast_batch
+artifact = ModelStore({model_store!r}).load_serving(engine='numpy')
+if artifact is None:
+    print(json.dumps({{'error': '模型仓库中没有可用版本'}}))
+    sys.exit(0)
+bundle = ModelBundle(model=artifact['model'], scaler_X=artifact['scaler_X'], scaler_y=artifact['scaler_y'],
+                     feature_cols=tuple(artifact['feature_cols']), time_step=artifact['time_step'])
+loaded = time.perf_counter() - start
+forecast_batch(bundle, np.zeros((1, bundle.time_step, len(bundle.feature_cols))), 7)
+print(json.dumps({{'version': artifact['version'], 'engine': artifact['engine'], 'load_seconds': loaded,
+                  'first_forecast_seconds': time.perf_counter() - start,
+                  'tensorflow_imported': 'tensorflow' in sys.modules, 'sklearn_imported': 'sklearn' in sys.modules}}))
+"""
+
+
+def build_models(time_step, n_features):
+    """服务端结构（Bidirectional LSTM）和 ManualLSTM 结构"""
+    import tensorflow as tf
+    from tensorflow.keras.layers import LSTM, Bidirectional, Dense, Dropout
+    from manual_lstm import ManualLSTM
+
+    bidirectional = tf.keras.Sequential([
+        Bidirectional(LSTM(128, return_sequences=True), input_shape=(time_step, n_features)),
+        Dropout(0.25),
+        Bidirectional(LSTM(64, return_sequences=False)),
+        Dropout(0.2),
+        Dense(1),
+    ])
+
+    inputs = tf.keras.layers.Input(shape=(time_step, n_features))
+    x = ManualLSTM(128, return_sequences=True)(inputs)
+    x = Dropout(0.25)(x)
+    x = ManualLSTM(64, return_sequences=False)(x)
+    x = Dropout(0.2)(x)
+    manual = tf.keras.Model(inputs, Dense(1)(x))
+    # 随机初始化的偏置为 0，换成随机值以便检查偏置和门顺序的导出
+    for model in (bidirectional, manual):
+        model.set_weights([w + np.random.normal(0, 0.05, w.shape).astype(w.dtype) for w in model.get_weights()])
+    return [('bidirectional', bidirectional), ('manual', manual)]
+
+
+def median_ms(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def measure_serving(model_store):
+    """新进程中 numpy 引擎的加载耗时"""
+    script = SERVING_SCRIPT.format(lstm_dir=LSTM_DIR, model_store=model_store)
+    proc = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith('{')]
+    if not lines:
+        raise RuntimeError(f"numpy 引擎加载失败:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NumPy 推理引擎基准')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 7, 32, 256])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--time-step', type=int, default=10)
+    parser.add_argument('--features', type=int, default=25)
+    parser.add_argument('--model-store', default=os.path.join(LSTM_DIR, 'model_store'))
+    args = parser.parse_args()
+
+    from forecasting import compiled_predict_fn
+
+    print(f"{'model':>14} {'batch':>6} {'predict(ms)':>12} {'tf.function(ms)':>16} {'numpy(ms)':>10} "
+          f"{'speedup':>8} {'max|diff|':>10}")
+    for name, model in build_models(args.time_step, args.features):
+        numpy_model = NumpyLSTMModel.from_keras(model)
+        fn = compiled_predict_fn(model, args.time_step, args.features)
+        for batch_size in args.batch_sizes:
+            x = np.random.rand(batch_size, args.time_step, args.features).astype(np.float32)
+            diff = float(np.abs(np.asarray(fn(x)) - numpy_model(x)).max())
+            predict_ms = median_ms(lambda: model.predict(x, verbose=0), max(args.repeat // 5, 3))
+            function_ms = median_ms(lambda: fn(x), args.repeat)
+            numpy_ms = median_ms(lambda: numpy_model(x), args.repeat)
+            print(f"{name:>14} {batch_size:>6} {predict_ms:>12.2f} {function_ms:>16.2f} {numpy_ms:>10.2f} "
+                  f"{function_ms / numpy_ms:>7.1f}x {diff:>10.2e}")
+
+    if os.path.isdir(args.model_store):
+        serving = measure_serving(args.model_store)
+        if 'error' in serving:
+            print(f"\n{serving['error']}")
+        else:
+            print(f"\nnumpy 引擎加载 {serving['version']}（{serving['engine']}）: {serving['load_seconds'] * 1000:.0f} ms，"
+                  f"首次预测完成 {serving['first_forecast_seconds'] * 1000:.0f} ms；"
+                  f"导入 TensorFlow: {serving['tensorflow_imported']}，导入 scikit-learn: {serving['sklearn_imported']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""窗口构造基准：原 Python 循环 make_dataset 与跨步视图 make_windows 的耗时和内存对比
+
+计时覆盖完整路径：构造窗口后再转换为模型输入（model.fit 接收的 float32 连续数组）；
+安装了 TensorFlow 时另外计时 tf.data 输入（training.windowed_dataset 遍历一轮）。
+
+用法: python benchmarks/bench_windowing.py [--rows 10000 100000 1000000] [--max-loop-rows 200000]
+"""
+import os
+import sys
+import time
+import argparse
+import importlib.util
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'lstm'))
+from windowing import make_windows
+
+
+def loop_make_dataset(X, y, time_step=10):
+    """原实现：逐个复制窗口"""
+    xs, ys = [], []
+    for i in range(len(X) - time_step):
+        xs.append(X[i:i+time_step])
+        ys.append(y[i+time_step, 0])
+    return np.array(xs), np.array(ys)
+
+
+def to_model_input(xs, ys):
+    """转换为模型输入：Keras 把 numpy 输入转换为 float32 张量，这里同样物化为 float32 连续数组"""
+    return np.ascontiguousarray(xs, dtype=np.float32), np.ascontiguousarray(ys, dtype=np.float32)
+
+
+def tf_data_input(X, y, time_step, batch_size=32):
+    """tf.data 输入：构造数据集并遍历一轮，窗口在图内切出"""
+    from training import windowed_dataset
+    for _ in windowed_dataset(X, y, time_step, batch_size):
+        pass
+
+
+def measure(fn, X, y, time_step):
+    """返回 (构造窗口耗时秒, 含物化为模型输入的总耗时秒, 峰值新增内存字节)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    xs, ys = fn(X, y, time_step)
+    built = time.perf_counter() - start
+    inputs = to_model_input(xs, ys)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del xs, ys, inputs
+    return built, elapsed, peak
+
+
+def measure_tf_data(X, y, time_step):
+    """tf.data 路径没有单独的窗口构造阶段，返回 (None, 总耗时秒, 峰值新增内存字节)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    tf_data_input(X, y, time_step)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return None, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='窗口构造基准')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--features', type=int, default=25)
+    parser.add_argument('--time-step', type=int, default=10)
+    parser.add_argument('--max-loop-rows', type=int, default=200000,
+                        help='超过该行数时跳过循环实现（其内存为 time_step 倍数据量）')
+    args = parser.parse_args()
+    has_tf = importlib.util.find_spec('tensorflow') is not None
+
+    print(f"{'rows':>10} {'impl':>8} {'build(ms)':>12} {'total(ms)':>12} {'peak(MB)':>12}")
+    for rows in args.rows:
+        X = np.random.rand(rows, args.features)
+        y = np.random.rand(rows, 1)
+        runs = [('strided', lambda: measure(make_windows, X, y, args.time_step))]
+        if rows <= args.max_loop_rows:
+            runs.insert(0, ('loop', lambda: measure(loop_make_dataset, X, y, args.time_step)))
+        if has_tf:
+            runs.append(('tf.data', lambda: measure_tf_data(X, y, args.time_step)))
+        for name, run in runs:
+            built, elapsed, peak = run()
+            built = '-' if built is None else f"{built * 1000:.2f}"
+            print(f"{rows:>10} {name:>8} {built:>12} {elapsed * 1000:>12.2f} {peak / 1024 / 1024:>12.2f}")
+        if rows > args.max_loop_rows:
+            # 按数据量估算循环实现的内存：每个窗口复制 time_step 行（float64），再物化一份 float32 模型输入
+            windows = (rows - args.time_step) * args.time_step * args.features
+            estimate = windows * (X.itemsize + 4)
+            print(f"{rows:>10} {'loop':>8} {'skipped':>12} {'skipped':>12} {estimate / 1024 / 1024:>11.2f}*")
+
+
+if __name__ == '__main__':
+    main()